@@ -1,4 +1,6 @@
-from flask import Flask, jsonify
+import json
+import click
+from flask import Flask, Response, jsonify, g
 from .config import Config
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
@@ -8,19 +10,53 @@ db = SQLAlchemy()
 jwt = JWTManager()
 migrate = Migrate()
 
+from .utils.revocation import RevocationCache
+from .utils.principal_cache import PrincipalCache
+from .utils.response_cache import ResponseCache
+from .utils.passwords import PasswordHasher
+from .utils.metrics import RequestMetrics
+from .utils.pool import ConnectionPool
+from .utils.access import queries_saved
+from .exports.jobs import ExportJobQueue
+from .exports.cache import ExportCache
+revocation_cache = RevocationCache()
+principal_cache = PrincipalCache()
+response_cache = ResponseCache()
+password_hasher = PasswordHasher()
+request_metrics = RequestMetrics()
+connection_pool = ConnectionPool(request_metrics)
+export_queue = ExportJobQueue()
+export_cache = ExportCache()
+
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
     app.json.sort_keys = False
 
-    # Initialize extensions
+    # Initialize extensions (pool settings first: they become the engine options)
+    connection_pool.init_app(app)
     db.init_app(app)
     jwt.init_app(app)
     migrate.init_app(app, db)
+    revocation_cache.init_app(app)
+    principal_cache.init_app(app)
+    response_cache.init_app(app)
+    password_hasher.init_app(app)
+    request_metrics.init_app(app)
+    export_queue.init_app(app)
+    export_cache.init_app(app)
 
     # Import models so SQLAlchemy/Alembic can see them
     from .models import Users, TokenBlockList
 
+    # bump users.data_version whenever a user's records change
+    from .utils.versioning import init_versioning
+    init_versioning()
+
+    # keep daily_rollup in step with symptom and food log writes
+    from .analytics.rollups import init_rollups
+    init_rollups()
+
     # Import and register blueprints
     from .routes import (
         auth_bp, 
@@ -44,10 +80,11 @@ def create_app():
         db.create_all()
 
     # ----------------------------------------- JWT HANDLERS ---------------------------------------- #
+    # current_user is the cached principal; routes load whatever else they need
     @jwt.user_lookup_loader
     def user_lookup_callback(jwt_header, jwt_data):
         identity = jwt_data['sub']
-        return Users.query.filter_by(id=int(identity)).one_or_none()
+        return principal_cache.get(identity, Users.get_principal)
 
     @jwt.expired_token_loader
     def expired_token_callback(jwt_header, jwt_data):
@@ -71,11 +108,83 @@ def create_app():
         }), 401
 
     # CHECKS IF JWT IS REVOKED (assist with logging out)
+    # answered from the per-worker revocation cache, not a query per request
     @jwt.token_in_blocklist_loader
     def token_in_blocklist_callback(jwt_header, jwt_data):
-        jti = jwt_data['jti']
-        token = db.session.query(TokenBlockList).filter(TokenBlockList.jti == jti).scalar()
-        return token is not None  # True => revoked
+        return revocation_cache.is_revoked(jwt_data['jti'])  # True => revoked
+
+    # ----------------------------------------------------------------------------------------------- #
+
+    # backfill / repair: flask rebuild-rollups [--user-id N]
+    @app.cli.command('rebuild-rollups')
+    @click.option('--user-id', type=int, default=None, help='Only rebuild this user')
+    def rebuild_rollups(user_id):
+        """Recompute daily_rollup from the symptom and food log tables."""
+        from .analytics.rollups import rebuild_user_rollups
+        user_ids = [user_id] if user_id else [row.id for row in db.session.query(Users.id).yield_per(1000)]
+        for uid in user_ids:
+            rebuild_user_rollups(uid)
+            db.session.commit()
+        click.echo(f"Rebuilt rollups for {len(user_ids)} user(s)")
+
+    # clinic onboarding: flask provision-users patients.json (JSON array or NDJSON)
+    @app.cli.command('provision-users')
+    @click.argument('path', type=click.File('r'))
+    def provision_users_command(path):
+        """Create user accounts in bulk from a JSON / NDJSON file."""
+        from .forms import ProvisionUserForm
+        from .utils import provision_users
+        text = path.read()
+        try:
+            items = json.loads(text)
+            items = items.get('items', []) if isinstance(items, dict) else items
+        except ValueError:
+            items = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+        results, created = provision_users(ProvisionUserForm(), iter(items))
+        for result in results:
+            if result['status'] != 'created':
+                click.echo(f"record {result['index']}: {result['status']} {result['errors']}", err=True)
+        click.echo(f"Created {created} of {len(results)} user(s)")
+
+    # load / query plan testing on a scratch database: flask generate-data --users 20000 --seed 24
+    @app.cli.command('generate-data')
+    @click.option('--users', type=int, default=20000, show_default=True, help='Accounts to create')
+    @click.option('--records-per-user', type=float, default=60, show_default=True,
+                  help='Mean symptoms and food logs per user (treatments a quarter of that, labs a tenth)')
+    @click.option('--days', type=int, default=365, show_default=True, help='History length, ending at --end-date')
+    @click.option('--end-date', type=click.DateTime(formats=['%Y-%m-%d']), default='2025-12-31', show_default=True)
+    @click.option('--seed', type=int, default=24, show_default=True, help='Same seed and options, same data')
+    @click.option('--batch-size', type=int, default=5000, show_default=True,
+                  help='Rows per INSERT where COPY is unavailable (SQLite)')
+    @click.option('--password', default='synthetic-password', show_default=True, help='Shared by every account')
+    def generate_data(users, records_per_user, days, end_date, seed, batch_size, password):
+        """Generate synthetic users and records (COPY on PostgreSQL, batched INSERTs elsewhere)."""
+        from .utils.synthetic import generate
+        try:
+            stats = generate(users, records_per_user, days, end_date.date(), seed, password, batch_size,
+                             echo=lambda message: click.echo(message, err=True))
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        for table, totals in stats['tables'].items():
+            click.echo(f"{table:<16}{totals['rows']:>12,} rows {totals['rows_per_second']:>12,.0f} rows/s")
+        click.echo(f"Loaded {stats['rows']:,} rows in {stats['seconds']:.1f}s with {stats['method']} "
+                   f"({stats['rows_per_second']:,.0f} rows/s overall, {stats['generate_seconds']:.1f}s generating)")
+
+    # run periodically (cron / scheduled task): flask prune-token-blocklist
+    @app.cli.command('prune-token-blocklist')
+    def prune_token_blocklist():
+        """Delete blocklist rows for tokens that have already expired."""
+        max_token_age = max(app.config['JWT_ACCESS_TOKEN_EXPIRES'], app.config['JWT_REFRESH_TOKEN_EXPIRES'])
+        deleted = TokenBlockList.prune_expired(max_token_age)
+        click.echo(f"Pruned {deleted} expired token(s) from the blocklist")
+
+    # run periodically (cron / scheduled task): flask prune-export-jobs
+    @app.cli.command('prune-export-jobs')
+    def prune_export_jobs():
+        """Fail export jobs whose worker died and delete expired export files."""
+        failed, deleted = export_queue.prune()
+        click.echo(f"Marked {failed} stale export job(s) failed, deleted {deleted} export file(s)")
 
     # ----------------------------------------------------------------------------------------------- #
 
@@ -87,6 +196,30 @@ def create_app():
             {"Content-Type": "text/plain; charset=utf-8"}
         )
 
+    @app.after_request
+    def report_queries_saved(response):
+        if g.get('queries_saved'):
+            response.headers['X-Queries-Saved'] = str(g.queries_saved)
+        return response
+
+    from .analytics import correlation_cache_stats
+
+    @app.get("/cache-stats")
+    def cache_stats():
+        # per worker; used to size USER_CACHE_SIZE / USER_CACHE_TTL_SECONDS under load
+        return jsonify({
+            "user_principals": principal_cache.stats(),
+            "responses": response_cache.stats(),
+            "authorization": {"queries_saved": queries_saved()},
+            "exports": export_cache.stats(),
+            "food_correlations": correlation_cache_stats(),
+        }), 200
+
+    @app.get("/metrics")
+    def metrics():
+        # Prometheus text format, per worker like /cache-stats (scrape each worker)
+        return Response(request_metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
     return app
 
 app = create_app()
@@ -0,0 +1,14 @@
+from .rollups import query_rollups, refresh_days, rebuild_user_rollups, init_rollups, PERIODS
+from .correlations import food_correlations, compute_food_correlations, correlation_cache_stats, tokenize_meal
+
+__all__ = [
+    'query_rollups',
+    'refresh_days',
+    'rebuild_user_rollups',
+    'init_rollups',
+    'PERIODS',
+    'food_correlations',
+    'compute_food_correlations',
+    'correlation_cache_stats',
+    'tokenize_meal',
+]
@@ -0,0 +1,186 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+from sqlalchemy import select
+
+from .. import db
+from ..models import DailySymptoms, FoodLog, Users
+
+
+# exposure windows (hours before a symptom entry); the last edge is the longest lag considered
+LAG_EDGES = (0, 6, 24, 48, 72)
+
+MEALS = ('breakfast', 'lunch', 'dinner')
+
+_SPLIT = re.compile(r'[,;/&+\n]|\band\b|\bwith\b', re.IGNORECASE)
+_SPACES = re.compile(r'\s+')
+
+
+def tokenize_meal(text):
+    """Split a free-text meal ("Eggs, toast and coffee") into food names."""
+    if not text:
+        return []
+    foods = (_SPACES.sub(' ', part).strip(' .-').lower() for part in _SPLIT.split(text))
+    return [food for food in foods if food]
+
+
+def _hours(times):
+    # naive UTC datetimes -> float hours since the epoch
+    return np.array(times, dtype='datetime64[s]').astype(np.int64) / 3600.0
+
+
+def _meal_foods(meal):
+    for column in MEALS:
+        yield from tokenize_meal(getattr(meal, column))
+
+
+def _load_arrays(user_id):
+    meals = db.session.execute(
+        select(FoodLog.recorded_on, FoodLog.breakfast, FoodLog.lunch, FoodLog.dinner)
+        .where(FoodLog.id == user_id, FoodLog.recorded_on.isnot(None))
+        .order_by(FoodLog.recorded_on)
+    ).all()
+    symptoms = db.session.execute(
+        select(DailySymptoms.recorded_on, DailySymptoms.severity)
+        .where(DailySymptoms.id == user_id, DailySymptoms.recorded_on.isnot(None))
+    ).all()
+
+    vocabulary = {}
+    rows, cols = [], []
+    for i, meal in enumerate(meals):
+        for food in set(_meal_foods(meal)):
+            rows.append(i)
+            cols.append(vocabulary.setdefault(food, len(vocabulary)))
+
+    # meal x food incidence matrix, meals sorted by time
+    eaten = np.zeros((len(meals), len(vocabulary)), dtype=np.int32)
+    eaten[rows, cols] = 1
+
+    meal_hours = _hours([meal.recorded_on for meal in meals])
+    symptom_hours = _hours([row.recorded_on for row in symptoms])
+    severity = np.array([row.severity or 0 for row in symptoms], dtype=np.float64)
+    foods = sorted(vocabulary, key=vocabulary.get)
+    return foods, eaten, meal_hours, symptom_hours, severity
+
+
+def _exposure(eaten_cumsum, meal_hours, symptom_hours, lo, hi):
+    """symptoms x foods: was the food eaten lo <= lag < hi hours before each symptom."""
+    start = np.searchsorted(meal_hours, symptom_hours - hi, side='right')
+    stop = np.searchsorted(meal_hours, symptom_hours - lo, side='right')
+    return (eaten_cumsum[stop] - eaten_cumsum[start]) > 0
+
+
+def _correlate(exposed, severity):
+    """Per-food statistics for one exposure matrix, all foods at once."""
+    exposed = exposed.astype(np.float64)
+    n = severity.shape[0]
+    exposed_count = exposed.sum(axis=0)
+    unexposed_count = n - exposed_count
+
+    severity_total = severity.sum()
+    exposed_sum = severity @ exposed
+    mean_all = severity_total / n
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_exposed = exposed_sum / exposed_count
+        mean_unexposed = (severity_total - exposed_sum) / unexposed_count
+        lift = mean_exposed / mean_all
+
+        # Pearson correlation between the 0/1 exposure and severity (point-biserial)
+        centered = severity - mean_all
+        covariance = centered @ exposed / n
+        exposure_std = np.sqrt(exposed_count / n * (1 - exposed_count / n))
+        correlation = covariance / (exposure_std * centered.std())
+
+    return {
+        'exposed_count': exposed_count,
+        'mean_exposed': mean_exposed,
+        'mean_unexposed': mean_unexposed,
+        'lift': lift,
+        'correlation': correlation,
+    }
+
+
+def _number(value):
+    return None if not np.isfinite(value) else round(float(value), 3)
+
+
+def compute_food_correlations(user_id, min_occurrences=3):
+    """Lagged correlation / lift of every food against symptom severity.
+
+    For each lag window in LAG_EDGES a symptom entry counts as exposed to a food
+    if a meal containing it was logged in that window before the entry. Windows
+    come from two searchsorted calls over the time-sorted meals and a cumulative
+    sum of the meal x food matrix, so the cost is O((meals + symptoms) x foods)
+    regardless of how far back the history goes.
+    """
+    foods, eaten, meal_hours, symptom_hours, severity = _load_arrays(user_id)
+
+    summary = {
+        'meals': int(eaten.shape[0]),
+        'symptoms': int(severity.shape[0]),
+        'lag_hours': list(LAG_EDGES),
+        'foods': [],
+    }
+    if not foods or severity.shape[0] < 2:
+        return summary
+
+    occurrences = eaten.sum(axis=0)
+    keep = occurrences >= min_occurrences
+    if not keep.any():
+        return summary
+    eaten = eaten[:, keep]
+    occurrences = occurrences[keep]
+    foods = [food for food, kept in zip(foods, keep) if kept]
+
+    eaten_cumsum = np.vstack([np.zeros((1, eaten.shape[1]), dtype=np.int64), np.cumsum(eaten, axis=0)])
+
+    windows = [(0, LAG_EDGES[-1])] + list(zip(LAG_EDGES[:-1], LAG_EDGES[1:]))
+    stats = [_correlate(_exposure(eaten_cumsum, meal_hours, symptom_hours, lo, hi), severity)
+             for lo, hi in windows]
+
+    overall = stats[0]
+    by_lag = stats[1:]
+    for j, food in enumerate(foods):
+        lags = [
+            {
+                'from_hours': lo,
+                'to_hours': hi,
+                'exposed_symptoms': int(lag['exposed_count'][j]),
+                'lift': _number(lag['lift'][j]),
+                'correlation': _number(lag['correlation'][j]),
+            }
+            for (lo, hi), lag in zip(windows[1:], by_lag)
+        ]
+        strongest = max(lags, key=lambda lag: abs(lag['correlation'] or 0))
+        summary['foods'].append({
+            'food': food,
+            'occurrences': int(occurrences[j]),
+            'exposed_symptoms': int(overall['exposed_count'][j]),
+            'mean_severity_exposed': _number(overall['mean_exposed'][j]),
+            'mean_severity_unexposed': _number(overall['mean_unexposed'][j]),
+            'lift': _number(overall['lift'][j]),
+            'correlation': _number(overall['correlation'][j]),
+            'strongest_lag': {'from_hours': strongest['from_hours'], 'to_hours': strongest['to_hours']},
+            'lags': lags,
+        })
+
+    summary['foods'].sort(key=lambda item: (item['correlation'] is None, -(item['correlation'] or 0)))
+    return summary
+
+
+@lru_cache(maxsize=256)
+def _cached_food_correlations(user_id, data_version, min_occurrences):
+    # data_version is only part of the key: any write for the user changes it
+    return compute_food_correlations(user_id, min_occurrences)
+
+
+def food_correlations(user_id, min_occurrences=3):
+    """compute_food_correlations, memoised per users.data_version (one query on a hit)."""
+    return _cached_food_correlations(user_id, Users.get_data_version(user_id), min_occurrences)
+
+
+def correlation_cache_stats():
+    info = _cached_food_correlations.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'max_size': info.maxsize}
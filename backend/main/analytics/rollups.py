@@ -0,0 +1,205 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Date, and_, case, cast, delete, event, func, insert, inspect, select
+
+from .. import db
+from ..models import DailySymptoms, FoodLog, DailyRollup
+
+
+PERIODS = ('day', 'week', 'month')
+
+ROLLED_UP_MODELS = (DailySymptoms, FoodLog)
+
+
+def _as_day(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.fromisoformat(str(value)).date()
+
+
+def _day_aggregates(connection, user_id, day):
+    start = datetime.combine(day, datetime.min.time())
+    end = start + timedelta(days=1)
+
+    symptoms = connection.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(DailySymptoms.severity), 0),
+            func.max(DailySymptoms.severity),
+            func.coalesce(func.sum(case((DailySymptoms.weight_lbs > 0, DailySymptoms.weight_lbs), else_=0.0)), 0.0),
+            func.count(case((DailySymptoms.weight_lbs > 0, 1))),
+        ).where(
+            DailySymptoms.id == user_id,
+            DailySymptoms.recorded_on >= start,
+            DailySymptoms.recorded_on < end,
+        )
+    ).one()
+    food = connection.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(FoodLog.total_calories), 0.0),
+        ).where(
+            FoodLog.id == user_id,
+            FoodLog.recorded_on >= start,
+            FoodLog.recorded_on < end,
+        )
+    ).one()
+
+    return {
+        'symptom_count': symptoms[0],
+        'severity_sum': symptoms[1],
+        'severity_max': symptoms[2],
+        'weight_sum': symptoms[3],
+        'weight_count': symptoms[4],
+        'foodlog_count': food[0],
+        'calories_sum': food[1],
+    }
+
+
+def refresh_days(user_days, connection=None):
+    """Recompute the rollup rows for the given (user id, day) pairs.
+
+    A day is rebuilt from its own rows (an indexed range on recorded_on), so the
+    cost is per affected day, not per history; max() stays correct after deletes.
+    """
+    connection = connection or db.session.connection()
+    for user_id, day in sorted(user_days):
+        values = _day_aggregates(connection, user_id, day)
+        connection.execute(delete(DailyRollup).where(DailyRollup.id == user_id, DailyRollup.day == day))
+        if values['symptom_count'] or values['foodlog_count']:
+            connection.execute(insert(DailyRollup).values(id=user_id, day=day, **values))
+
+
+def rows_to_user_days(user_id, rows):
+    # (user, day) pairs touched by bulk-inserted rows, which skip the flush hook
+    return {(user_id, _as_day(row.get('recorded_on'))) for row in rows if row.get('recorded_on') is not None}
+
+
+def _touched_days(session):
+    user_days = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, ROLLED_UP_MODELS):
+            continue
+        history = inspect(obj).attrs.recorded_on.history
+        # both the old and the new day when an edit moves the entry
+        for value in list(history.added) + list(history.unchanged) + list(history.deleted):
+            if value is not None and obj.id is not None:
+                user_days.add((obj.id, _as_day(value)))
+    return user_days
+
+
+def _refresh_rollups_after_flush(session, flush_context):
+    user_days = _touched_days(session)
+    if user_days:
+        refresh_days(user_days, session.connection())
+
+
+def init_rollups():
+    if not event.contains(db.session, 'after_flush', _refresh_rollups_after_flush):
+        event.listen(db.session, 'after_flush', _refresh_rollups_after_flush)
+
+
+def _bucket(column, period, dialect_name):
+    if dialect_name == 'postgresql':
+        return cast(func.date_trunc(period, column), Date)
+    return None
+
+
+def _python_bucket(day, period):
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _serialize(period_start, symptom_count, severity_sum, severity_max, weight_sum, weight_count,
+               foodlog_count, calories_sum):
+    return {
+        'period_start': period_start.isoformat(),
+        'symptom_count': symptom_count,
+        'severity_mean': round(severity_sum / symptom_count, 2) if symptom_count else None,
+        'severity_max': severity_max,
+        'weight_mean': round(weight_sum / weight_count, 2) if weight_count else None,
+        'foodlog_count': foodlog_count,
+        'total_calories': calories_sum,
+    }
+
+
+def query_rollups(user_id, period='day', start=None, end=None):
+    """Trend buckets for a user; one small query over the rollup table.
+
+    Weeks start on Monday. Postgres groups with date_trunc; other databases
+    group the (at most one per day) rollup rows here instead.
+    """
+    filters = [DailyRollup.id == user_id]
+    if start is not None:
+        filters.append(DailyRollup.day >= start)
+    if end is not None:
+        filters.append(DailyRollup.day <= end)
+
+    columns = (
+        func.sum(DailyRollup.symptom_count),
+        func.sum(DailyRollup.severity_sum),
+        func.max(DailyRollup.severity_max),
+        func.sum(DailyRollup.weight_sum),
+        func.sum(DailyRollup.weight_count),
+        func.sum(DailyRollup.foodlog_count),
+        func.sum(DailyRollup.calories_sum),
+    )
+
+    bucket = _bucket(DailyRollup.day, period, db.session.get_bind().dialect.name) if period != 'day' else DailyRollup.day
+    if bucket is not None:
+        rows = db.session.execute(
+            select(bucket.label('bucket'), *columns)
+            .where(and_(*filters))
+            .group_by(bucket)
+            .order_by(bucket)
+        ).all()
+        return [_serialize(_as_day(row[0]), *row[1:]) for row in rows]
+
+    days = db.session.execute(
+        select(
+            DailyRollup.day, DailyRollup.symptom_count, DailyRollup.severity_sum, DailyRollup.severity_max,
+            DailyRollup.weight_sum, DailyRollup.weight_count, DailyRollup.foodlog_count, DailyRollup.calories_sum,
+        ).where(and_(*filters)).order_by(DailyRollup.day)
+    ).all()
+
+    buckets = {}
+    for day, *values in days:
+        key = _python_bucket(_as_day(day), period)
+        totals = buckets.setdefault(key, [0, 0, None, 0.0, 0, 0, 0.0])
+        totals[0] += values[0]
+        totals[1] += values[1]
+        if values[2] is not None:
+            totals[2] = values[2] if totals[2] is None else max(totals[2], values[2])
+        totals[3] += values[3]
+        totals[4] += values[4]
+        totals[5] += values[5]
+        totals[6] += values[6]
+    return [_serialize(key, *totals) for key, totals in buckets.items()]
+
+
+def rebuild_user_rollups(user_id):
+    """Recompute every rollup row for a user straight from the base tables."""
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        symptom_day = cast(func.date_trunc('day', DailySymptoms.recorded_on), Date)
+        food_day = cast(func.date_trunc('day', FoodLog.recorded_on), Date)
+    else:
+        symptom_day = func.date(DailySymptoms.recorded_on)
+        food_day = func.date(FoodLog.recorded_on)
+
+    days = set()
+    for day_column, model in ((symptom_day, DailySymptoms), (food_day, FoodLog)):
+        rows = connection.execute(
+            select(day_column).where(model.id == user_id, model.recorded_on.isnot(None)).distinct()
+        ).scalars()
+        days.update(_as_day(day) for day in rows)
+
+    connection.execute(delete(DailyRollup).where(DailyRollup.id == user_id))
+    refresh_days({(user_id, day) for day in days}, connection)
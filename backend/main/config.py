@@ -11,6 +11,26 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # connection pool per worker process: keep workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    # under Postgres max_connections (or PgBouncer's client limit). Requests that wait
+    # DB_POOL_TIMEOUT_SECONDS for a connection get 503; connections older than
+    # DB_POOL_RECYCLE_SECONDS are replaced, and DB_POOL_PRE_PING tests each one on checkout
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT_SECONDS = int(os.getenv('DB_POOL_TIMEOUT_SECONDS', 10))
+    DB_POOL_RECYCLE_SECONDS = int(os.getenv('DB_POOL_RECYCLE_SECONDS', 1800))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+
+    # PostgreSQL limits for request transactions (ms, 0 = none); routes can set their own
+    # with @statement_timeout, streamed exports use the EXPORT_* values (a slow client
+    # leaves their transaction idle between chunks)
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 15000))
+    DB_IDLE_IN_TRANSACTION_TIMEOUT_MS = int(os.getenv('DB_IDLE_IN_TRANSACTION_TIMEOUT_MS', 60000))
+    EXPORT_STATEMENT_TIMEOUT_MS = int(os.getenv('EXPORT_STATEMENT_TIMEOUT_MS', 120000))
+    EXPORT_IDLE_IN_TRANSACTION_TIMEOUT_MS = int(os.getenv('EXPORT_IDLE_IN_TRANSACTION_TIMEOUT_MS', 600000))
+    # DATABASE_URL points at PgBouncer in transaction pooling mode: limits are set per transaction
+    DB_PGBOUNCER = os.getenv('DB_PGBOUNCER', 'false').lower() in ('1', 'true', 'yes')
+
 
     SECRET_KEY = os.environ.get('SECRET_KEY')
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY')
@@ -18,3 +38,56 @@ class Config:
     JWT_ALGORITHM = 'HS256'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=600) #mintues
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=7) #days
+
+    # how stale (seconds) a worker's copy of the token blocklist may get before it
+    # checks for new revocations, and how often it reloads the whole list
+    JWT_REVOCATION_REFRESH_SECONDS = float(os.getenv('JWT_REVOCATION_REFRESH_SECONDS', 5))
+    JWT_REVOCATION_FULL_RELOAD_SECONDS = float(os.getenv('JWT_REVOCATION_FULL_RELOAD_SECONDS', 300))
+    # each refresh re-reads revocations this much older than the newest one it has seen,
+    # so a row whose transaction committed late (up to this long) is still picked up
+    JWT_REVOCATION_OVERLAP_SECONDS = float(os.getenv('JWT_REVOCATION_OVERLAP_SECONDS', 60))
+
+    # per-worker cache of user principals used by the JWT user lookup
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 1024))
+    USER_CACHE_TTL_SECONDS = float(os.getenv('USER_CACHE_TTL_SECONDS', 60))
+
+    # password hashing cost policy (werkzeug method string, e.g. 'scrypt:32768:8:1' or
+    # 'pbkdf2:sha256:1000000'); stored hashes with other parameters are upgraded at login
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+    # threads (cores) hashing may use per worker, 0 = inline; checks waiting beyond
+    # PASSWORD_HASH_MAX_PENDING are answered 503
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 64))
+
+    # rendered list pages per user; 'local' is per worker (entries keyed on the user's
+    # data_version), 'redis' shares them via RESPONSE_CACHE_URL, 'none' turns it off
+    RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'local')
+    RESPONSE_CACHE_URL = os.getenv('RESPONSE_CACHE_URL', 'redis://localhost:6379/0')
+    RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 2048))
+    RESPONSE_CACHE_TTL_SECONDS = float(os.getenv('RESPONSE_CACHE_TTL_SECONDS', 30))
+
+    # request instrumentation: statements slower than SLOW_QUERY_MS are logged with the
+    # endpoint that ran them; SERVER_TIMING adds per-response db / app timings for devtools
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+    SERVER_TIMING = os.getenv('SERVER_TIMING', 'true').lower() in ('1', 'true', 'yes')
+
+    # bulk ingest: records per multi-row INSERT, and per request
+    BULK_CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', 500))
+    BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', 10000))
+
+    # bulk user provisioning (POST /api/auth/provision-users): unset disables the endpoint
+    PROVISIONING_TOKEN = os.getenv('PROVISIONING_TOKEN')
+    PROVISION_MAX_USERS = int(os.getenv('PROVISION_MAX_USERS', 5000))
+
+    # background pdf exports: pool processes per web worker, and queued + running jobs allowed overall
+    EXPORT_WORKERS = int(os.getenv('EXPORT_WORKERS', 2))
+    EXPORT_MAX_ACTIVE_JOBS = int(os.getenv('EXPORT_MAX_ACTIVE_JOBS', 16))
+    EXPORT_DIR = os.getenv('EXPORT_DIR')  # defaults to <instance folder>/exports
+    # a job queued / running longer than this is treated as failed (crashed worker);
+    # finished files are kept this long (flask prune-export-jobs deletes them)
+    EXPORT_JOB_TIMEOUT_SECONDS = int(os.getenv('EXPORT_JOB_TIMEOUT_SECONDS', 1800))
+    EXPORT_ARTIFACT_TTL_SECONDS = int(os.getenv('EXPORT_ARTIFACT_TTL_SECONDS', 86400))
+
+    # rendered exports keyed by users.data_version, least recently used evicted past the size cap
+    EXPORT_CACHE_DIR = os.getenv('EXPORT_CACHE_DIR')  # defaults to <instance folder>/export_cache
+    EXPORT_CACHE_MAX_BYTES = int(os.getenv('EXPORT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
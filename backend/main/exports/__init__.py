@@ -0,0 +1,18 @@
+from .pdf import stream_medical_data_pdf, StreamingPdfWriter, RENDER_VERSION
+from .cache import ExportCache
+from .tabular import stream_records, parse_types, EXPORT_TYPES, FORMATS
+from .jobs import ExportJobQueue, ExportQueueFull, run_export_job
+
+__all__ = [
+    'stream_medical_data_pdf',
+    'StreamingPdfWriter',
+    'RENDER_VERSION',
+    'ExportCache',
+    'stream_records',
+    'parse_types',
+    'EXPORT_TYPES',
+    'FORMATS',
+    'ExportJobQueue',
+    'ExportQueueFull',
+    'run_export_job',
+]
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+
+
+class ExportCache:
+    """Size-bounded on-disk cache of rendered exports.
+
+    Files are named by a hash of (user id, users.data_version, format, renderer
+    version). Any write to a user's records bumps data_version, so a stale file
+    is simply never asked for again and ages out. Hits touch the file's mtime and
+    eviction removes the least recently used files once EXPORT_CACHE_MAX_BYTES
+    is exceeded. Writes go through a temp file + os.replace, so pool processes
+    and web workers can share the directory.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.cache_dir = None
+        self.max_bytes = 256 * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.cache_dir = app.config.get('EXPORT_CACHE_DIR') or os.path.join(app.instance_path, 'export_cache')
+        self.max_bytes = app.config.get('EXPORT_CACHE_MAX_BYTES', self.max_bytes)
+
+    @staticmethod
+    def key(user_id, data_version, fmt, render_version):
+        raw = f"{int(user_id)}:{int(data_version)}:{fmt}:{render_version}"
+        return hashlib.sha256(raw.encode()).hexdigest() + '.' + fmt
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except (FileNotFoundError, TypeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def tee(self, key, chunks):
+        """Pass chunks through while writing them to the cache.
+
+        The file only becomes visible once the whole export has been produced;
+        if the client disconnects part way the partial file is discarded.
+        """
+        if self.max_bytes <= 0:
+            yield from chunks
+            return
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        partial_path = self._path(f"{key}.{uuid.uuid4().hex}.part")
+        completed = False
+        try:
+            with open(partial_path, 'wb') as artifact:
+                for chunk in chunks:
+                    artifact.write(chunk)
+                    yield chunk
+            os.replace(partial_path, self._path(key))
+            completed = True
+        finally:
+            if not completed and os.path.exists(partial_path):
+                os.remove(partial_path)
+
+        self.evict()
+
+    def store_file(self, key, source_path):
+        if self.max_bytes <= 0:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        partial_path = self._path(f"{key}.{uuid.uuid4().hex}.part")
+        try:
+            os.link(source_path, partial_path)
+        except OSError:
+            shutil.copyfile(source_path, partial_path)
+        os.replace(partial_path, self._path(key))
+        self.evict()
+
+    def evict(self):
+        with self._lock:
+            try:
+                entries = [entry for entry in os.scandir(self.cache_dir)
+                           if entry.is_file() and not entry.name.endswith('.part')]
+            except FileNotFoundError:
+                return
+
+            stats = [(entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in entries]
+            total = sum(size for _, size, _ in stats)
+            for _, size, path in sorted(stats):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'max_bytes': self.max_bytes}
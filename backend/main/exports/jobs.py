@@ -0,0 +1,213 @@
+import logging
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from .. import db
+from ..models import Users, ExportJob
+from ..models.token import utcnow
+from .pdf import stream_medical_data_pdf, RENDER_VERSION
+
+
+logger = logging.getLogger(__name__)
+
+
+class ExportQueueFull(Exception):
+    pass
+
+
+class ExportJobQueue:
+    """Runs PDF exports in a small process pool instead of inside the request.
+
+    Jobs are rows in export_job so any web worker can report status, and the
+    finished file is written under EXPORT_DIR. EXPORT_WORKERS caps the processes
+    per web worker and EXPORT_MAX_ACTIVE_JOBS caps queued + running jobs across
+    the deployment, so exports can't take the CPU the CRUD endpoints need.
+
+    A job still queued or running EXPORT_JOB_TIMEOUT_SECONDS after it was
+    queued / started (its worker crashed, or the pool was shut down) counts as
+    failed: it no longer holds its user's slot or a place in the global limit.
+    A finished export replaces the user's previous file, and `flask
+    prune-export-jobs` deletes files older than EXPORT_ARTIFACT_TTL_SECONDS.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._executor = None
+        self.workers = 2
+        self.max_active_jobs = 16
+        self.job_timeout_seconds = 1800
+        self.artifact_ttl_seconds = 86400
+        self.export_dir = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.workers = app.config.get('EXPORT_WORKERS', self.workers)
+        self.max_active_jobs = app.config.get('EXPORT_MAX_ACTIVE_JOBS', self.max_active_jobs)
+        self.job_timeout_seconds = app.config.get('EXPORT_JOB_TIMEOUT_SECONDS', self.job_timeout_seconds)
+        self.artifact_ttl_seconds = app.config.get('EXPORT_ARTIFACT_TTL_SECONDS', self.artifact_ttl_seconds)
+        self.export_dir = app.config.get('EXPORT_DIR') or os.path.join(app.instance_path, 'exports')
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: a forked child would share the parent's pooled db connections
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            return self._executor
+
+    def _stale_cutoff(self):
+        return utcnow() - timedelta(seconds=self.job_timeout_seconds)
+
+    def _active_job(self, user_id):
+        return ExportJob.query.filter(
+            ExportJob.id == user_id, ExportJob.status.in_(ExportJob.ACTIVE)
+        ).first()
+
+    def submit(self, user_id):
+        # one export at a time per user; asking again returns the job already in flight
+        existing = self._active_job(user_id)
+        if existing and not existing.is_stale(self._stale_cutoff()):
+            return existing
+        if existing:
+            _fail(existing, 'Export timed out')
+            db.session.commit()
+
+        # nothing changed since the last export: the job is done before it starts
+        from .. import export_cache
+        key = export_cache.key(user_id, Users.get_data_version(user_id), 'pdf', RENDER_VERSION)
+        cached_path = export_cache.get(key)
+        if cached_path:
+            now = utcnow()
+            job = ExportJob(job_id=uuid.uuid4().hex, id=user_id, status=ExportJob.DONE,
+                            artifact_path=cached_path, started_at=now, finished_at=now)
+            job.save()
+            return job
+
+        # stale jobs other users left behind don't count
+        active = ExportJob.query.filter(
+            ExportJob.status.in_(ExportJob.ACTIVE),
+            func.coalesce(ExportJob.started_at, ExportJob.created_at) >= self._stale_cutoff(),
+        ).count()
+        if active >= self.max_active_jobs:
+            raise ExportQueueFull('Too many exports in progress, try again later')
+
+        job = ExportJob(job_id=uuid.uuid4().hex, id=user_id, status=ExportJob.QUEUED)
+        try:
+            job.save()
+        except IntegrityError:
+            # a concurrent submit for the same user got in first (uq_export_job_user_active)
+            db.session.rollback()
+            existing = self._active_job(user_id)
+            if existing is None:
+                raise
+            return existing
+
+        try:
+            self._get_executor().submit(run_export_job, job.job_id, self.export_dir)
+        except Exception as e:
+            _fail(job, str(e))
+            db.session.commit()
+
+        return job
+
+    def prune(self):
+        """Fail stale jobs and delete export files past EXPORT_ARTIFACT_TTL_SECONDS.
+
+        Returns (jobs failed, files deleted).
+        """
+        cutoff = self._stale_cutoff()
+        stale = ExportJob.query.filter(
+            ExportJob.status.in_(ExportJob.ACTIVE),
+            func.coalesce(ExportJob.started_at, ExportJob.created_at) < cutoff,
+        ).all()
+        for job in stale:
+            _fail(job, 'Export timed out')
+
+        expired = ExportJob.query.filter(
+            ExportJob.artifact_path.isnot(None),
+            ExportJob.finished_at < utcnow() - timedelta(seconds=self.artifact_ttl_seconds),
+        ).all()
+        deleted = sum(_remove_artifact(job, self.export_dir) for job in expired)
+        db.session.commit()
+        return len(stale), deleted
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+def _fail(job, error):
+    job.status = ExportJob.FAILED
+    job.error = error
+    job.finished_at = utcnow()
+
+
+def _remove_artifact(job, export_dir):
+    # only files this queue wrote; a job served from the export cache points into the cache
+    path, job.artifact_path = job.artifact_path, None
+    if os.path.dirname(os.path.abspath(path)) != os.path.abspath(export_dir):
+        return False
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def run_export_job(job_id, export_dir):
+    # runs in a pool process, which imports its own copy of the app
+    from .. import app, export_cache
+
+    with app.app_context():
+        job = db.session.get(ExportJob, job_id)
+        if job is None or job.status != ExportJob.QUEUED:
+            return
+
+        job.status = ExportJob.RUNNING
+        job.started_at = utcnow()
+        db.session.commit()
+
+        path = os.path.join(export_dir, f"{job.job_id}.{job.format}")
+        partial_path = path + '.part'
+        try:
+            # version read before rendering: a write that lands mid-render bumps
+            # it, so the file can't be served for data it doesn't include
+            user = Users.get_principal(job.id)
+            cache_key = export_cache.key(job.id, Users.get_data_version(job.id), job.format, RENDER_VERSION)
+            os.makedirs(export_dir, exist_ok=True)
+            with open(partial_path, 'wb') as artifact:
+                for chunk in stream_medical_data_pdf(user):
+                    artifact.write(chunk)
+            os.replace(partial_path, path)
+            export_cache.store_file(cache_key, path)
+
+            job.status = ExportJob.DONE
+            job.artifact_path = path
+            # this file supersedes the user's earlier exports
+            previous = ExportJob.query.filter(
+                ExportJob.id == job.id, ExportJob.job_id != job.job_id, ExportJob.artifact_path.isnot(None),
+            ).all()
+            for old in previous:
+                _remove_artifact(old, export_dir)
+        except Exception as e:
+            logger.exception("Export job %s failed", job_id)
+            db.session.rollback()
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            job.status = ExportJob.FAILED
+            job.error = 'Error creating PDF file'
+
+        job.finished_at = utcnow()
+        db.session.commit()
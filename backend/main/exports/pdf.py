@@ -0,0 +1,201 @@
+import zlib
+
+from ..models import UserInfo, Labs, FoodLog, DailySymptoms, Treatments
+from ..utils import keyset_order
+
+
+# bump when the layout changes so cached exports are not reused
+RENDER_VERSION = 1
+
+# A4 in points
+PAGE_WIDTH = 595.27
+PAGE_HEIGHT = 841.89
+
+LEFT_MARGIN = 100
+TOP = 750
+BOTTOM = 50
+
+REGULAR = 'F1'
+BOLD = 'F2'
+
+# rows fetched per round trip; the ORM objects are dropped once their lines are drawn
+BATCH_SIZE = 500
+
+
+def _pdf_string(text):
+    # standard 14 fonts only cover latin-1, anything else is replaced
+    encoded = str(text).encode('latin-1', 'replace')
+    return b'(' + encoded.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+class StreamingPdfWriter:
+    """Minimal text-only PDF writer that hands back each page as soon as it is finished.
+
+    Only the current page's drawing operators and one byte offset per object are
+    held, so memory stays flat however long the document gets; the page tree and
+    xref table are written at the end.
+    """
+
+    CATALOG = 1
+    PAGES = 2
+    FONTS = {REGULAR: (3, b'Helvetica'), BOLD: (4, b'Helvetica-Bold')}
+
+    def __init__(self, page_width=PAGE_WIDTH, page_height=PAGE_HEIGHT):
+        self.page_width = page_width
+        self.page_height = page_height
+        self._offsets = {}
+        self._position = 0
+        self._next_object = 5
+        self._page_ids = []
+        self._content = []
+
+    def _object(self, number, body):
+        self._offsets[number] = self._position
+        data = b'%d 0 obj\n' % number + body + b'\nendobj\n'
+        self._position += len(data)
+        return data
+
+    def _raw(self, data):
+        self._position += len(data)
+        return data
+
+    def begin(self):
+        chunks = [self._raw(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')]
+        for number, base_font in self.FONTS.values():
+            chunks.append(self._object(
+                number,
+                b'<< /Type /Font /Subtype /Type1 /BaseFont /' + base_font + b' /Encoding /WinAnsiEncoding >>',
+            ))
+        return b''.join(chunks)
+
+    def draw_string(self, x, y, text, font=REGULAR, size=14):
+        self._content.append(b'BT /%s %d Tf %.2f %.2f Td %s Tj ET' % (
+            font.encode(), size, x, y, _pdf_string(text)
+        ))
+
+    def end_page(self):
+        content = zlib.compress(b'\n'.join(self._content))
+        self._content = []
+
+        content_id, page_id = self._next_object, self._next_object + 1
+        self._next_object += 2
+        self._page_ids.append(page_id)
+
+        fonts = b' '.join(b'/%s %d 0 R' % (name.encode(), number) for name, (number, _) in self.FONTS.items())
+        return self._object(
+            content_id,
+            b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(content) + content + b'\nendstream',
+        ) + self._object(
+            page_id,
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] /Resources << /Font << %s >> >> /Contents %d 0 R >>' % (
+                self.PAGES, self.page_width, self.page_height, fonts, content_id
+            ),
+        )
+
+    def close(self):
+        chunks = []
+        if self._content or not self._page_ids:
+            chunks.append(self.end_page())
+
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in self._page_ids)
+        chunks.append(self._object(self.PAGES, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self._page_ids))))
+        chunks.append(self._object(self.CATALOG, b'<< /Type /Catalog /Pages %d 0 R >>' % self.PAGES))
+
+        xref_position = self._position
+        size = self._next_object
+        xref = [b'xref\n0 %d\n' % size, b'0000000000 65535 f \n']
+        for number in range(1, size):
+            xref.append(b'%010d 00000 n \n' % self._offsets[number])
+        xref.append(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (size, self.CATALOG, xref_position))
+        chunks.append(self._raw(b''.join(xref)))
+        return b''.join(chunks)
+
+
+class _Layout:
+    # tracks the write position and starts a new page whenever a line would run off the bottom
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.y = TOP
+        self.finished = []
+
+    def skip(self, amount):
+        self.y -= amount
+
+    def line(self, text, font=REGULAR, size=14, advance=15):
+        if self.y < BOTTOM:
+            self.finished.append(self.writer.end_page())
+            self.y = TOP
+        self.writer.draw_string(LEFT_MARGIN, self.y, text, font, size)
+        self.y -= advance
+
+    def fields(self, data):
+        for data_name, value in data.items():
+            if 'id' not in data_name:
+                self.line(f"{data_name}: {value}")
+
+    def flush(self):
+        finished, self.finished = self.finished, []
+        return b''.join(finished)
+
+
+def _record_sections(user_id, batch_size):
+    yield 'food_logs', (
+        FoodLog.query.filter_by(id=user_id)
+        .order_by(*keyset_order(FoodLog.recorded_on, FoodLog.foodlog_id))
+        .yield_per(batch_size)
+    )
+    yield 'symptoms', (
+        DailySymptoms.query.filter_by(id=user_id)
+        .order_by(*keyset_order(DailySymptoms.recorded_on, DailySymptoms.symptoms_id))
+        .yield_per(batch_size)
+    )
+    yield 'treatments', (
+        Treatments.query.filter_by(id=user_id)
+        .order_by(*keyset_order(Treatments.scheduled_on, Treatments.treatment_id))
+        .yield_per(batch_size)
+    )
+
+
+def stream_medical_data_pdf(user, batch_size=BATCH_SIZE):
+    """Yield the "Medical Data" PDF for a user a page at a time.
+
+    Food logs, symptoms and treatments are read through yield_per (a server-side
+    cursor on postgres), so peak memory depends on the page and batch size, not
+    on how many records the user has.
+    """
+    # looked up before the first chunk so the caller can prime the generator
+    # and still turn a failure here into an error response
+    user_info = UserInfo.query.filter_by(id=user.id).first()
+    labs = Labs.query.filter_by(id=user.id).first()
+
+    writer = StreamingPdfWriter()
+    layout = _Layout(writer)
+    yield writer.begin()
+
+    writer.draw_string(LEFT_MARGIN, TOP, "Medical Data", BOLD, 26)
+    layout.y = 700
+
+    single_sections = [
+        ('person', {'first_name': user.first_name, 'last_name': user.last_name}),
+        ('info', user_info.to_dict() if user_info else None),
+        ('labs', labs.to_dict() if labs else None),
+    ]
+    for title, data in single_sections:
+        layout.line(title.capitalize(), BOLD, 16, advance=25)
+        if data:
+            layout.fields(data)
+        layout.skip(20)
+    yield layout.flush()
+
+    for title, rows in _record_sections(user.id, batch_size):
+        layout.line(title.capitalize(), BOLD, 16, advance=25)
+        for row in rows:
+            layout.skip(5)
+            layout.fields(row.to_dict())
+            if layout.finished:
+                yield layout.flush()
+        layout.skip(20)
+
+    yield layout.flush()
+    yield writer.close()
@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+
+from ..models import DailySymptoms, FoodLog, Treatments, Labs
+from ..utils import keyset_order
+
+
+# type name -> (model, sort column, primary key); order here is the export order
+EXPORT_TYPES = {
+    'symptoms': (DailySymptoms, DailySymptoms.recorded_on, DailySymptoms.symptoms_id),
+    'food_logs': (FoodLog, FoodLog.recorded_on, FoodLog.foodlog_id),
+    'treatments': (Treatments, Treatments.scheduled_on, Treatments.treatment_id),
+    'labs': (Labs, None, Labs.lab_id),
+}
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+BATCH_SIZE = 500
+# rows buffered before a chunk is handed to the server
+ROWS_PER_CHUNK = 200
+
+
+def parse_types(value):
+    if not value:
+        return list(EXPORT_TYPES)
+    types = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in types if name not in EXPORT_TYPES]
+    if unknown:
+        raise ValueError(f"Unknown type(s): {', '.join(unknown)}. Expected any of: {', '.join(EXPORT_TYPES)}")
+    # keep the canonical order and drop duplicates
+    return [name for name in EXPORT_TYPES if name in types]
+
+
+# columns to_dict() leaves out: the owner and the delta sync bookkeeping
+INTERNAL_COLUMNS = ('id', 'updated_at', 'change_seq')
+
+
+def field_names(model):
+    # the same field set (and order) to_dict() returns, read off the table
+    return [column.key for column in model.__table__.columns if column.key not in INTERNAL_COLUMNS]
+
+
+def _rows(user_id, type_name, batch_size):
+    model, sort_column, pk_column = EXPORT_TYPES[type_name]
+    return (
+        model.query.filter_by(id=user_id)
+        .order_by(*keyset_order(sort_column, pk_column))
+        .yield_per(batch_size)
+    )
+
+
+def stream_ndjson(user_id, types, batch_size=BATCH_SIZE):
+    """One JSON object per line, tagged with its record type."""
+    buffer = []
+    for type_name in types:
+        for row in _rows(user_id, type_name, batch_size):
+            buffer.append(json.dumps({'type': type_name, **row.to_dict()}))
+            if len(buffer) >= ROWS_PER_CHUNK:
+                yield '\n'.join(buffer) + '\n'
+                buffer = []
+    if buffer:
+        yield '\n'.join(buffer) + '\n'
+
+
+def stream_csv(user_id, types, batch_size=BATCH_SIZE):
+    """A single CSV: a record_type column plus the union of the types' fields."""
+    columns = []
+    for type_name in types:
+        for name in field_names(EXPORT_TYPES[type_name][0]):
+            if name not in columns:
+                columns.append(name)
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=['record_type'] + columns, extrasaction='ignore')
+    writer.writeheader()
+
+    pending = 0
+    for type_name in types:
+        for row in _rows(user_id, type_name, batch_size):
+            writer.writerow({'record_type': type_name, **row.to_dict()})
+            pending += 1
+            if pending >= ROWS_PER_CHUNK:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+    yield buffer.getvalue()
+
+
+def stream_records(user_id, fmt, types, batch_size=BATCH_SIZE):
+    if fmt == 'csv':
+        return stream_csv(user_id, types, batch_size)
+    return stream_ndjson(user_id, types, batch_size)
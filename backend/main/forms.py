@@ -1,6 +1,5 @@
-from marshmallow import (fields, Schema, validates, 
+from marshmallow import (fields, Schema, 
                          validates_schema, ValidationError, validate, EXCLUDE)
-from .models import Users
 
 
 
@@ -36,20 +35,9 @@ class RegistrationForm(Schema):
     password = fields.String(required=True, validate=[validate.Length(min=min_password_length,max=max_password_length, error = f"Password must be between {min_password_length} and {max_password_length} characters")], load_only=True)
     confirm_password = fields.String(required=True, validate=[validate.Length(min=min_password_length,max=max_password_length, error = f"Password must be between {min_password_length} and {max_password_length} characters")], load_only=True)
 
-    @validates('email')
-    def validate_email(self, data, **kwargs):
-        user = Users.query.filter_by(email = data).first()
-        
-        if user:
-            raise ValidationError("Email already exists")
-        
-    @validates('username')
-    def validate_username(self, data, **kwargs):
-        user = Users.query.filter_by(username = data).first()
-        
-        if user:
-            raise ValidationError('Username already exists')
-        
+    # taken usernames / emails are caught by the unique constraints on insert
+    # (see utils/provisioning.py), not by a query per field here
+
     @validates_schema
     def validate_password(self,data,**kwargs):
         if data['password'] != data['confirm_password']:
@@ -115,6 +103,22 @@ class UserInfoForm(Schema):
     insurance = fields.String(data_key='insurance')
 
 
+#Form for bulk provisioning: account fields (no confirm_password) plus optional user info
+class ProvisionUserForm(UserInfoForm):
+    class Meta(UserInfoForm.Meta):
+        # user_info ids are assigned on insert
+        exclude = ('user_info_id',)
+
+    first_name = fields.String(data_key='first_name',required=True, validate=[validate.Length(min =min_name_length, max=max_name_length,error=f"First name must be between {min_name_length} and {max_name_length} characters")])
+    last_name = fields.String(data_key='last_name', validate=[validate.Length(max=max_name_length, error=f'Last name must be less than {max_name_length}')])
+
+    username = fields.String(data_key='username', required=True, validate=[validate.Length(min=min_username_length, max=max_username_length, error= f"Username must be between {min_username_length} and {max_username_length} characters")])
+
+    email = fields.Email(data_key='email',required=True,validate=[validate.Length(min=min_email_length,max=max_email_length, error= f'Email must be between {min_email_length} and {max_email_length} characters')])
+
+    password = fields.String(required=True, validate=[validate.Length(min=min_password_length,max=max_password_length, error = f"Password must be between {min_password_length} and {max_password_length} characters")], load_only=True)
+
+
 class DailySymptomsForm(Schema):
 
     #SEVERITY
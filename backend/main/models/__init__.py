@@ -4,6 +4,9 @@ from .treatment import Treatments
 from .food_log import FoodLog
 from .lab import Labs
 from .token import TokenBlockList
+from .export_job import ExportJob
+from .rollup import DailyRollup
+from .change import DeletedRecord
 
 __all__ = [
     'Users',
@@ -12,6 +15,9 @@ __all__ = [
     'Treatments',
     'FoodLog',
     'Labs',
-    'TokenBlockList'
+    'TokenBlockList',
+    'ExportJob',
+    'DailyRollup',
+    'DeletedRecord',
 ]
 
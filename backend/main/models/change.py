@@ -0,0 +1,28 @@
+from sqlalchemy import Column, ForeignKey, BigInteger, String, DateTime, Index
+
+from .. import db
+from .columns import BigIntegerPK
+from .token import utcnow
+
+
+class DeletedRecord(db.Model):
+    """Tombstone for a deleted record, so delta sync can tell clients to drop it."""
+    tombstone_id = Column(BigIntegerPK, primary_key=True)
+    id = Column(BigInteger, ForeignKey('users.id'), nullable=False)
+    # same names as the export / changes payload: symptoms, food_logs, treatments, labs
+    record_type = Column(String(20), nullable=False)
+    record_id = Column(BigInteger, nullable=False)
+    change_seq = Column(BigInteger, nullable=False)
+    deleted_at = Column(DateTime(), default=utcnow)
+
+    __table_args__ = (
+        Index('ix_deleted_record_user_change', id, change_seq),
+    )
+
+    def to_dict(self):
+        return {
+            'type': self.record_type,
+            'id': self.record_id,
+            'change_seq': self.change_seq,
+            'deleted_at': self.deleted_at.isoformat() if self.deleted_at else None,
+        }
@@ -0,0 +1,6 @@
+from sqlalchemy import BigInteger, Integer
+
+
+# surrogate keys: BIGINT on PostgreSQL. SQLite only autoincrements a column declared
+# exactly INTEGER PRIMARY KEY (an alias of its 64-bit rowid), so that is what it gets there
+BigIntegerPK = BigInteger().with_variant(Integer(), 'sqlite')
@@ -0,0 +1,49 @@
+from sqlalchemy import Column, ForeignKey, BigInteger, String, Text, DateTime, Index
+
+from .. import db
+from .token import utcnow
+
+
+class ExportJob(db.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    ACTIVE = (QUEUED, RUNNING)
+
+    job_id = Column(String(32), primary_key=True)
+    id = Column(BigInteger, ForeignKey('users.id'), nullable=False)
+    status = Column(String(10), nullable=False, default=QUEUED)
+    format = Column(String(10), nullable=False, default='pdf')
+    artifact_path = Column(String(500))
+    error = Column(Text())
+    created_at = Column(DateTime(), default=utcnow)
+    started_at = Column(DateTime())
+    finished_at = Column(DateTime())
+
+    __table_args__ = (
+        Index('ix_export_job_user_status', id, status),
+        Index('ix_export_job_status', status),
+        # at most one queued / running export per user, also between concurrent submits
+        Index('uq_export_job_user_active', id, unique=True,
+              postgresql_where=status.in_(ACTIVE), sqlite_where=status.in_(ACTIVE)),
+    )
+
+    def is_stale(self, cutoff):
+        # queued or running since before cutoff: its worker died or the pool was shut down
+        return self.status in self.ACTIVE and (self.started_at or self.created_at) < cutoff
+
+    def save(self):
+        db.session.add(self)
+        db.session.commit()
+
+    def to_dict(self):
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'format': self.format,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
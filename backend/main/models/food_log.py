@@ -1,11 +1,13 @@
 from datetime import datetime, timezone
-from sqlalchemy import Column, ForeignKey, BigInteger, String, Float, Text, DateTime
+from sqlalchemy import Column, ForeignKey, BigInteger, String, Float, Text, DateTime, Index
 
 from .. import db
+from .columns import BigIntegerPK
+from .token import utcnow
 
 
 class FoodLog(db.Model):
-    foodlog_id = Column(BigInteger, primary_key=True)
+    foodlog_id = Column(BigIntegerPK, primary_key=True)
     id = Column(BigInteger, ForeignKey('users.id'), nullable=False)
     breakfast = Column(String(100))
     lunch = Column(String(100))
@@ -13,6 +15,18 @@ class FoodLog(db.Model):
     notes = Column(Text())
     total_calories = Column(Float, default=0.0)
     recorded_on = Column(DateTime(), default=datetime.now(timezone.utc))
+    updated_at = Column(DateTime(), default=utcnow, onupdate=utcnow)
+    # delta sync: users.data_version at the row's last write
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        # delta sync: WHERE id = ? AND change_seq > ?
+        Index('ix_food_log_user_change', id, change_seq),
+        # per-user listing: WHERE id = ? ORDER BY recorded_on DESC NULLS LAST, foodlog_id DESC
+        # (NULLS LAST in an index is postgres only)
+        Index('ix_food_log_user_recorded', id, recorded_on.desc().nullslast(), foodlog_id.desc())
+            .ddl_if(dialect='postgresql'),
+    )
 
     def save(self):
         db.session.add(self)
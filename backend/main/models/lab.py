@@ -1,15 +1,27 @@
-from sqlalchemy import Column, ForeignKey, BigInteger, Integer, Float
+from sqlalchemy import Column, ForeignKey, BigInteger, Integer, Float, DateTime, Index
 
 from .. import db
+from .columns import BigIntegerPK
+from .token import utcnow
 
 
 class Labs(db.Model):
-    lab_id = Column(BigInteger, primary_key=True)
+    lab_id = Column(BigIntegerPK, primary_key=True)
     id = Column(BigInteger, ForeignKey('users.id'), nullable=False)
     #Both systolic and diastolic are needed to calculate blood pressure
     systolic_pressure = Column(Integer, default=0)
     diastolic_pressure = Column(Integer, default=0)
     rbc_count = Column(Float())
+    updated_at = Column(DateTime(), default=utcnow, onupdate=utcnow)
+    # delta sync: users.data_version at the row's last write
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        # delta sync: WHERE id = ? AND change_seq > ?
+        Index('ix_labs_user_change', id, change_seq),
+        # per-user listing: WHERE id = ? ORDER BY lab_id DESC
+        Index('ix_labs_user_lab', id, lab_id.desc()),
+    )
 
     def save(self):
         db.session.add(self)
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, ForeignKey, BigInteger, Integer, Float, Date
+
+from .. import db
+
+
+class DailyRollup(db.Model):
+    # one row per user per day with symptoms or food logs; kept current by analytics/rollups.py
+    id = Column(BigInteger, ForeignKey('users.id'), primary_key=True)
+    day = Column(Date(), primary_key=True)
+    symptom_count = Column(Integer, nullable=False, default=0)
+    severity_sum = Column(Integer, nullable=False, default=0)
+    severity_max = Column(Integer)
+    # only entries with a recorded weight (> 0) count toward the mean
+    weight_sum = Column(Float, nullable=False, default=0.0)
+    weight_count = Column(Integer, nullable=False, default=0)
+    foodlog_count = Column(Integer, nullable=False, default=0)
+    calories_sum = Column(Float, nullable=False, default=0.0)
@@ -1,17 +1,31 @@
 from datetime import datetime, timezone
-from sqlalchemy import Column, ForeignKey, BigInteger, String, Integer, Float, Text, DateTime
+from sqlalchemy import Column, ForeignKey, BigInteger, String, Integer, Float, Text, DateTime, Index
 
 from .. import db
+from .columns import BigIntegerPK
+from .token import utcnow
 
 
 class DailySymptoms(db.Model):
-    symptoms_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    symptoms_id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     id = Column(BigInteger, ForeignKey('users.id'), nullable=False)
     severity = Column(Integer, default=0)
     type_of_symptom = Column(String(100), default='Not specified')
     weight_lbs = Column(Float, default=0.0)
     recorded_on = Column(DateTime(), default=datetime.now(timezone.utc))
     notes = Column(Text, default='Not provided')
+    updated_at = Column(DateTime(), default=utcnow, onupdate=utcnow)
+    # delta sync: users.data_version at the row's last write
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        # delta sync: WHERE id = ? AND change_seq > ?
+        Index('ix_daily_symptoms_user_change', id, change_seq),
+        # per-user listing: WHERE id = ? ORDER BY recorded_on DESC NULLS LAST, symptoms_id DESC
+        # (NULLS LAST in an index is postgres only)
+        Index('ix_daily_symptoms_user_recorded', id, recorded_on.desc().nullslast(), symptoms_id.desc())
+            .ddl_if(dialect='postgresql'),
+    )
 
     def save(self):
         db.session.add(self)
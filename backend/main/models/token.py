@@ -1,13 +1,22 @@
 from datetime import datetime, timezone
-from sqlalchemy import Column, BigInteger, String, DateTime
+from sqlalchemy import Column, String, DateTime
 
 from .. import db
+from .columns import BigIntegerPK
+
+
+def utcnow():
+    # naive UTC, matches the DateTime() columns
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 
 class TokenBlockList(db.Model):
-    id = Column(BigInteger(), primary_key=True)
-    jti = Column(String(64), nullable=False)
-    create_at = Column(DateTime(), default=datetime.now(timezone.utc))
+    id = Column(BigIntegerPK, primary_key=True)
+    jti = Column(String(64), nullable=False, index=True)
+    # revocation caches refresh on this (utils/revocation.py)
+    create_at = Column(DateTime(), default=utcnow, index=True)
+    # when the revoked token would have expired anyway; past this the row is dead weight
+    expires_at = Column(DateTime(), index=True)
 
     def __repr__(self):
         return f"<Token {self.jti}>"
@@ -16,3 +25,19 @@ class TokenBlockList(db.Model):
         db.session.add(self)
         db.session.commit()
 
+    @classmethod
+    def prune_expired(cls, max_token_age):
+        """Delete rows for tokens that can no longer be presented.
+
+        Rows written before expires_at existed fall back to create_at plus the
+        longest token lifetime.
+        """
+        now = utcnow()
+        deleted = cls.query.filter(
+            db.or_(
+                cls.expires_at < now,
+                db.and_(cls.expires_at.is_(None), cls.create_at < now - max_token_age),
+            )
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
@@ -1,15 +1,31 @@
-from sqlalchemy import Column, ForeignKey, BigInteger, String, Boolean, Text, DateTime
+from sqlalchemy import Column, ForeignKey, BigInteger, String, Boolean, Text, DateTime, Index
 
 from .. import db
+from .columns import BigIntegerPK
+from .token import utcnow
 
 
 class Treatments(db.Model):
-    treatment_id = Column(BigInteger, primary_key=True)
+    treatment_id = Column(BigIntegerPK, primary_key=True)
     id = Column(BigInteger, ForeignKey('users.id'), nullable=False)
     treatment_name = Column(String(100), default='Not provided')
     scheduled_on = Column(DateTime())
     notes = Column(Text(), default='Not provided')
     is_completed = Column(Boolean(), default=False)
+    updated_at = Column(DateTime(), default=utcnow, onupdate=utcnow)
+    # delta sync: users.data_version at the row's last write
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        # delta sync: WHERE id = ? AND change_seq > ?
+        Index('ix_treatments_user_change', id, change_seq),
+        # per-user listing: WHERE id = ? ORDER BY scheduled_on DESC NULLS LAST, treatment_id DESC
+        # (NULLS LAST in an index is postgres only)
+        Index('ix_treatments_user_scheduled', id, scheduled_on.desc().nullslast(), treatment_id.desc())
+            .ddl_if(dialect='postgresql'),
+        # upcoming / completed lookups: WHERE id = ? AND is_completed = ? ORDER BY scheduled_on
+        Index('ix_treatments_user_completed', id, is_completed, scheduled_on),
+    )
 
     def save(self):
         db.session.add(self)
@@ -1,29 +1,59 @@
-from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import Column, ForeignKey, BigInteger, String, Integer, Float, Text
+from sqlalchemy import Column, ForeignKey, BigInteger, String, Integer, Float, Text, Index, update
 from sqlalchemy.orm import relationship
 
 from .. import db
+from .columns import BigIntegerPK
+from ..utils.passwords import current_password_hasher
 
 
 class Users(db.Model):
-    id = Column(BigInteger, primary_key=True)
+    id = Column(BigIntegerPK, primary_key=True)
     first_name = Column(String(30), nullable=False)
     last_name = Column(String(30))
     username = Column(String(50), unique=True, nullable=False)
     email = Column(String(150), unique=True, nullable=False)
     password_hash = Column(String(255), nullable=False)
+    # bumped in the same transaction as any write to this user's records (see utils/versioning.py)
+    data_version = Column(BigInteger, nullable=False, default=0, server_default='0')
 
-    user_info = relationship('UserInfo', backref='users', lazy='joined', uselist=False)
-    symptoms = relationship('DailySymptoms', backref='users', lazy='selectin')
-    treatments = relationship('Treatments', backref='users', lazy='selectin')
-    food_logs = relationship('FoodLog', backref='users', lazy='selectin')
-    labs = relationship('Labs', backref='users', lazy='selectin')
+    # loaded on access only; endpoints that need them ask with loader options
+    # (e.g. joinedload(Users.user_info)) so fetching a user stays one query
+    user_info = relationship('UserInfo', backref='users', lazy='select', uselist=False)
+    symptoms = relationship('DailySymptoms', backref='users', lazy='select')
+    treatments = relationship('Treatments', backref='users', lazy='select')
+    food_logs = relationship('FoodLog', backref='users', lazy='select')
+    labs = relationship('Labs', backref='users', lazy='select')
+
+    @classmethod
+    def get_principal(cls, user_id):
+        # lean projection for authorization: account columns only, no password hash or relationships.
+        # the row is immutable and detached from the session, so it can be cached across requests
+        return (
+            db.session.query(cls.id, cls.first_name, cls.last_name, cls.username, cls.email)
+            .filter_by(id=user_id)
+            .one_or_none()
+        )
+
+    @classmethod
+    def get_data_version(cls, user_id):
+        return db.session.query(cls.data_version).filter_by(id=user_id).scalar()
+
+    @classmethod
+    def get_credentials(cls, **filters):
+        # (id, password_hash) for sign-in, without loading the account
+        return db.session.query(cls.id, cls.password_hash).filter_by(**filters).first()
+
+    @classmethod
+    def replace_password_hash(cls, user_id, password_hash):
+        # Core UPDATE: nothing is flushed, so the versioning hook leaves data_version alone
+        # (the hash isn't user data, and a bump would invalidate ETags, caches and sync cursors)
+        db.session.execute(update(cls).where(cls.id == user_id).values(password_hash=password_hash))
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = current_password_hasher().hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return current_password_hasher().verify(self.password_hash, password)
     
     def to_dict(self):
         return {
@@ -40,7 +70,7 @@ class Users(db.Model):
 
 
 class UserInfo(db.Model):
-    user_info_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    user_info_id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     id = Column(BigInteger, ForeignKey('users.id'), nullable=False)
     age = Column(Integer, default=0)
     gender = Column(String(10), default='Other')
@@ -51,6 +81,10 @@ class UserInfo(db.Model):
     medical_history = Column(Text(), default='')
     insurance = Column(Text(), default='')
 
+    __table_args__ = (
+        Index('ix_user_info_user', id),
+    )
+
     def save(self):
         db.session.add(self)
         db.session.commit()
@@ -1,4 +1,8 @@
-from flask import Blueprint, request, jsonify
+import hmac
+from datetime import datetime, timezone
+from itertools import chain
+
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import (
     create_access_token, 
     create_refresh_token,
@@ -6,10 +10,14 @@ from flask_jwt_extended import (
     get_jwt, 
     get_jwt_identity
 )
+from sqlalchemy.exc import IntegrityError
 
-from ..models import Users, TokenBlockList, UserInfo
-from ..forms import RegistrationForm, LoginFormEmail, LoginFormUsername, UserInfoForm, ValidationError
-from .. import db
+from ..models import Users, TokenBlockList
+from ..forms import RegistrationForm, LoginFormEmail, LoginFormUsername, UserInfoForm, ProvisionUserForm, ValidationError
+from .. import db, revocation_cache, password_hasher
+from ..utils import PasswordHasherBusy, read_bulk_items, bulk_response, BulkRequestError
+from ..utils import insert_user, taken_fields, conflict_errors, provision_users
+from ..utils.provisioning import INFO_FIELDS
 
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
@@ -31,47 +39,105 @@ def register():
                 error_messages.append(str(messages))
         return jsonify({"error": "\n".join(error_messages)}), 400
 
+    user_info_data = {k: v for k, v in json_data.items() if k in INFO_FIELDS and v is not None}
+    user_info_validate = None
+    if user_info_data:
+        try:
+            user_info_validate = UserInfoForm(partial=True).load(user_info_data)
+        except ValidationError:
+            pass
+
     try:
-        user = Users(
-            first_name=user_validate['first_name'],
-            last_name=user_validate.get('last_name'),
-            username=user_validate['username'],
-            email=user_validate['email']
+        # hashed before the transaction opens so no connection is held while it runs
+        password_hash = password_hasher.hash(user_validate['password'])
+        insert_user(
+            {
+                'first_name': user_validate['first_name'],
+                'last_name': user_validate.get('last_name'),
+                'username': user_validate['username'],
+                'email': user_validate['email'],
+                'password_hash': password_hash,
+            },
+            user_info_validate,
         )
-        user.set_password(user_validate['password'])
-        db.session.add(user)
-        db.session.flush()
-
-        user_info_fields = ['age', 'gender', 'weight_lbs', 'height_ft', 'height_in', 
-                           'current_diagnoses', 'medical_history', 'insurance']
-        user_info_data = {k: v for k, v in json_data.items() if k in user_info_fields and v is not None}
-        
-        if user_info_data:
-            user_info_schema = UserInfoForm(partial=True)
-            try:
-                user_info_validate = user_info_schema.load(user_info_data)
-                user_info = UserInfo(
-                    id=user.id,
-                    age=user_info_validate.get('age', 0),
-                    gender=user_info_validate.get('gender', 'Other'),
-                    weight_lbs=user_info_validate.get('weight_lbs', 0.0),
-                    height_ft=user_info_validate.get('height_ft', 0),
-                    height_in=user_info_validate.get('height_in', 0),
-                    current_diagnoses=user_info_validate.get('current_diagnoses', ''),
-                    medical_history=user_info_validate.get('medical_history', ''),
-                    insurance=user_info_validate.get('insurance', '')
-                )
-                db.session.add(user_info)
-            except ValidationError:
-                pass
-
         db.session.commit()
         return jsonify({"message": "User created successfully"}), 201
+    except IntegrityError:
+        # no lookups up front: the unique constraints decide, then one query says which
+        db.session.rollback()
+        taken_usernames, taken_emails = taken_fields([user_validate['username']], [user_validate['email']])
+        errors = conflict_errors(user_validate['username'], user_validate['email'], taken_usernames, taken_emails)
+        if not errors:
+            # some other constraint failed, not a taken username or email
+            return jsonify({"error": "Failed to create user"}), 500
+        return jsonify({"error": "\n".join(chain.from_iterable(errors.values()))}), 400
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return _busy_response()
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": f"Failed to create user: {str(e)}"}), 500
 
 
+@auth_bp.route('/provision-users', methods=['POST'])
+def provision():
+    # clinic onboarding: enabled by setting PROVISIONING_TOKEN, sent as X-Provisioning-Token
+    expected = current_app.config.get('PROVISIONING_TOKEN')
+    if not expected:
+        return jsonify({"error": "Provisioning is disabled"}), 404
+    if not hmac.compare_digest(request.headers.get('X-Provisioning-Token', ''), expected):
+        return jsonify({"error": "Access Denied"}), 403
+
+    try:
+        results, created = provision_users(
+            ProvisionUserForm(), read_bulk_items(), current_app.config.get('PROVISION_MAX_USERS', 5000)
+        )
+    except BulkRequestError as error:
+        db.session.rollback()
+        return jsonify({"error": str(error)}), 400
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return _busy_response()
+
+    return bulk_response(results, created, 'users')
+
+
+def _busy_response():
+    return jsonify({"error": "Too many sign-in attempts right now, please retry"}), 503, {"Retry-After": "1"}
+
+
+def _login(credentials, password, error_message):
+    # end the read transaction so no connection is held while the check waits for the hasher
+    db.session.rollback()
+    try:
+        if credentials is None:
+            # same hashing work as a wrong password, so unknown accounts don't answer faster
+            password_hasher.verify_dummy(password)
+            return jsonify({"error": error_message}), 401
+
+        if not password_hasher.verify(credentials.password_hash, password):
+            return jsonify({"error": error_message}), 401
+
+        # hashed under an older cost policy: upgrade while we have the plaintext
+        if password_hasher.needs_rehash(credentials.password_hash):
+            Users.replace_password_hash(credentials.id, password_hasher.hash(password))
+            db.session.commit()
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return _busy_response()
+
+    access_token = create_access_token(identity=str(credentials.id))
+    refresh_token = create_refresh_token(identity=str(credentials.id))
+
+    return jsonify({
+        "message": "Login Successful",
+        "tokens": {
+            "access": access_token,
+            "refresh": refresh_token
+        }
+    }), 200
+
+
 @auth_bp.route('/login-email', methods=['POST'])
 def login_email():
     schema = LoginFormEmail()
@@ -87,21 +153,8 @@ def login_email():
                 error_messages.append(str(messages))
         return jsonify({"error": " ".join(error_messages)}), 400
 
-    user = Users.query.filter_by(email=validate['email']).first()
-
-    if user and user.check_password(password=validate['password']):
-        access_token = create_access_token(identity=str(user.id))
-        refresh_token = create_refresh_token(identity=str(user.id))
-
-        return jsonify({
-            "message": "Login Successful",
-            "tokens": {
-                "access": access_token,
-                "refresh": refresh_token
-            }
-        }), 200
-    
-    return jsonify({"error": "Invalid email or password"}), 401
+    credentials = Users.get_credentials(email=validate['email'])
+    return _login(credentials, validate['password'], "Invalid email or password")
 
 
 @auth_bp.route('/login-username', methods=['POST'])
@@ -119,21 +172,8 @@ def login_username():
                 error_messages.append(str(messages))
         return jsonify({"error": " ".join(error_messages)}), 400
 
-    user = Users.query.filter_by(username=validate['username']).first()
-
-    if user and user.check_password(password=validate['password']):
-        access_token = create_access_token(identity=str(user.id))
-        refresh_token = create_refresh_token(identity=str(user.id))
-
-        return jsonify({
-            "message": "Login Successful",
-            "tokens": {
-                "access": access_token,
-                "refresh": refresh_token
-            }
-        }), 200
-    
-    return jsonify({"error": "Invalid username or password"}), 401
+    credentials = Users.get_credentials(username=validate['username'])
+    return _login(credentials, validate['password'], "Invalid username or password")
 
 
 @auth_bp.route('/logout', methods=['GET'])
@@ -143,8 +183,11 @@ def logout():
     jti = jwt['jti']
     token_type = jwt['type']
 
-    token_block = TokenBlockList(jti=jti)
+    expires_at = datetime.fromtimestamp(jwt['exp'], timezone.utc).replace(tzinfo=None) if 'exp' in jwt else None
+
+    token_block = TokenBlockList(jti=jti, expires_at=expires_at)
     token_block.save()
+    revocation_cache.add(jti, expires_at)
 
     return jsonify({"message": f"{token_type} token revoked successfully"}), 200
 
@@ -155,7 +198,7 @@ def refresh_access():
     identity = get_jwt_identity()
     current_user_id = int(identity)
     
-    user = Users.query.get(current_user_id)
+    user = Users.get_principal(current_user_id)
     if not user:
         return jsonify({"error": "User does not exist"}), 404
 
@@ -1,60 +1,80 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
 from backend.main import db
-from ..models import Users, FoodLog
+from ..models import FoodLog
 from ..forms import FoodLogForm, ValidationError
+from ..utils import keyset_paginate, keyset_order, CursorError, user_access_required, conditional_get, cached_response, bulk_ingest, Projection, FieldsError
+from ..analytics import food_correlations
 
 
 food_logs_bp = Blueprint('food_logs', __name__, url_prefix='/api/user/<int:id>')
 
+# GETs read just the dumped columns, or the ?fields= subset (see utils/projection.py)
+foodlog_rows = Projection(FoodLog, FoodLogForm)
 
-def verify_user_access(user_id):
-    current_user_id = int(get_jwt_identity())
-    user = Users.query.get(user_id)
-    
-    if not user:
-        return None, (jsonify({"error": "User does not exist"}), 404)
-    
-    if current_user_id != user.id:
-        return None, (jsonify({"error": "Access Denied"}), 403)
-    
-    return user, None
 
 
 @food_logs_bp.route('/food-logs/<int:foodlog_id>', methods=['GET'])
-@jwt_required()
+@user_access_required
+@conditional_get
 def get_foodlog(id, foodlog_id):
-    user, error = verify_user_access(id)
-    if error:
-        return error
+    try:
+        rows = foodlog_rows.only(request.args.get('fields'))
+    except FieldsError as error:
+        return jsonify({"error": str(error)}), 400
 
-    foodlog = FoodLog.query.filter_by(id=id, foodlog_id=foodlog_id).first()
+    foodlog = rows.query().filter(FoodLog.id == id, FoodLog.foodlog_id == foodlog_id).first()
 
-    if not foodlog:
+    if foodlog is None:
         return jsonify({"error": "Foodlog not found"}), 404
     
-    return jsonify({'foodlog': foodlog.to_dict()}), 200
+    return jsonify({'foodlog': rows.serialize(foodlog)}), 200
 
 
 @food_logs_bp.route('/food-logs', methods=['GET'])
-@jwt_required()
+@user_access_required
+@cached_response
+@conditional_get
 def get_all_foodlogs(id):
-    user, error = verify_user_access(id)
-    if error:
-        return error
-    
     page = request.args.get('page', default=1, type=int)
     per_page = request.args.get('per_page', default=20, type=int)
 
-    foodlogs = FoodLog.query.filter_by(id=id)
+    try:
+        rows = foodlog_rows.only(request.args.get('fields'))
+    except FieldsError as error:
+        return jsonify({"error": str(error)}), 400
+
+    # cursors are built from the keyset columns, so a cursor page always reads those
+    required = (FoodLog.recorded_on, FoodLog.foodlog_id) if 'cursor' in request.args else ()
+    foodlogs = rows.query(*required).filter(FoodLog.id == id)
 
-    foodlogs_all = foodlogs.paginate(
+    # ?cursor= opts into keyset pagination (no OFFSET, no COUNT)
+    if 'cursor' in request.args:
+        try:
+            items, next_cursor, prev_cursor = keyset_paginate(
+                foodlogs,
+                FoodLog.recorded_on,
+                FoodLog.foodlog_id,
+                cursor=request.args.get('cursor'),
+                per_page=per_page,
+            )
+        except CursorError as error:
+            return jsonify({"error": str(error)}), 400
+
+        return jsonify({
+            "foodlogs": rows.dump_many(items),
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
+        }), 200
+
+    foodlogs_all = foodlogs.order_by(
+        *keyset_order(FoodLog.recorded_on, FoodLog.foodlog_id)
+    ).paginate(
         page=page,
         per_page=per_page,
         error_out=False
     )
 
-    result = FoodLogForm().dump(foodlogs_all.items, many=True)
+    result = rows.dump_many(foodlogs_all.items)
 
     return jsonify({
         "foodlogs": result,
@@ -65,13 +85,9 @@ def get_all_foodlogs(id):
 
 
 @food_logs_bp.route('/food-logs', methods=['POST'])
-@jwt_required()
+@user_access_required
 def add_foodlog(id):
     try:
-        user, error = verify_user_access(id)
-        if error:
-            return error
-        
         schema = FoodLogForm()
         
         try:
@@ -96,15 +112,24 @@ def add_foodlog(id):
     except Exception:
         db.session.rollback()
         return jsonify({"error": "Failed to add food log"}), 500
+
+
+@food_logs_bp.route('/food-logs/bulk', methods=['POST'])
+@user_access_required
+def bulk_add_foodlogs(id):
+    return bulk_ingest(
+        FoodLog,
+        FoodLog.foodlog_id,
+        FoodLogForm(),
+        ('breakfast', 'lunch', 'dinner', 'notes', 'total_calories', 'recorded_on'),
+        id,
+        'food logs',
+    )
     
 
 @food_logs_bp.route('/food-logs/<int:foodlog_id>/edit', methods = ['PATCH'])
-@jwt_required()
+@user_access_required
 def edit_foodlog(id, foodlog_id):
-    user, error = verify_user_access(id)
-    if error:
-        return error
-
     foodlog = FoodLog.query.filter_by(id=id, foodlog_id=foodlog_id).first()
     if foodlog is None:
         return jsonify({'error': 'Foodlog does not exist'}), 404
@@ -130,12 +155,8 @@ def edit_foodlog(id, foodlog_id):
 
 
 @food_logs_bp.route('/food-logs/<int:foodlog_id>/delete', methods = ['DELETE'])
-@jwt_required()
+@user_access_required
 def delete_foodlog(id, foodlog_id):
-    user, error = verify_user_access(id)
-    if error:
-        return error
-
     foodlog = FoodLog.query.filter_by(id=id, foodlog_id=foodlog_id).first()
     if foodlog is None:
         return jsonify({'error': 'Food Log does not exist'}), 404
@@ -149,3 +170,16 @@ def delete_foodlog(id, foodlog_id):
         return jsonify({'error': 'Failed to delete Food Log'}), 500
     
 
+
+@food_logs_bp.route('/food-logs/correlations', methods=['GET'])
+@user_access_required
+@conditional_get
+def get_food_correlations(id):
+    min_occurrences = request.args.get('min_occurrences', default=3, type=int)
+    limit = request.args.get('limit', default=20, type=int)
+    if min_occurrences < 1 or limit < 1:
+        return jsonify({"error": "min_occurrences and limit must be positive"}), 400
+
+    # cached per users.data_version, so repeat calls cost a single query
+    result = food_correlations(id, min_occurrences)
+    return jsonify({**result, 'foods': result['foods'][:limit]}), 200
@@ -1,57 +1,75 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
 
-from ..models import Users, Labs
+from ..models import Labs
 from ..forms import LabsForm, ValidationError
+from ..utils import keyset_paginate, keyset_order, CursorError, user_access_required, conditional_get, cached_response, bulk_ingest, Projection, FieldsError
 
 labs_bp = Blueprint('labs', __name__, url_prefix='/api/user/<int:id>')
 
-def verify_user_access(user_id):
-    current_user_id = int(get_jwt_identity())
-    user = Users.query.get(user_id)
-    
-    if not user:
-        return None, (jsonify({"error": "User does not exist"}), 404)
-    
-    if current_user_id != user.id:
-        return None, (jsonify({"error": "Access Denied"}), 403)
-    
-    return user, None
+# GETs read just the dumped columns, or the ?fields= subset (see utils/projection.py)
+lab_rows = Projection(Labs, LabsForm)
 
 
 @labs_bp.route('/labs/<int:lab_id>', methods=['GET'])
-@jwt_required()
+@user_access_required
+@conditional_get
 def get_lab(id, lab_id):
-    user, error = verify_user_access(id)
-    if error:
-        return error
-    
-    lab = Labs.query.filter_by(id=id, lab_id=lab_id).first()
+    try:
+        rows = lab_rows.only(request.args.get('fields'))
+    except FieldsError as error:
+        return jsonify({"error": str(error)}), 400
+
+    lab = rows.query().filter(Labs.id == id, Labs.lab_id == lab_id).first()
 
-    if not lab:
+    if lab is None:
         return jsonify({"error": "Lab entry not found"}), 404
     
-    return jsonify({'lab': lab.to_dict()}), 200
+    return jsonify({'lab': rows.serialize(lab)}), 200
 
 
 @labs_bp.route('/labs', methods=['GET'])
-@jwt_required()
+@user_access_required
+@cached_response
+@conditional_get
 def get_labs_all(id):
-    user, error = verify_user_access(id)
-    if error:
-        return error
-    
     page = request.args.get('page', default=1, type=int)
     per_page = request.args.get('per_page', default=20, type=int)
     
-    all_labs = Labs.query.filter_by(id=id)
+    try:
+        rows = lab_rows.only(request.args.get('fields'))
+    except FieldsError as error:
+        return jsonify({"error": str(error)}), 400
 
-    labs = all_labs.paginate(
+    # cursors are built from the keyset columns, so a cursor page always reads those
+    required = (Labs.lab_id,) if 'cursor' in request.args else ()
+    all_labs = rows.query(*required).filter(Labs.id == id)
+
+    # ?cursor= opts into keyset pagination (no OFFSET, no COUNT)
+    # labs have no date column so they are keyed on lab_id alone
+    if 'cursor' in request.args:
+        try:
+            items, next_cursor, prev_cursor = keyset_paginate(
+                all_labs,
+                None,
+                Labs.lab_id,
+                cursor=request.args.get('cursor'),
+                per_page=per_page,
+            )
+        except CursorError as error:
+            return jsonify({"error": str(error)}), 400
+
+        return jsonify({
+            "labs": rows.dump_many(items),
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
+        }), 200
+
+    labs = all_labs.order_by(*keyset_order(None, Labs.lab_id)).paginate(
         page=page,
         per_page=per_page
     )
 
-    result = LabsForm().dump(labs.items, many=True)
+    result = rows.dump_many(labs.items)
 
     return jsonify({
         "labs": result,
@@ -62,13 +80,9 @@ def get_labs_all(id):
 
 
 @labs_bp.route('/labs', methods=['POST'])
-@jwt_required()
+@user_access_required
 def add_lab(id):
     try:
-        user, error = verify_user_access(id)
-        if error:
-            return error
-    
         schema = LabsForm()
 
         try:
@@ -88,3 +102,16 @@ def add_lab(id):
         
     except Exception as e:
         return jsonify({"error": "Failed to log lab entry"}), 500
+
+
+@labs_bp.route('/labs/bulk', methods=['POST'])
+@user_access_required
+def bulk_add_labs(id):
+    return bulk_ingest(
+        Labs,
+        Labs.lab_id,
+        LabsForm(),
+        ('systolic_pressure', 'diastolic_pressure', 'rbc_count'),
+        id,
+        'lab entries',
+    )
@@ -1,58 +1,77 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
 from backend.main import db
-from ..models import Users, DailySymptoms
+from ..models import DailySymptoms
 from ..forms import DailySymptomsForm, ValidationError
+from ..utils import keyset_paginate, keyset_order, CursorError, user_access_required, conditional_get, cached_response, bulk_ingest, Projection, FieldsError
 
 symptoms_bp = Blueprint('symptoms', __name__, url_prefix='/api/user/<int:id>')
 
-def verify_user_access(user_id):
-    current_user_id = int(get_jwt_identity())
-    user = Users.query.get(user_id)
-    
-    if not user:
-        return None, (jsonify({"error": "User does not exist"}), 404)
-    
-    if current_user_id != user.id:
-        return None, (jsonify({"error": "Access Denied"}), 403)
-    
-    return user, None
+# GETs read just the dumped columns, or the ?fields= subset (see utils/projection.py)
+symptom_rows = Projection(DailySymptoms, DailySymptomsForm)
 
 
 @symptoms_bp.route('/symptom/<int:symptom_id>', methods=['GET'])
-@jwt_required()
+@user_access_required
+@conditional_get
 def get_symptom(id, symptom_id):
-    user, error = verify_user_access(id)
-    if error:
-        return error
-    
-    symptom = DailySymptoms.query.filter_by(id=id, symptoms_id=symptom_id).first()
+    try:
+        rows = symptom_rows.only(request.args.get('fields'))
+    except FieldsError as error:
+        return jsonify({"error": str(error)}), 400
+
+    symptom = rows.query().filter(DailySymptoms.id == id, DailySymptoms.symptoms_id == symptom_id).first()
 
-    if not symptom:
+    if symptom is None:
         return jsonify({"error": "Symptom not found"}), 404
     
-    return jsonify({'symptom': symptom.to_dict()}), 200
+    return jsonify({'symptom': rows.serialize(symptom)}), 200
 
 
 @symptoms_bp.route('/my-symptoms', methods=['GET'])
-@jwt_required()
+@user_access_required
+@cached_response
+@conditional_get
 def get_symptoms_all(id):
-    user, error = verify_user_access(id)
-    if error:
-        return error
-    
     page = request.args.get('page', default=1, type=int)
     per_page = request.args.get('per_page', default=20, type=int)
     
-    all_symptoms = DailySymptoms.query.filter_by(id=id)
+    try:
+        rows = symptom_rows.only(request.args.get('fields'))
+    except FieldsError as error:
+        return jsonify({"error": str(error)}), 400
+
+    # cursors are built from the keyset columns, so a cursor page always reads those
+    required = (DailySymptoms.recorded_on, DailySymptoms.symptoms_id) if 'cursor' in request.args else ()
+    all_symptoms = rows.query(*required).filter(DailySymptoms.id == id)
 
-    symptoms = all_symptoms.paginate(
+    # ?cursor= opts into keyset pagination (no OFFSET, no COUNT)
+    if 'cursor' in request.args:
+        try:
+            items, next_cursor, prev_cursor = keyset_paginate(
+                all_symptoms,
+                DailySymptoms.recorded_on,
+                DailySymptoms.symptoms_id,
+                cursor=request.args.get('cursor'),
+                per_page=per_page,
+            )
+        except CursorError as error:
+            return jsonify({"error": str(error)}), 400
+
+        return jsonify({
+            "symptoms": rows.dump_many(items),
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
+        }), 200
+
+    symptoms = all_symptoms.order_by(
+        *keyset_order(DailySymptoms.recorded_on, DailySymptoms.symptoms_id)
+    ).paginate(
         page=page,
         per_page=per_page,
         error_out=False
     )
 
-    result = DailySymptomsForm().dump(symptoms.items, many=True)
+    result = rows.dump_many(symptoms.items)
 
     return jsonify({
         "symptoms": result,
@@ -63,13 +82,9 @@ def get_symptoms_all(id):
 
 
 @symptoms_bp.route('/symptom/add', methods=['POST'])
-@jwt_required()
+@user_access_required
 def add_symptoms(id):
     try:
-        user, error = verify_user_access(id)
-        if error:
-            return error
-    
         schema = DailySymptomsForm()
 
         try:
@@ -92,16 +107,25 @@ def add_symptoms(id):
     except Exception:
         db.session.rollback()
         return jsonify({"error": "Failed to log symptom"}), 500
+
+
+@symptoms_bp.route('/symptom/bulk-add', methods=['POST'])
+@user_access_required
+def bulk_add_symptoms(id):
+    return bulk_ingest(
+        DailySymptoms,
+        DailySymptoms.symptoms_id,
+        DailySymptomsForm(),
+        ('severity', 'type_of_symptom', 'weight_lbs', 'notes', 'recorded_on'),
+        id,
+        'symptoms',
+    )
     
 
 
 @symptoms_bp.route('/symptom/<int:symptom_id>/delete', methods = ["DELETE"])
-@jwt_required()
+@user_access_required
 def delete_symptom(id, symptom_id):
-    user, error = verify_user_access(id)
-    if error:
-        return error
-    
     symptom_query = DailySymptoms.query.filter_by(id=id, symptoms_id=symptom_id).first()
 
     if symptom_query is None:
@@ -118,12 +142,8 @@ def delete_symptom(id, symptom_id):
 
     
 @symptoms_bp.route('/symptom/<int:symptom_id>/edit', methods = ['PATCH'])
-@jwt_required()
+@user_access_required
 def edit_symptom(id, symptom_id):
-    user, error = verify_user_access(id)
-    if error:
-        return error
-    
     symptom = DailySymptoms.query.filter_by(id=id, symptoms_id=symptom_id).first()
     if symptom is None:
         return jsonify({'error': 'Symptom not found'}), 404
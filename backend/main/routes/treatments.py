@@ -1,61 +1,76 @@
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
 from backend.main import db
 from backend.main.forms import TreatmentsForm
-from backend.main.models.user import Users
 from backend.main.models.treatment import Treatments
+from backend.main.utils import keyset_paginate, keyset_order, CursorError, user_access_required, conditional_get, cached_response, bulk_ingest, Projection, FieldsError
 
 treatments_bp = Blueprint("treatments", __name__, url_prefix="/api/user/<int:id>")
 
-# Access-control helper copied to match existing pattern in symptoms/food_logs
-def verify_user_access(user_id):
-    try:
-        current_user_id = int(get_jwt_identity())
-    except Exception:
-        return None, ({"error": "Invalid token"}, 401)
-
-    user = Users.query.get(user_id)
-    if not user:
-        return None, ({"error": "User does not exist"}, 404)
-    if user.id != current_user_id:
-        return None, ({"error": "Access Denied"}, 403)
-    return user, None
+# GETs read just the dumped columns, or the ?fields= subset (see utils/projection.py)
+treatment_rows = Projection(Treatments, TreatmentsForm)
 
 
 @treatments_bp.get("/treatments/<int:treatment_id>")
-@jwt_required()
+@user_access_required
+@conditional_get
 def get_treatment(id, treatment_id):
-    _, err = verify_user_access(id)
-    if err:
-        return err
+    try:
+        rows = treatment_rows.only(request.args.get("fields"))
+    except FieldsError as e:
+        return {"error": str(e)}, 400
 
-    treatment = Treatments.query.filter_by(id=id, treatment_id=treatment_id).first()
-    if not treatment:
+    treatment = rows.query().filter(Treatments.id == id, Treatments.treatment_id == treatment_id).first()
+    if treatment is None:
         return {"error": "Treatment not found"}, 404
 
-    data = TreatmentsForm().dump(treatment)
-    return {"treatment": data}, 200
+    return {"treatment": rows.serialize(treatment)}, 200
 
 
 @treatments_bp.get("/treatments")
-@jwt_required()
+@user_access_required
+@cached_response
+@conditional_get
 def list_treatments(id):
-    _, err = verify_user_access(id)
-    if err:
-        return err
-
     try:
         page = int(request.args.get("page", 1))
         per_page = int(request.args.get("per_page", 20))
     except ValueError:
         return {"error": "Invalid pagination params"}, 400
 
+    try:
+        rows = treatment_rows.only(request.args.get("fields"))
+    except FieldsError as e:
+        return {"error": str(e)}, 400
+
+    # cursors are built from the keyset columns, so a cursor page always reads those
+    required = (Treatments.scheduled_on, Treatments.treatment_id) if "cursor" in request.args else ()
+    query = rows.query(*required).filter(Treatments.id == id)
+
+    # ?cursor= opts into keyset pagination (no OFFSET, no COUNT)
+    if "cursor" in request.args:
+        try:
+            items, next_cursor, prev_cursor = keyset_paginate(
+                query,
+                Treatments.scheduled_on,
+                Treatments.treatment_id,
+                cursor=request.args.get("cursor"),
+                per_page=per_page,
+            )
+        except CursorError as e:
+            return {"error": str(e)}, 400
+
+        return {
+            "treatments": rows.dump_many(items),
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
+        }, 200
+
     pagination = (
-        Treatments.query.filter_by(id=id)
-        .order_by(Treatments.scheduled_on.desc().nullslast())
+        query
+        .order_by(*keyset_order(Treatments.scheduled_on, Treatments.treatment_id))
         .paginate(page=page, per_page=per_page, error_out=False)
     )
-    items = TreatmentsForm().dump(pagination.items, many=True)
+    items = rows.dump_many(pagination.items)
 
     return {
         "treatments": items,
@@ -66,12 +81,8 @@ def list_treatments(id):
 
 
 @treatments_bp.post("/treatments")
-@jwt_required()
+@user_access_required
 def create_treatment(id):
-    _, err = verify_user_access(id)
-    if err:
-        return err
-
     json_data = request.get_json() or {}
     form = TreatmentsForm()
     try:
@@ -96,13 +107,22 @@ def create_treatment(id):
         return {"error": "Failed to add treatment"}, 500
 
 
+@treatments_bp.post("/treatments/bulk")
+@user_access_required
+def bulk_create_treatments(id):
+    return bulk_ingest(
+        Treatments,
+        Treatments.treatment_id,
+        TreatmentsForm(),
+        ("treatment_name", "scheduled_on", "notes", "is_completed"),
+        id,
+        "treatments",
+    )
+
+
 @treatments_bp.patch("/treatments/<int:treatment_id>")
-@jwt_required()
+@user_access_required
 def update_treatment(id, treatment_id):
-    _, err = verify_user_access(id)
-    if err:
-        return err
-
     treatment = Treatments.query.filter_by(id=id, treatment_id=treatment_id).first()
     if not treatment:
         return {"error": "Treatment not found"}, 404
@@ -127,12 +147,8 @@ def update_treatment(id, treatment_id):
 
 
 @treatments_bp.delete("/treatments/<int:treatment_id>")
-@jwt_required()
+@user_access_required
 def delete_treatment(id, treatment_id):
-    _, err = verify_user_access(id)
-    if err:
-        return err
-
     treatment = Treatments.query.filter_by(id=id, treatment_id=treatment_id).first()
     if not treatment:
         return {"error": "Treatment not found"}, 404
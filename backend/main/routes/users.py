@@ -1,114 +1,74 @@
-from flask import Blueprint, request, jsonify, send_file
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import date
+from itertools import chain
 
-from ..models import Users, UserInfo, FoodLog, Labs, DailySymptoms, Treatments
-from ..forms import UserInfoForm, ValidationError
-from .. import db
+from flask import Blueprint, request, jsonify, Response, stream_with_context, send_file, url_for
+from flask_jwt_extended import jwt_required, current_user
 
-from io import BytesIO
-from reportlab.pdfgen import canvas
+from ..models import Users, UserInfo, ExportJob
+from ..forms import UserInfoForm, ValidationError
+from .. import db, principal_cache, export_queue, export_cache
+from ..utils import user_access_required, conditional_get, conditional_content, collect_changes, parse_cursor, MAX_CHANGES_PER_TYPE, Projection, FieldsError, parse_fields, statement_timeout
+from ..exports import stream_medical_data_pdf, ExportQueueFull, RENDER_VERSION
+from ..exports import stream_records, parse_types, FORMATS
+from ..analytics import query_rollups, PERIODS
 
 
 users_bp = Blueprint('users', __name__, url_prefix='/api')
 
-def generate_pdf_file(user_data):
-    buffer = BytesIO()
-    new_canvas = canvas.Canvas(buffer)
-
-    new_canvas.setFont('Helvetica-Bold', 26)
-    new_canvas.drawString(100,750, "Medical Data")
-
-    y = 700
-
-    categories = ['food_logs', 'symptoms','treatments']
-
-    if user_data:
-        for key, value in user_data.items():
-            new_canvas.setFont('Helvetica-Bold', 16)
-            new_canvas.drawString(100, y, f"{key.capitalize()}")
-            y-=25
-            if y < 50:
-                new_canvas.showPage()
-                y = 700
-            if value:
-                if key in categories:
-                    for list_item in value:
-                        y -=5
-                        for data_name,data in list_item.items():
-                            if 'id' not in data_name:
-                                new_canvas.setFont('Helvetica', 14)
-                                new_canvas.drawString(100, y, f"{data_name}: {data}")
-                                y -=15
-
-                if key not in categories:
-                    for data_name, data in value.items():
-                        if 'id' not in data_name:
-                            new_canvas.setFont('Helvetica', 14)
-                            new_canvas.drawString(100, y, f"{data_name}: {data}")
-                            y -=15
-            y -= 20
-   
-    
-    new_canvas.showPage()
-    new_canvas.save()
-
-    buffer.seek(0)
-    return buffer
+# GETs read just the dumped columns, or the ?fields= subset (see utils/projection.py)
+user_info_rows = Projection(UserInfo, UserInfoForm)
 
 
-def verify_user_access(user_id):
-    current_user_id = int(get_jwt_identity())
-    user = Users.query.get(user_id)
-    
-    if not user:
-        return None, (jsonify({"error": "User does not exist"}), 404)
-    
-    if current_user_id != user.id:
-        return None, (jsonify({"error": "Access Denied"}), 403)
-    
-    return user, None
+def principal_fields(principal):
+    # the principal is already in memory (principal cache), so ?fields= only trims the payload
+    data = principal._asdict()
+    keys = parse_fields(request.args.get('fields'), principal._fields)
+    return data if keys is None else {key: data[key] for key in keys}
 
 
 @users_bp.route('/users/me', methods=['GET'])
 @jwt_required()
 def users_me():
-    current_user_id = int(get_jwt_identity())
-    user = Users.query.get(current_user_id)
-    
-    if not user:
+    # current_user is the principal the JWT user lookup already resolved (same fields as to_dict)
+    if not current_user:
         return jsonify({"error": "User not found"}), 404
-    
-    return jsonify(user.to_dict()), 200
+
+    try:
+        return jsonify(principal_fields(current_user)), 200
+    except FieldsError as error:
+        return jsonify({"error": str(error)}), 400
 
 
 @users_bp.route('/user-required-info/<int:id>', methods=['GET'])
-@jwt_required()
+@user_access_required
 def get_user_required_info(id):
-    user, error = verify_user_access(id)
-    if error:
-        return error
-    
-    return jsonify({'user': user.to_dict()}), 200
+    # body comes from the principal cache, so the ETag is taken from the body too
+    try:
+        return conditional_content(jsonify({'user': principal_fields(current_user)}))
+    except FieldsError as error:
+        return jsonify({"error": str(error)}), 400
 
 
 @users_bp.route('/user-info/<int:id>', methods=['GET'])
-@jwt_required()
+@user_access_required
+@conditional_get
 def get_user_info(id):
-    user, error = verify_user_access(id)
-    if error:
-        return error
-    
+    try:
+        rows = user_info_rows.only(request.args.get('fields'))
+    except FieldsError as error:
+        return jsonify({"error": str(error)}), 400
+
+    user_info = rows.query().filter(UserInfo.id == id).first()
+
     return jsonify({
-        'user_info': user.user_info.to_dict() if user.user_info else None
+        'user_info': rows.serialize(user_info) if user_info is not None else None
     }), 200
 
 
 @users_bp.route('/user-account/<int:id>', methods=['PATCH'])
-@jwt_required()
+@user_access_required
 def update_user_account(id):
-    user, error = verify_user_access(id)
-    if error:
-        return error
+    user = db.session.get(Users, id)
     
     json_data = request.get_json() or {}
     
@@ -120,6 +80,7 @@ def update_user_account(id):
             user.email = json_data['email']
         
         db.session.commit()
+        principal_cache.invalidate(id)
         return jsonify({
             "message": "Account updated successfully",
             "user": user.to_dict()
@@ -130,12 +91,8 @@ def update_user_account(id):
 
 
 @users_bp.route('/user-info/<int:id>', methods=['PATCH'])
-@jwt_required()
+@user_access_required
 def update_user_info(id):
-    user, error = verify_user_access(id)
-    if error:
-        return error
-    
     json_data = request.get_json() or {}
     form = UserInfoForm(partial=True)
     
@@ -153,11 +110,10 @@ def update_user_info(id):
         return jsonify({"error": str(e)}), 400
     
     try:
-        if not user.user_info:
+        user_info = UserInfo.query.filter_by(id=id).first()
+        if not user_info:
             user_info = UserInfo(id=id)
             db.session.add(user_info)
-        else:
-            user_info = user.user_info
         
         for field in ['age', 'gender', 'weight_lbs', 'height_ft', 'height_in', 
                       'current_diagnoses', 'medical_history', 'insurance']:
@@ -165,6 +121,7 @@ def update_user_info(id):
                 setattr(user_info, field, validated_data[field])
         
         db.session.commit()
+        principal_cache.invalidate(id)
         return jsonify({
             "message": "User info updated successfully",
             "user_info": user_info.to_dict()
@@ -175,32 +132,137 @@ def update_user_info(id):
 
 
 @users_bp.route('/user/export-data', methods = ['GET'])
+@statement_timeout('EXPORT_STATEMENT_TIMEOUT_MS', idle_in_transaction='EXPORT_IDLE_IN_TRANSACTION_TIMEOUT_MS')
 @jwt_required()
 def export_data():
-    user, error = verify_user_access(get_jwt_identity())
-    if error:
-        return error
+    # always the caller's own data, so the principal from the JWT lookup is enough
+    user = current_user
     try:
+        # unchanged since the last export: serve the cached file, no record queries or rendering
+        cache_key = export_cache.key(user.id, Users.get_data_version(user.id), 'pdf', RENDER_VERSION)
+        cached_path = export_cache.get(cache_key)
+        if cached_path:
+            return send_file(cached_path, as_attachment=False, download_name='Medical Data.pdf'), 200
 
-        #ill optimize the queries later
-        user_info = UserInfo.query.filter_by(id=user.id).first()
-        labs = Labs.query.filter_by(id = user.id).first()
-        food_logs = FoodLog.query.filter_by(id = user.id).all()
-        symptoms = DailySymptoms.query.filter_by(id =user.id).all()
-        treatments = Treatments.query.filter_by(id = user.id).all()
-
-        all_user_data = {
-                    'person': {'first_name': user.first_name, 'last_name': user.last_name},
-                    'info': user_info.to_dict() if user_info else None,
-                    'labs': labs.to_dict() if labs else None,
-                    'food_logs': [log.to_dict() for log in food_logs if food_logs],
-                    'symptoms': [symptom.to_dict() for symptom in symptoms if symptoms],
-                    'treatments': [treatment.to_dict() for treatment in treatments if treatments]
-                    }
-        
-        pdf_file = generate_pdf_file(all_user_data)
+        # pdf is rendered page by page while it is sent (and copied into the cache);
+        # priming the generator runs the setup queries so a failure there can still
+        # be reported as an error
+        chunks = stream_with_context(export_cache.tee(cache_key, stream_medical_data_pdf(user)))
+        first_chunk = next(chunks)
+    except Exception:
+        return jsonify({'error': 'Error creating PDF file'}), 400
 
-        
-        return send_file(pdf_file, as_attachment=False, download_name='Medical Data.pdf'), 200
+    return Response(
+        chain([first_chunk], chunks),
+        mimetype='application/pdf',
+        headers={'Content-Disposition': 'inline; filename="Medical Data.pdf"'},
+    ), 200
+
+
+@users_bp.route('/user/export-data', methods = ['POST'])
+@jwt_required()
+def enqueue_export():
+    try:
+        job = export_queue.submit(current_user.id)
+    except ExportQueueFull as e:
+        return jsonify({'error': str(e)}), 429
     except Exception:
-        return jsonify({'error': 'Error creating PDF file'}), 400
\ No newline at end of file
+        db.session.rollback()
+        return jsonify({'error': 'Failed to queue export'}), 500
+
+    return jsonify({
+        'job': job.to_dict(),
+        'status_url': url_for('users.export_status', job_id=job.job_id),
+    }), 202
+
+
+@users_bp.route('/user/export-data/<job_id>', methods = ['GET'])
+@jwt_required()
+def export_status(job_id):
+    job = ExportJob.query.filter_by(job_id=job_id, id=current_user.id).first()
+    if not job:
+        return jsonify({'error': 'Export not found'}), 404
+
+    result = {'job': job.to_dict()}
+    if job.status == ExportJob.DONE:
+        result['download_url'] = url_for('users.download_export', job_id=job.job_id)
+    return jsonify(result), 200
+
+
+@users_bp.route('/user/export-data/<job_id>/download', methods = ['GET'])
+@jwt_required()
+def download_export(job_id):
+    job = ExportJob.query.filter_by(job_id=job_id, id=current_user.id).first()
+    if not job:
+        return jsonify({'error': 'Export not found'}), 404
+
+    if job.status != ExportJob.DONE:
+        return jsonify({'error': f'Export is {job.status}', 'job': job.to_dict()}), 409
+
+    # superseded by a newer export, or pruned after EXPORT_ARTIFACT_TTL_SECONDS
+    if not job.artifact_path:
+        return jsonify({'error': 'Export file is no longer available'}), 410
+
+    try:
+        return send_file(job.artifact_path, as_attachment=False, download_name='Medical Data.pdf'), 200
+    except FileNotFoundError:
+        return jsonify({'error': 'Export file is no longer available'}), 410
+
+
+@users_bp.route('/user/<int:id>/export', methods=['GET'])
+@statement_timeout('EXPORT_STATEMENT_TIMEOUT_MS', idle_in_transaction='EXPORT_IDLE_IN_TRANSACTION_TIMEOUT_MS')
+@user_access_required
+def export_records(id):
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in FORMATS:
+        return jsonify({'error': f"Unsupported format, expected one of: {', '.join(FORMATS)}"}), 400
+
+    try:
+        types = parse_types(request.args.get('types'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # rows come off a server-side cursor and go straight out, nothing is buffered
+    return Response(
+        stream_with_context(stream_records(id, fmt, types)),
+        content_type=FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="medical-data.{fmt}"'},
+    ), 200
+
+
+@users_bp.route('/user/<int:id>/rollups', methods=['GET'])
+@user_access_required
+@conditional_get
+def get_rollups(id):
+    period = request.args.get('period', 'day')
+    if period not in PERIODS:
+        return jsonify({'error': f"Unsupported period, expected one of: {', '.join(PERIODS)}"}), 400
+
+    try:
+        start = date.fromisoformat(request.args['start']) if request.args.get('start') else None
+        end = date.fromisoformat(request.args['end']) if request.args.get('end') else None
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD dates'}), 400
+
+    return jsonify({
+        'period': period,
+        'rollups': query_rollups(id, period, start, end),
+    }), 200
+
+
+@users_bp.route('/user/<int:id>/changes', methods=['GET'])
+@user_access_required
+@conditional_get
+def get_changes(id):
+    # omit ?since= for the initial sync, then pass back next_since
+    since = request.args.get('since')
+    limit = request.args.get('limit', default=500, type=int)
+    if since is not None:
+        try:
+            since = parse_cursor(since)
+        except ValueError:
+            return jsonify({'error': 'since must be a next_since value or a non-negative change sequence'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+
+    return jsonify(collect_changes(id, since, min(limit, MAX_CHANGES_PER_TYPE))), 200
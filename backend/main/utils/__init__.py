@@ -0,0 +1,47 @@
+from .pagination import keyset_paginate, keyset_order, CursorError
+from .revocation import RevocationCache
+from .principal_cache import PrincipalCache
+from .access import user_access_required, record_query_saved, queries_saved
+from .bulk import bulk_ingest, bulk_insert, bulk_response, read_bulk_items, BulkRequestError
+from .sync import collect_changes, parse_cursor, MAX_CHANGES_PER_TYPE
+from .etag import conditional_get, conditional_content
+from .response_cache import ResponseCache, cached_response
+from .passwords import PasswordHasher, PasswordHasherBusy, current_password_hasher
+from .metrics import RequestMetrics
+from .pool import ConnectionPool, statement_timeout
+from .projection import Projection, FieldsError, parse_fields
+from .provisioning import insert_user, provision_users, taken_fields, conflict_errors
+
+__all__ = [
+    'keyset_paginate',
+    'keyset_order',
+    'CursorError',
+    'RevocationCache',
+    'PrincipalCache',
+    'user_access_required',
+    'record_query_saved',
+    'queries_saved',
+    'bulk_ingest',
+    'bulk_insert',
+    'bulk_response',
+    'read_bulk_items',
+    'BulkRequestError',
+    'collect_changes',
+    'MAX_CHANGES_PER_TYPE',
+    'conditional_get',
+    'ResponseCache',
+    'cached_response',
+    'PasswordHasher',
+    'PasswordHasherBusy',
+    'current_password_hasher',
+    'RequestMetrics',
+    'ConnectionPool',
+    'statement_timeout',
+    'Projection',
+    'FieldsError',
+    'parse_fields',
+    'insert_user',
+    'provision_users',
+    'taken_fields',
+    'conflict_errors',
+]
@@ -0,0 +1,46 @@
+import threading
+from functools import wraps
+
+from flask import g, jsonify
+from flask_jwt_extended import jwt_required, get_jwt
+
+
+_lock = threading.Lock()
+_queries_saved = 0
+
+
+def user_access_required(fn):
+    """jwt_required() plus a check that the <id> in the path is the caller's own.
+
+    The path id is compared to the token's sub claim, so a mismatch is refused
+    without a query. On a match the user already exists: the JWT user lookup
+    resolved (and cached) them as current_user. Each use saves a Users lookup,
+    counted on g.queries_saved for the request (X-Queries-Saved header) and in
+    queries_saved() for the worker.
+    """
+    @wraps(fn)
+    @jwt_required()
+    def decorator(*args, **kwargs):
+        try:
+            current_user_id = int(get_jwt()['sub'])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"error": "Invalid token"}), 401
+
+        if kwargs.get('id') != current_user_id:
+            return jsonify({"error": "Access Denied"}), 403
+
+        record_query_saved()
+        return fn(*args, **kwargs)
+
+    return decorator
+
+
+def record_query_saved(count=1):
+    global _queries_saved
+    g.queries_saved = g.get('queries_saved', 0) + count
+    with _lock:
+        _queries_saved += count
+
+
+def queries_saved():
+    return _queries_saved
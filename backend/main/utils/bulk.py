@@ -0,0 +1,169 @@
+import json
+from itertools import islice
+
+from flask import current_app, jsonify, request
+from marshmallow import ValidationError
+from sqlalchemy import insert
+
+from .. import db
+from .versioning import bump_data_version
+
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+
+class BulkRequestError(ValueError):
+    pass
+
+
+def _ndjson_items(stream):
+    # one record per line, read straight off the request stream
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield ValidationError('Invalid JSON')
+
+
+def read_bulk_items():
+    """Records from a JSON array, {"items": [...]} or an NDJSON body."""
+    if request.mimetype in NDJSON_MIMETYPES:
+        return _ndjson_items(request.stream)
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('items')
+    if not isinstance(data, list):
+        raise BulkRequestError('Expected a JSON array of records, {"items": [...]} or an NDJSON body')
+    return iter(data)
+
+
+def _chunks(items, size):
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _column_defaults(model, fields):
+    # every row gets every column so a chunk stays a single INSERT statement
+    values = {}
+    for field in fields:
+        default = model.__table__.c[field].default
+        values[field] = default.arg if default is not None and default.is_scalar else None
+    return values
+
+
+def bulk_insert(model, pk_column, schema, fields, user_id, items):
+    """Validate and insert records in chunks inside a single transaction.
+
+    Each chunk is validated with schema.load(many=True) and written with one
+    multi-row INSERT ... RETURNING, so a chunk costs one round trip no matter how
+    many rows it holds. (Returned ids are matched to records by position; where a
+    driver can't promise RETURNING order, e.g. SQLite, SQLAlchemy falls back to a
+    row per statement.) Invalid records are reported and skipped; the rest are
+    committed together. Returns one result per record, in request order.
+    """
+    chunk_size = current_app.config.get('BULK_CHUNK_SIZE', 500)
+    max_items = current_app.config.get('BULK_MAX_ITEMS', 10000)
+    defaults = _column_defaults(model, fields)
+
+    # lazy: analytics imports the models, which aren't loaded when utils is first imported
+    from ..analytics.rollups import ROLLED_UP_MODELS, rows_to_user_days, refresh_days
+
+    results = []
+    created = 0
+    user_days = set()
+    change_seq = None
+    for chunk in _chunks(items, chunk_size):
+        if len(results) + len(chunk) > max_items:
+            raise BulkRequestError(f'A bulk request can hold at most {max_items} records')
+
+        offset = len(results)
+        parse_errors = {i: error.messages for i, error in enumerate(chunk) if isinstance(error, ValidationError)}
+        loadable = [{} if i in parse_errors else item for i, item in enumerate(chunk)]
+
+        try:
+            valid_data = schema.load(loadable, many=True)
+            errors = {}
+        except ValidationError as error:
+            valid_data = error.valid_data
+            errors = error.messages
+        errors.update(parse_errors)
+
+        rows = []
+        row_indexes = []
+        for i, validated in enumerate(valid_data):
+            if i in errors:
+                continue
+            row = dict(defaults)
+            row.update({field: validated[field] for field in fields if field in validated})
+            row['id'] = user_id
+            rows.append(row)
+            row_indexes.append(i)
+
+        chunk_results = [
+            {'index': offset + i, 'status': 'invalid', 'errors': errors.get(i)}
+            for i in range(len(chunk))
+        ]
+        if rows:
+            if change_seq is None:
+                # one sequence number for the whole request; it commits as a unit
+                change_seq = bump_data_version([user_id])[user_id]
+            for row in rows:
+                row['change_seq'] = change_seq
+            new_ids = db.session.scalars(
+                insert(model)
+                .returning(pk_column, sort_by_parameter_order=True)
+                .execution_options(render_nulls=True),
+                rows,
+            ).all()
+            for i, new_id in zip(row_indexes, new_ids):
+                chunk_results[i] = {'index': offset + i, 'status': 'created', pk_column.key: new_id}
+            created += len(new_ids)
+            if model in ROLLED_UP_MODELS:
+                user_days |= rows_to_user_days(user_id, rows)
+
+        results.extend(chunk_results)
+
+    if user_days:
+        refresh_days(user_days)
+    db.session.commit()
+    return results, created
+
+
+def bulk_response(results, created, collection):
+    invalid = len(results) - created
+    if not results:
+        status = 400
+    elif invalid == 0:
+        status = 201
+    elif created == 0:
+        status = 400
+    else:
+        status = 207
+
+    return jsonify({
+        'message': f'{created} {collection} added, {invalid} rejected',
+        'created': created,
+        'rejected': invalid,
+        'results': results,
+    }), status
+
+
+def bulk_ingest(model, pk_column, schema, fields, user_id, collection):
+    try:
+        items = read_bulk_items()
+        results, created = bulk_insert(model, pk_column, schema, fields, user_id, items)
+    except BulkRequestError as error:
+        db.session.rollback()
+        return jsonify({'error': str(error)}), 400
+    except Exception:
+        db.session.rollback()
+        return jsonify({'error': f'Failed to add {collection}'}), 500
+
+    return bulk_response(results, created, collection)
@@ -0,0 +1,54 @@
+import hashlib
+from functools import wraps
+
+from flask import request, make_response
+
+from ..models import Users
+
+
+# bump when a GET payload changes shape so clients drop their stored copies
+RESPONSE_VERSION = 1
+
+
+def version_etag(user_id, data_version):
+    raw = f"{RESPONSE_VERSION}:{user_id}:{data_version}:{request.full_path}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def conditional_get(fn):
+    """Strong ETag / If-None-Match for a user's GET endpoints.
+
+    The tag is derived from users.data_version (bumped on every write to the
+    user's records) plus the request path and query string, so it is known
+    after a single primary-key lookup. A matching If-None-Match gets a 304
+    before the view runs any of its own queries. Goes under
+    user_access_required, which has already matched <id> to the caller.
+    """
+    @wraps(fn)
+    def decorator(*args, **kwargs):
+        user_id = kwargs['id']
+        etag = version_etag(user_id, Users.get_data_version(user_id))
+        if request.if_none_match.contains(etag):
+            response = make_response('', 304)
+        else:
+            response = make_response(fn(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag)
+        # per user, so never stored by shared caches; browsers revalidate each time
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    return decorator
+
+
+def conditional_content(response):
+    """ETag / If-None-Match from the body itself, for payloads not read from the database.
+
+    A view served from the principal cache can't use conditional_get: a worker
+    holding an older principal would send it under the current data_version
+    tag. Hashing the body keeps the tag and the payload from the same source.
+    """
+    response.add_etag()
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
@@ -0,0 +1,219 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from flask import current_app, g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+logger = logging.getLogger(__name__)
+
+# seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# statements per request
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Histogram:
+    """Prometheus histogram with one series per label combination."""
+
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = [(labels, list(values)) for labels, values in self._series.items()]
+        for labels, values in sorted(series):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), values):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {values[-1]}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+class Counter:
+    """Prometheus counter with one series per label combination."""
+
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            series = sorted(self._series.items())
+        lines.extend(f'{self.name}{_labels(self.labelnames, labels)} {value}' for labels, value in series)
+        return lines
+
+
+class Gauge:
+    """Prometheus gauge read at scrape time: collect() returns {label values: value}."""
+
+    def __init__(self, name, documentation, labelnames, collect):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge']
+        lines.extend(f'{self.name}{_labels(self.labelnames, labels)} {value}'
+                     for labels, value in sorted(self.collect().items()))
+        return lines
+
+
+class RequestMetrics:
+    """Per-request SQL accounting, Server-Timing headers and Prometheus metrics.
+
+    Engine events time every statement. Inside a request the count and the
+    time are added up on `g`, statements slower than SLOW_QUERY_MS are logged
+    with the endpoint that ran them, and after_request emits a Server-Timing
+    header and records per-endpoint histograms of latency, DB time and query
+    count. render() gives this worker's metrics in Prometheus text format.
+
+    Latency is measured up to the end of the view, so streamed bodies
+    (exports) only count the time to their first chunk.
+    """
+
+    def __init__(self, app=None):
+        self.slow_query_seconds = 0.2
+        self.server_timing = True
+        self._metrics = []
+        self.request_seconds = self.histogram(
+            'http_request_duration_seconds', 'Time spent handling a request.',
+            ('endpoint', 'method', 'status'), LATENCY_BUCKETS)
+        self.request_db_seconds = self.histogram(
+            'http_request_db_seconds', 'Time a request spent executing SQL statements.',
+            ('endpoint', 'method'), LATENCY_BUCKETS)
+        self.request_queries = self.histogram(
+            'http_request_queries', 'SQL statements executed per request.',
+            ('endpoint', 'method'), QUERY_BUCKETS)
+        self.slow_queries = self.counter(
+            'db_slow_queries_total', 'Statements slower than SLOW_QUERY_MS.', ('endpoint',))
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.slow_query_seconds = app.config.get('SLOW_QUERY_MS', self.slow_query_seconds * 1000) / 1000
+        self.server_timing = app.config.get('SERVER_TIMING', self.server_timing)
+        app.extensions['request_metrics'] = self
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        _init_engine_events()
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name, documentation, labelnames=(), collect=dict):
+        metric = Gauge(name, documentation, labelnames, collect)
+        self._metrics.append(metric)
+        return metric
+
+    def record_query(self, statement, seconds):
+        g.sql_queries = g.get('sql_queries', 0) + 1
+        g.sql_seconds = g.get('sql_seconds', 0.0) + seconds
+        if seconds >= self.slow_query_seconds:
+            endpoint = request.endpoint or 'unmatched'
+            self.slow_queries.inc(endpoint)
+            logger.warning("Slow query (%.1f ms) in %s: %s", seconds * 1000, endpoint, ' '.join(statement.split()))
+
+    def _start_request(self):
+        g.request_started = time.perf_counter()
+
+    def _finish_request(self, response):
+        elapsed = time.perf_counter() - g.pop('request_started', time.perf_counter())
+        queries = g.get('sql_queries', 0)
+        db_seconds = g.get('sql_seconds', 0.0)
+        # unmatched urls share one label so stray 404s can't grow the series without bound
+        endpoint = request.endpoint or 'unmatched'
+
+        self.request_seconds.observe(elapsed, endpoint, request.method, str(response.status_code))
+        self.request_db_seconds.observe(db_seconds, endpoint, request.method)
+        self.request_queries.observe(queries, endpoint, request.method)
+
+        if self.server_timing:
+            response.headers.add(
+                'Server-Timing',
+                f'db;dur={db_seconds * 1000:.1f};desc="{queries} queries", app;dur={elapsed * 1000:.1f}',
+            )
+        return response
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info['query_started'].pop()
+    # pool workers, CLI commands and migrations run statements outside any request
+    if not has_request_context():
+        return
+    metrics = current_app.extensions.get('request_metrics')
+    if metrics is not None:
+        metrics.record_query(statement, seconds)
+
+
+def _discard_failed_query(exception_context):
+    # a statement that raised never reaches after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('query_started'):
+        conn.info['query_started'].pop()
+
+
+def _init_engine_events():
+    # on the Engine class, so they cover every engine flask-sqlalchemy creates
+    for name, fn in (('before_cursor_execute', _before_cursor_execute),
+                     ('after_cursor_execute', _after_cursor_execute),
+                     ('handle_error', _discard_failed_query)):
+        if not event.contains(Engine, name, fn):
+            event.listen(Engine, name, fn)
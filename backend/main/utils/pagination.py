@@ -0,0 +1,125 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from sqlalchemy import DateTime, and_, or_
+
+
+# keyset pages are bounded so a client can't ask for a whole history in one go
+MAX_PER_PAGE = 100
+
+
+class CursorError(ValueError):
+    pass
+
+
+def encode_cursor(value, key, direction):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({'v': value, 'k': key, 'd': direction}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort_column=None):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, key, direction = payload['v'], int(payload['k']), payload['d']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise CursorError('Invalid cursor')
+
+    if direction not in ('next', 'prev'):
+        raise CursorError('Invalid cursor')
+
+    if value is not None and sort_column is not None and isinstance(sort_column.type, DateTime):
+        try:
+            value = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise CursorError('Invalid cursor')
+
+    return value, key, direction
+
+
+def _after(sort_column, pk_column, value, key):
+    #rows that come after (value, key) in "sort DESC NULLS LAST, pk DESC" order
+    if sort_column is None:
+        return pk_column < key
+    if value is None:
+        return and_(sort_column.is_(None), pk_column < key)
+    return or_(
+        sort_column < value,
+        and_(sort_column == value, pk_column < key),
+        sort_column.is_(None),
+    )
+
+
+def _before(sort_column, pk_column, value, key):
+    #rows that come before (value, key) in "sort DESC NULLS LAST, pk DESC" order
+    if sort_column is None:
+        return pk_column > key
+    if value is None:
+        return or_(sort_column.isnot(None), pk_column > key)
+    return or_(
+        sort_column > value,
+        and_(sort_column == value, pk_column > key),
+    )
+
+
+def keyset_order(sort_column, pk_column, reverse=False):
+    if reverse:
+        order = [pk_column.asc()]
+        if sort_column is not None:
+            order.insert(0, sort_column.asc().nullsfirst())
+        return order
+
+    order = [pk_column.desc()]
+    if sort_column is not None:
+        order.insert(0, sort_column.desc().nullslast())
+    return order
+
+
+def keyset_paginate(query, sort_column, pk_column, cursor=None, per_page=20):
+    """Newest-first keyset pagination over (sort_column, pk_column).
+
+    Unlike paginate() this never issues an OFFSET or a COUNT(*), so every page
+    costs the same no matter how deep it is. Returns (items, next_cursor, prev_cursor).
+    """
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    sort_attr = sort_column.key if sort_column is not None else None
+    pk_attr = pk_column.key
+
+    def cursor_for(item, direction):
+        value = getattr(item, sort_attr) if sort_attr else None
+        return encode_cursor(value, getattr(item, pk_attr), direction)
+
+    if not cursor:
+        rows = query.order_by(*keyset_order(sort_column, pk_column)).limit(per_page + 1).all()
+        items = rows[:per_page]
+        next_cursor = cursor_for(items[-1], 'next') if len(rows) > per_page else None
+        return items, next_cursor, None
+
+    value, key, direction = decode_cursor(cursor, sort_column)
+
+    if direction == 'next':
+        rows = (
+            query.filter(_after(sort_column, pk_column, value, key))
+            .order_by(*keyset_order(sort_column, pk_column))
+            .limit(per_page + 1)
+            .all()
+        )
+        items = rows[:per_page]
+        next_cursor = cursor_for(items[-1], 'next') if len(rows) > per_page else None
+        prev_cursor = cursor_for(items[0], 'prev') if items else None
+        return items, next_cursor, prev_cursor
+
+    rows = (
+        query.filter(_before(sort_column, pk_column, value, key))
+        .order_by(*keyset_order(sort_column, pk_column, reverse=True))
+        .limit(per_page + 1)
+        .all()
+    )
+    items = list(reversed(rows[:per_page]))
+    prev_cursor = cursor_for(items[0], 'prev') if len(rows) > per_page else None
+    next_cursor = cursor_for(items[-1], 'next') if items else None
+    return items, next_cursor, prev_cursor
@@ -0,0 +1,127 @@
+import os
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class PasswordHasherBusy(RuntimeError):
+    """More hashes are waiting than PASSWORD_HASH_MAX_PENDING allows."""
+
+
+class PasswordHasher:
+    """Runs password hashing on a small dedicated thread pool.
+
+    hashlib's scrypt / pbkdf2 release the GIL, so hashes run in parallel with
+    request threads, but never on more than PASSWORD_HASH_WORKERS cores: a login
+    burst queues here instead of starving the rest of the API. Callers past
+    PASSWORD_HASH_MAX_PENDING get PasswordHasherBusy (503) rather than waiting.
+
+    PASSWORD_HASH_METHOD is the werkzeug method string (the cost policy). Hashes
+    made with any other parameters still verify and are flagged by
+    needs_rehash(), so logins upgrade them. PASSWORD_HASH_WORKERS=0 hashes
+    inline on the request thread.
+    """
+
+    def __init__(self, app=None):
+        self.method = 'scrypt'
+        self.workers = 2
+        self.max_pending = 64
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._prefix = None
+        self._dummy_hash = None
+        self.hashed = 0
+        self.verified = 0
+        self.rejected = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD', self.method)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', self.workers)
+        self.max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING', self.max_pending)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._prefix = None
+        self._dummy_hash = None
+        app.extensions['password_hasher'] = self
+
+    @contextmanager
+    def _slot(self):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise PasswordHasherBusy('Too many password checks in progress')
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def _pool(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='password-hash')
+        return self._executor
+
+    def _run(self, fn, *args):
+        with self._slot():
+            if not self.workers:
+                return fn(*args)
+            return self._pool().submit(fn, *args).result()
+
+    def hash(self, password):
+        self.hashed += 1
+        return self._run(generate_password_hash, password, self.method)
+
+    def hash_many(self, passwords):
+        """Hash a batch (bulk provisioning) across every worker thread; takes one pending slot."""
+        passwords = list(passwords)
+        self.hashed += len(passwords)
+        with self._slot():
+            if not self.workers:
+                return [generate_password_hash(password, self.method) for password in passwords]
+            return list(self._pool().map(generate_password_hash, passwords, [self.method] * len(passwords)))
+
+    def verify(self, password_hash, password):
+        self.verified += 1
+        return self._run(check_password_hash, password_hash, password)
+
+    def verify_dummy(self, password):
+        """Spend the same time as verify() for a login whose user doesn't exist.
+
+        The dummy hash is made once per process, so this costs one check, not a
+        generate + check, and unknown accounts can't be told apart by timing.
+        """
+        self.verify(self._current_dummy(), password)
+        return False
+
+    def _current_dummy(self):
+        if self._dummy_hash is None:
+            self._dummy_hash = self.hash(os.urandom(16).hex())
+        return self._dummy_hash
+
+    def needs_rehash(self, password_hash):
+        # werkzeug expands the configured method ('scrypt' -> 'scrypt:32768:8:1'), so
+        # compare against the prefix of a hash made with the current policy
+        if self._prefix is None:
+            self._prefix = self._current_dummy().split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._prefix
+
+    def stats(self):
+        return {
+            'method': self.method,
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'hashed': self.hashed,
+            'verified': self.verified,
+            'rejected_busy': self.rejected,
+        }
+
+
+def current_password_hasher():
+    # the PasswordHasher registered on current_app (backend.main.password_hasher in the app)
+    return current_app.extensions['password_hasher']
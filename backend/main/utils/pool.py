@@ -0,0 +1,204 @@
+import time
+from functools import wraps
+
+from flask import current_app, g, jsonify, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+
+
+# seconds
+CHECKOUT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# SQLSTATE query_canceled: statement_timeout stopped the statement
+QUERY_CANCELED = '57014'
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that times every checkout: waiting for a free slot, connecting, pre-ping."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeout:
+            _record_checkout(time.perf_counter() - started, timed_out=True)
+            raise
+        _record_checkout(time.perf_counter() - started)
+        return connection
+
+
+class ConnectionPool:
+    """Engine pool sizing, statement timeouts and pool metrics, all from Config.
+
+    init_app has to run before db.init_app: it turns the DB_POOL_* settings into
+    SQLALCHEMY_ENGINE_OPTIONS (values already set there win). Checkouts that
+    wait longer than DB_POOL_TIMEOUT_SECONDS are answered 503 instead of
+    queueing the request indefinitely.
+
+    On PostgreSQL, request transactions are limited by DB_STATEMENT_TIMEOUT_MS
+    and DB_IDLE_IN_TRANSACTION_TIMEOUT_MS (both per route with
+    @statement_timeout). They are session defaults sent at connect time, and a transaction only pays
+    a SET LOCAL when its route overrides them. CLI commands, migrations and
+    export workers run without them. With DB_PGBOUNCER (transaction pooling)
+    nothing may outlive a transaction, so every request transaction sets its
+    limits with SET LOCAL instead; psycopg2 prepares no statements server
+    side, so nothing else needs to change.
+    """
+
+    def __init__(self, metrics, app=None):
+        self.statement_timeout_ms = 0
+        self.idle_in_transaction_timeout_ms = 0
+        self.pgbouncer = False
+        self.checkout_seconds = metrics.histogram(
+            'db_pool_checkout_seconds', 'Time to get a connection from the pool (wait, connect, pre-ping).',
+            (), CHECKOUT_BUCKETS)
+        self.checkout_timeouts = metrics.counter(
+            'db_pool_timeouts_total', 'Checkouts that gave up after DB_POOL_TIMEOUT_SECONDS.')
+        self.statement_timeouts = metrics.counter(
+            'db_statement_timeouts_total', 'Statements cancelled by statement_timeout.', ('endpoint',))
+        metrics.gauge('db_pool_connections', "Connections in this worker's pool by state.", ('state',),
+                      self._pool_state)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        self.statement_timeout_ms = config.get('DB_STATEMENT_TIMEOUT_MS', self.statement_timeout_ms)
+        self.idle_in_transaction_timeout_ms = config.get('DB_IDLE_IN_TRANSACTION_TIMEOUT_MS',
+                                                         self.idle_in_transaction_timeout_ms)
+        self.pgbouncer = config.get('DB_PGBOUNCER', self.pgbouncer)
+        config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            **self._engine_options(config),
+            **config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+        }
+        app.extensions['connection_pool'] = self
+        app.register_error_handler(PoolTimeout, self._pool_exhausted)
+        _init_engine_events()
+
+    def _session_settings(self):
+        return {
+            'statement_timeout': self.statement_timeout_ms,
+            'idle_in_transaction_session_timeout': self.idle_in_transaction_timeout_ms,
+        }
+
+    def _engine_options(self, config):
+        url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+        if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+            # flask-sqlalchemy shares one connection (StaticPool) for in-memory SQLite
+            return {}
+
+        options = {
+            'poolclass': MeteredQueuePool,
+            'pool_size': config.get('DB_POOL_SIZE', 5),
+            'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+            'pool_timeout': config.get('DB_POOL_TIMEOUT_SECONDS', 30),
+            'pool_recycle': config.get('DB_POOL_RECYCLE_SECONDS', -1),
+            'pool_pre_ping': config.get('DB_POOL_PRE_PING', False),
+        }
+        if url.get_backend_name() == 'postgresql' and not self.pgbouncer:
+            # PgBouncer refuses startup parameters it doesn't know, so only without it
+            defaults = ' '.join(f'-c {name}={value}' for name, value in self._session_settings().items() if value)
+            if defaults:
+                options['connect_args'] = {'options': defaults}
+        return options
+
+    def local_settings(self):
+        """SET LOCAL values for a transaction that is starting (PostgreSQL)."""
+        session = {name: value for name, value in self._session_settings().items() if value}
+        if not has_request_context():
+            # background work isn't bound by the request limits
+            return {} if self.pgbouncer else dict.fromkeys(session, 0)
+
+        # behind PgBouncer the defaults weren't set at connect, so every transaction sets them
+        settings = session if self.pgbouncer else {}
+        routes = {
+            'statement_timeout': g.get('statement_timeout_ms'),
+            'idle_in_transaction_session_timeout': g.get('idle_in_transaction_timeout_ms'),
+        }
+        defaults = self._session_settings()
+        for name, route_value in routes.items():
+            if route_value is not None and route_value != defaults[name]:
+                settings[name] = route_value
+        return settings
+
+    def _pool_state(self):
+        if not has_app_context():
+            return {}
+        pool = current_app.extensions['sqlalchemy'].engine.pool
+        if not isinstance(pool, QueuePool):
+            return {}
+        return {
+            ('checked_out',): pool.checkedout(),
+            ('idle',): pool.checkedin(),
+            ('overflow',): max(pool.overflow(), 0),
+        }
+
+    def _pool_exhausted(self, error):
+        return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
+
+
+def statement_timeout(milliseconds, idle_in_transaction=None):
+    """Statement timeout for one route, in ms (0 = none) or the name of a config key holding it.
+
+    `idle_in_transaction` does the same for the idle-in-transaction timeout;
+    streamed responses need it, as their transaction sits idle whenever the
+    client is slow to read. Goes directly under the route decorator, so the
+    limits are in place before the first query of the request.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.statement_timeout_ms = _milliseconds(milliseconds)
+            if idle_in_transaction is not None:
+                g.idle_in_transaction_timeout_ms = _milliseconds(idle_in_transaction)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _milliseconds(value):
+    return current_app.config[value] if isinstance(value, str) else value
+
+
+def _record_checkout(seconds, timed_out=False):
+    # pool processes and scripts may check out connections without the app set up
+    pool = current_app.extensions.get('connection_pool') if has_app_context() else None
+    if pool is None:
+        return
+    if timed_out:
+        pool.checkout_timeouts.inc()
+    else:
+        pool.checkout_seconds.observe(seconds)
+
+
+def _set_transaction_limits(conn):
+    if conn.dialect.name != 'postgresql' or not has_app_context():
+        return
+    pool = current_app.extensions.get('connection_pool')
+    settings = pool.local_settings() if pool is not None else None
+    if not settings:
+        return
+    # on the DBAPI cursor: the first statement of the transaction, outside the query accounting
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute('; '.join(f'SET LOCAL {name} = {int(value)}' for name, value in settings.items()))
+    finally:
+        cursor.close()
+
+
+def _count_statement_timeout(exception_context):
+    if getattr(exception_context.original_exception, 'pgcode', None) != QUERY_CANCELED or not has_app_context():
+        return
+    pool = current_app.extensions.get('connection_pool')
+    if pool is not None:
+        endpoint = (request.endpoint or 'unmatched') if has_request_context() else 'background'
+        pool.statement_timeouts.inc(endpoint)
+
+
+def _init_engine_events():
+    # on the Engine class, like the request metrics events
+    for name, fn in (('begin', _set_transaction_limits), ('handle_error', _count_statement_timeout)):
+        if not event.contains(Engine, name, fn):
+            event.listen(Engine, name, fn)
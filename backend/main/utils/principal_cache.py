@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class PrincipalCache:
+    """Bounded, TTL'd per-worker LRU of user principals keyed by user id.
+
+    Entries are the immutable rows from Users.get_principal(), so they are safe
+    to hand out across requests. Writes to a user call invalidate() on this
+    worker; other workers pick the change up once their entry's TTL runs out.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # user id -> (expires_at, principal)
+        self.maxsize = 1024
+        self.ttl = 60.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('USER_CACHE_SIZE', self.maxsize)
+        self.ttl = app.config.get('USER_CACHE_TTL_SECONDS', self.ttl)
+
+    def get(self, user_id, loader):
+        key = int(user_id)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        principal = loader(key)
+
+        # unknown users aren't cached so a later sign-up is seen immediately
+        if principal is not None and self.maxsize > 0:
+            with self._lock:
+                self._entries[key] = (now + self.ttl, principal)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+        return principal
+
+    def invalidate(self, user_id):
+        with self._lock:
+            if self._entries.pop(int(user_id), None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
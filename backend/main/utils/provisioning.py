@@ -0,0 +1,183 @@
+from flask import current_app
+from marshmallow import ValidationError
+from sqlalchemy import insert, literal, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from .. import db
+from ..models import Users, UserInfo
+from .bulk import _chunks, _column_defaults, BulkRequestError
+from .passwords import current_password_hasher
+
+
+USER_FIELDS = ('first_name', 'last_name', 'username', 'email')
+INFO_FIELDS = ('age', 'gender', 'weight_lbs', 'height_ft', 'height_in',
+               'current_diagnoses', 'medical_history', 'insurance')
+
+
+def insert_user(user_values, info_values=None):
+    """Insert a user (and their user_info row) and return the new id.
+
+    On PostgreSQL both rows go in one statement (INSERT ... RETURNING in a CTE
+    feeding the user_info INSERT); elsewhere it is two. Taken usernames / emails
+    surface as IntegrityError from the unique constraints, see taken_fields().
+    """
+    user_insert = insert(Users).values(**user_values).returning(Users.id)
+    if not info_values:
+        return db.session.execute(user_insert).scalar_one()
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        new_user = user_insert.cte('new_user')
+        columns = UserInfo.__table__.c
+        return db.session.execute(
+            insert(UserInfo)
+            .from_select(
+                ['id', *info_values],
+                select(new_user.c.id, *(literal(value, columns[name].type) for name, value in info_values.items())),
+            )
+            .returning(UserInfo.id)
+        ).scalar_one()
+
+    user_id = db.session.execute(user_insert).scalar_one()
+    db.session.execute(insert(UserInfo).values(id=user_id, **info_values))
+    return user_id
+
+
+def taken_fields(usernames, emails):
+    """One query: which of these usernames / emails already belong to an account."""
+    rows = db.session.execute(
+        select(Users.username, Users.email).where(or_(Users.username.in_(usernames), Users.email.in_(emails)))
+    ).all()
+    return {row.username for row in rows}, {row.email for row in rows}
+
+
+def conflict_errors(username, email, taken_usernames, taken_emails):
+    errors = {}
+    if email in taken_emails:
+        errors['email'] = ['Email already exists']
+    if username in taken_usernames:
+        errors['username'] = ['Username already exists']
+    return errors
+
+
+def _insert_chunk(rows, info_rows):
+    # multi-row INSERT ... RETURNING for the accounts, then one for their user_info
+    user_ids = db.session.scalars(
+        insert(Users).returning(Users.id, sort_by_parameter_order=True),
+        rows,
+    ).all()
+    infos = [dict(info, id=user_id) for user_id, info in zip(user_ids, info_rows) if info is not None]
+    if infos:
+        db.session.execute(insert(UserInfo).execution_options(render_nulls=True), infos)
+    return user_ids
+
+
+def _insert_savepoint(pending):
+    """Insert {index: (user row, user_info row)} under a savepoint; None if a constraint failed."""
+    if not pending:
+        return []
+    rows, info_rows = zip(*pending.values())
+    try:
+        with db.session.begin_nested():
+            return _insert_chunk(list(rows), list(info_rows))
+    except IntegrityError:
+        return None
+
+
+def provision_users(schema, items, max_items=None):
+    """Create accounts in bulk, one result per record in request order.
+
+    Per chunk: validate, drop usernames / emails that are taken (one query) or
+    repeated earlier in the request, hash every password in parallel on the
+    password hasher's pool, then write the accounts and their user_info with
+    multi-row INSERTs. A chunk that still hits a constraint is rolled back to
+    its savepoint; records whose username / email turn out to be taken (a
+    concurrent sign-up) are reported as conflicts and the rest retried once.
+    Anything still failing is reported as `failed`.
+    """
+    chunk_size = current_app.config.get('BULK_CHUNK_SIZE', 500)
+    info_defaults = _column_defaults(UserInfo, INFO_FIELDS)
+
+    results = []
+    created = 0
+    seen_usernames, seen_emails = set(), set()
+    for chunk in _chunks(items, chunk_size):
+        if max_items is not None and len(results) + len(chunk) > max_items:
+            raise BulkRequestError(f'A bulk request can hold at most {max_items} users')
+
+        offset = len(results)
+        parse_errors = {i: error.messages for i, error in enumerate(chunk) if isinstance(error, ValidationError)}
+        loadable = [{} if i in parse_errors else item for i, item in enumerate(chunk)]
+        try:
+            valid_data = schema.load(loadable, many=True)
+            errors = {}
+        except ValidationError as error:
+            valid_data = error.valid_data
+            errors = error.messages
+        errors.update(parse_errors)
+
+        candidates = [i for i in range(len(valid_data)) if i not in errors]
+        taken_usernames, taken_emails = taken_fields(
+            [valid_data[i]['username'] for i in candidates],
+            [valid_data[i]['email'] for i in candidates],
+        )
+        chunk_results = [
+            {'index': offset + i, 'status': 'invalid', 'errors': errors.get(i)}
+            for i in range(len(chunk))
+        ]
+
+        accepted = []
+        for i in candidates:
+            record = valid_data[i]
+            conflicts = {
+                **conflict_errors(record['username'], record['email'], seen_usernames, seen_emails),
+                **conflict_errors(record['username'], record['email'], taken_usernames, taken_emails),
+            }
+            seen_usernames.add(record['username'])
+            seen_emails.add(record['email'])
+            if conflicts:
+                chunk_results[i] = {'index': offset + i, 'status': 'conflict', 'errors': conflicts}
+            else:
+                accepted.append(i)
+
+        if accepted:
+            hashes = current_password_hasher().hash_many(valid_data[i]['password'] for i in accepted)
+            pending = {}
+            for i, password_hash in zip(accepted, hashes):
+                record = valid_data[i]
+                info = {field: record[field] for field in INFO_FIELDS if field in record}
+                pending[i] = (
+                    {**{field: record.get(field) for field in USER_FIELDS}, 'password_hash': password_hash},
+                    {**info_defaults, **info} if info else None,
+                )
+
+            user_ids = _insert_savepoint(pending)
+            if user_ids is None:
+                # a concurrent sign-up took a username / email, or another constraint failed:
+                # report what is taken per record and retry the rest once
+                taken_usernames, taken_emails = taken_fields(
+                    [valid_data[i]['username'] for i in pending],
+                    [valid_data[i]['email'] for i in pending],
+                )
+                for i in list(pending):
+                    record = valid_data[i]
+                    conflicts = conflict_errors(record['username'], record['email'], taken_usernames, taken_emails)
+                    if conflicts:
+                        chunk_results[i] = {'index': offset + i, 'status': 'conflict', 'errors': conflicts}
+                        del pending[i]
+                # nothing was taken: the same rows would fail the same way
+                if len(pending) < len(accepted):
+                    user_ids = _insert_savepoint(pending)
+
+            if user_ids is None:
+                for i in pending:
+                    chunk_results[i] = {'index': offset + i, 'status': 'failed',
+                                        'errors': {'_schema': ['Failed to create user']}}
+            else:
+                for i, user_id in zip(pending, user_ids):
+                    chunk_results[i] = {'index': offset + i, 'status': 'created', 'id': user_id}
+                created += len(user_ids)
+
+        results.extend(chunk_results)
+
+    db.session.commit()
+    return results, created
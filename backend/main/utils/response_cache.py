@@ -0,0 +1,216 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request, make_response
+from sqlalchemy import event
+
+from .. import db
+from ..models import Users
+
+
+class LocalBackend:
+    """In-process store for rendered responses (get / set).
+
+    Entries are LRU-evicted past `maxsize` and honour `ex`. There are no
+    generation counters: they would only count this worker's writes, so
+    ResponseCache keys local entries on users.data_version instead.
+    """
+
+    shared = False
+
+    def __init__(self, maxsize=2048):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at or None, value)
+        self.maxsize = maxsize
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ex=None):
+        expires_at = time.monotonic() + ex if ex else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class RedisBackend:
+    """Shared cache for multi-worker deployments (any Redis-protocol server)."""
+
+    shared = True
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis needs the 'redis' package installed")
+        self._client = redis.Redis.from_url(url)
+        self.evictions = None
+
+    def get(self, key):
+        value = self._client.get(key)
+        if isinstance(value, bytes):
+            value = value.decode()
+        # counters come back as strings
+        return int(value) if value is not None and value.isdigit() else value
+
+    def set(self, key, value, ex=None):
+        self._client.set(key, value, ex=int(ex) if ex else None)
+
+    def incr(self, key):
+        return self._client.incr(key)
+
+    def size(self):
+        return None
+
+
+class ResponseCache:
+    """Per-user cache of rendered GET responses with generation-based invalidation.
+
+    Keys are (user, endpoint, query args, user's generation). Committing a write
+    for a user changes that user's generation, so every cached page for them is
+    orphaned in O(1) and ages out.
+
+    With Redis the generation is a shared counter bumped after commit, and a
+    hit needs no database access at all. The default backend is this worker's
+    memory, where a counter would miss other workers' writes, so there the
+    generation is users.data_version: one primary-key lookup per hit, and a
+    write in any worker is seen by all of them at once.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.ttl = 30.0
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('RESPONSE_CACHE_TTL_SECONDS', self.ttl)
+        kind = app.config.get('RESPONSE_CACHE_BACKEND', 'local')
+        if kind == 'redis':
+            self.backend = RedisBackend(app.config['RESPONSE_CACHE_URL'])
+        elif kind == 'local':
+            self.backend = LocalBackend(app.config.get('RESPONSE_CACHE_SIZE', 2048))
+        else:
+            self.backend = None
+        app.extensions['response_cache'] = self
+        _init_session_events()
+
+    @property
+    def enabled(self):
+        return self.backend is not None and self.ttl > 0
+
+    def generation(self, user_id):
+        if not self.backend.shared:
+            return Users.get_data_version(user_id) or 0
+        return self.backend.get(f'gen:{user_id}') or 0
+
+    def bump(self, user_ids):
+        if self.backend is None or not self.backend.shared:
+            return
+        for user_id in user_ids:
+            self.backend.incr(f'gen:{user_id}')
+
+    def key(self, user_id, generation):
+        args = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+        return f'resp:{user_id}:{generation}:{request.endpoint}:{args}'
+
+    def get(self, key):
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(value)
+
+    def store(self, key, response):
+        entry = {
+            'body': response.get_data(as_text=True),
+            'content_type': response.content_type,
+            'headers': {name: response.headers[name] for name in ('ETag', 'Cache-Control') if name in response.headers},
+        }
+        self.backend.set(key, json.dumps(entry), ex=self.ttl)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'size': self.backend.size() if self.backend else 0,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.backend.evictions if self.backend else 0,
+        }
+
+
+def _cached_response(entry):
+    response = make_response(entry['body'], 200)
+    response.content_type = entry['content_type']
+    response.headers.update(entry['headers'])
+    if response.get_etag()[0] and request.if_none_match.contains(response.get_etag()[0]):
+        response = make_response('', 304)
+        response.headers.update(entry['headers'])
+    return response
+
+
+def cached_response(fn):
+    """Serve a user's GET from the response cache; goes under user_access_required.
+
+    Only 200 responses are stored. Sits above conditional_get so that a hit
+    also answers If-None-Match from the stored ETag.
+    """
+    @wraps(fn)
+    def decorator(*args, **kwargs):
+        cache = current_app.extensions.get('response_cache')
+        if cache is None or not cache.enabled:
+            return fn(*args, **kwargs)
+
+        # read the generation first: a write committed mid-request orphans this entry
+        key = cache.key(kwargs['id'], cache.generation(kwargs['id']))
+        entry = cache.get(key)
+        if entry is not None:
+            return _cached_response(entry)
+
+        response = make_response(fn(*args, **kwargs))
+        if response.status_code == 200:
+            cache.store(key, response)
+        return response
+
+    return decorator
+
+
+def _bump_generations_after_commit(session):
+    user_ids = session.info.pop('changed_user_ids', None)
+    # pool workers and CLI commands may commit without an app context
+    cache = current_app.extensions.get('response_cache') if current_app else None
+    if user_ids and cache is not None:
+        cache.bump(user_ids)
+
+
+def _init_session_events():
+    # bump_data_version() records the users it touched in session.info; generations
+    # move only once those writes are visible to other connections (ids left over
+    # from a rolled back transaction just cause one extra, harmless bump)
+    if not event.contains(db.session, 'after_commit', _bump_generations_after_commit):
+        event.listen(db.session, 'after_commit', _bump_generations_after_commit)
@@ -0,0 +1,85 @@
+import threading
+import time
+from datetime import timedelta
+
+from .. import db
+from ..models.token import TokenBlockList, utcnow
+
+
+class RevocationCache:
+    """Per-worker copy of the revoked jtis so the blocklist check skips the database.
+
+    A refresh pulls the rows created since the newest one seen, minus
+    overlap_seconds: a row from a slower transaction commits after newer ones,
+    so it is caught by the next refresh as long as that transaction took less
+    than the overlap. The whole set is also reloaded every full_reload_seconds,
+    which is when expired entries drop out too.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._revoked = {}  # jti -> expires_at (naive UTC) or None
+        self._seen_until = None  # newest create_at seen (naive UTC)
+        self._last_refresh = None
+        self._last_full_reload = None
+        self.refresh_seconds = 5.0
+        self.full_reload_seconds = 300.0
+        self.overlap_seconds = 60.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.refresh_seconds = app.config.get('JWT_REVOCATION_REFRESH_SECONDS', self.refresh_seconds)
+        self.full_reload_seconds = app.config.get('JWT_REVOCATION_FULL_RELOAD_SECONDS', self.full_reload_seconds)
+        self.overlap_seconds = app.config.get('JWT_REVOCATION_OVERLAP_SECONDS', self.overlap_seconds)
+
+    def is_revoked(self, jti):
+        now = time.monotonic()
+        if self._last_refresh is None or now - self._last_refresh >= self.refresh_seconds:
+            self._refresh(now)
+        return jti in self._revoked
+
+    def add(self, jti, expires_at=None):
+        # the worker that handled the logout sees it straight away
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    def clear(self):
+        with self._lock:
+            self._revoked = {}
+            self._seen_until = None
+            self._last_refresh = None
+            self._last_full_reload = None
+
+    def _refresh(self, now):
+        with self._lock:
+            # another thread may have refreshed while we waited on the lock
+            if self._last_refresh is not None and now - self._last_refresh < self.refresh_seconds:
+                return
+
+            full_reload = (self._last_full_reload is None
+                           or now - self._last_full_reload >= self.full_reload_seconds)
+
+            started = utcnow()
+            query = db.session.query(TokenBlockList.jti, TokenBlockList.expires_at, TokenBlockList.create_at)
+            if not full_reload:
+                query = query.filter(
+                    TokenBlockList.create_at >= self._seen_until - timedelta(seconds=self.overlap_seconds))
+            rows = query.all()
+
+            if full_reload:
+                cutoff = utcnow()
+                revoked = {}
+                for row in rows:
+                    if row.expires_at is None or row.expires_at > cutoff:
+                        revoked[row.jti] = row.expires_at
+                self._revoked = revoked
+                self._last_full_reload = now
+            else:
+                for row in rows:
+                    self._revoked[row.jti] = row.expires_at
+
+            # nothing seen yet: rows from now on (less the overlap) are new
+            self._seen_until = max((row.create_at for row in rows if row.create_at is not None),
+                                   default=self._seen_until or started)
+            self._last_refresh = now
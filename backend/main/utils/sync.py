@@ -0,0 +1,95 @@
+from sqlalchemy import and_, or_
+
+from ..models import Users, DeletedRecord
+from .versioning import SYNCED_MODELS
+
+
+# upper bound on rows per record type in one /changes response
+MAX_CHANGES_PER_TYPE = 1000
+
+# record streams in cursor order; tombstones come last within a sequence
+_STREAMS = [(name, model, pk) for name, (model, pk) in SYNCED_MODELS.items()] + [
+    ('deleted', DeletedRecord, DeletedRecord.tombstone_id),
+]
+_STREAM_INDEX = {name: index for index, (name, _, _) in enumerate(_STREAMS)}
+
+
+def _record(obj):
+    record = obj.to_dict()
+    record['updated_at'] = obj.updated_at.isoformat() if obj.updated_at else None
+    record['change_seq'] = obj.change_seq
+    return record
+
+
+def parse_cursor(value):
+    """Position from a `since` value: `<seq>` or a `<seq>:<type>:<pk>` next_since.
+
+    Positions are (change_seq, stream index, pk) tuples; a plain sequence means
+    everything up to and including that sequence was seen (pk None).
+    Raises ValueError for anything else.
+    """
+    parts = value.split(':')
+    if len(parts) == 1 and parts[0].isdigit():
+        return int(parts[0]), len(_STREAMS) - 1, None
+    if len(parts) == 3 and parts[0].isdigit() and parts[1] in _STREAM_INDEX and parts[2].isdigit():
+        return int(parts[0]), _STREAM_INDEX[parts[1]], int(parts[2])
+    raise ValueError(value)
+
+
+def _format_cursor(position):
+    seq, stream, pk = position
+    if pk is None:
+        return str(seq)
+    return f'{seq}:{_STREAMS[stream][0]}:{pk}'
+
+
+def _after(model, pk, stream, position):
+    """Rows of `stream` that come after `position` in (change_seq, stream, pk) order."""
+    seq, at_stream, at_pk = position
+    if at_pk is None or stream < at_stream:
+        return model.change_seq > seq
+    if stream > at_stream:
+        return model.change_seq >= seq
+    return or_(model.change_seq > seq, and_(model.change_seq == seq, pk > at_pk))
+
+
+def collect_changes(user_id, since=None, limit=500):
+    """Records written and deleted after position `since`, oldest first.
+
+    `since=None` is the initial sync (rows that predate change tracking carry
+    sequence 0). Rows are paged on (change_seq, pk), so no record type returns
+    more than `limit` rows, even for one bulk insert sharing a sequence. The
+    caller stores `next_since` and repeats while `has_more`.
+    """
+    position = since if since is not None else (-1, len(_STREAMS) - 1, None)
+    current = Users.get_data_version(user_id) or 0
+
+    # one row past the limit tells whether a stream stopped early
+    fetched = []
+    for stream, (name, model, pk) in enumerate(_STREAMS):
+        rows = model.query.filter(
+            model.id == user_id,
+            _after(model, pk, stream, position),
+            model.change_seq <= current,
+        ).order_by(model.change_seq, pk).limit(limit + 1).all()
+        fetched.append([((row.change_seq, stream, getattr(row, pk.key)), row) for row in rows])
+
+    # the page ends at the earliest last row among streams that hit the limit
+    page_end = min((rows[limit - 1][0] for rows in fetched if len(rows) > limit), default=None)
+    if page_end is not None:
+        fetched = [[(key, row) for key, row in rows if key <= page_end] for rows in fetched]
+
+    *records, tombstones = fetched
+    changes = {name: [_record(row) for _, row in rows] for name, rows in zip(SYNCED_MODELS, records)}
+    if page_end is not None:
+        next_since = _format_cursor(page_end)
+    else:
+        next_since = str(max(current, position[0], 0))
+
+    return {
+        'since': _format_cursor(since) if since is not None else None,
+        'next_since': next_since,
+        'has_more': page_end is not None,
+        'changes': changes,
+        'deleted': [tombstone.to_dict() for _, tombstone in tombstones],
+    }
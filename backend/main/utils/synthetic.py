@@ -0,0 +1,313 @@
+import time
+from io import StringIO
+
+import numpy as np
+from sqlalchemy import func, insert, select, text
+
+from .. import db
+from ..models import Users, UserInfo, DailySymptoms, FoodLog, Labs, Treatments, DailyRollup
+from .passwords import current_password_hasher
+
+
+# users generated (and committed) together; fixed so a seed gives the same data whatever the batch size
+BLOCK_USERS = 500
+
+# mean records of each type per user, as a share of --records-per-user
+RATES = {'symptoms': 1.0, 'food_logs': 1.0, 'treatments': 0.25, 'labs': 0.1}
+
+FEMALE_NAMES = ('Mary', 'Patricia', 'Jennifer', 'Linda', 'Elizabeth', 'Susan', 'Jessica', 'Sarah', 'Karen',
+                'Lisa', 'Nancy', 'Maria', 'Sofia', 'Aisha', 'Mei', 'Priya', 'Fatima', 'Olga', 'Ana', 'Grace')
+MALE_NAMES = ('James', 'Robert', 'John', 'Michael', 'David', 'William', 'Richard', 'Joseph', 'Thomas',
+              'Daniel', 'Carlos', 'Ahmed', 'Wei', 'Raj', 'Ivan', 'Kwame', 'Luis', 'Omar', 'Kenji', 'Paul')
+LAST_NAMES = ('Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez',
+              'Martinez', 'Hernandez', 'Lopez', 'Wilson', 'Anderson', 'Nguyen', 'Kim', 'Patel', 'Chen',
+              'Okafor', 'Ivanova', 'Cohen', 'Silva', 'Khan', 'Tanaka', 'Murphy')
+GENDERS = ('female', 'male', 'other')
+DIAGNOSES = ('hypertension', 'type 2 diabetes', 'migraine', 'asthma', 'osteoarthritis', 'IBS',
+             'hypothyroidism', 'anxiety', 'GERD', 'fibromyalgia')
+INSURERS = ('Aetna', 'Blue Cross', 'Cigna', 'Kaiser', 'Medicare', 'Medicaid', 'UnitedHealthcare', 'None')
+
+SYMPTOM_TYPES = ('headache', 'nausea', 'fatigue', 'joint pain', 'dizziness', 'back pain', 'insomnia',
+                 'abdominal pain', 'shortness of breath', 'rash')
+SYMPTOM_NOTES = ('Not provided', 'woke up with it', 'after lunch', 'better after rest',
+                 'worse in the evening', 'took ibuprofen', 'after exercise', 'stressful day')
+# (meal, calories)
+BREAKFASTS = (('oatmeal, banana', 350), ('eggs, toast', 400), ('yogurt, granola', 320), ('coffee', 5),
+              ('cereal, milk', 300), ('bagel, cream cheese', 450), ('smoothie', 280), ('pancakes', 520))
+LUNCHES = (('turkey sandwich', 480), ('salad, chicken', 420), ('rice, beans', 550), ('pasta', 650),
+           ('soup, bread', 400), ('burrito', 720), ('sushi', 500), ('leftovers', 600))
+DINNERS = (('salmon, rice', 620), ('chicken, vegetables', 540), ('pizza', 850), ('steak, potatoes', 900),
+           ('stir fry', 600), ('lentil curry', 560), ('tacos', 700), ('spaghetti', 750))
+FOOD_NOTES = (None, None, None, 'ate late', 'skipped snacks', 'dessert', 'ate out')
+TREATMENT_NAMES = ('ibuprofen', 'physiotherapy', 'metformin', 'lisinopril', 'rest', 'sumatriptan',
+                   'levothyroxine', 'inhaler', 'cognitive behavioural therapy', 'vitamin d')
+TREATMENT_NOTES = ('Not provided', 'with food', 'twice daily', 'follow-up in two weeks', 'as needed')
+
+# share of entries logged at each hour of the day: a morning and an evening peak
+HOURS = np.array([1, 1, 1, 1, 1, 2, 5, 9, 10, 8, 6, 5, 6, 5, 4, 4, 5, 6, 8, 9, 8, 6, 3, 2], dtype=float)
+HOURS /= HOURS.sum()
+
+
+def _timestamps(rng, start_days, user_rows, end, days, future_days=0):
+    # uniform over each user's active window [their first day, end + future_days)
+    span = days - start_days[user_rows] + future_days
+    offset_days = start_days[user_rows] + (rng.random(len(user_rows)) * span).astype(np.int64)
+    minutes = rng.choice(24, size=len(user_rows), p=HOURS) * 60 + rng.integers(0, 60, len(user_rows))
+    first_day = end - np.timedelta64(days, 'D')
+    return first_day.astype('datetime64[m]') + (offset_days * 1440 + minutes).astype('timedelta64[m]')
+
+
+def _pick(rng, choices, size, p=None):
+    return np.array(choices, dtype=object)[rng.choice(len(choices), size=size, p=p)]
+
+
+def _generate_block(rng, first_index, first_id, count, records_per_user, end, days, password_hash, seed):
+    """Column arrays for `count` users (numbered from `first_index`, ids from `first_id`) and their records."""
+    n = np.arange(count)
+    user_ids = first_id + n
+
+    # the people
+    gender = rng.choice(3, size=count, p=(0.51, 0.47, 0.02))
+    female = gender == 0
+    first_names = np.where(female, _pick(rng, FEMALE_NAMES, count), _pick(rng, MALE_NAMES, count))
+    usernames = np.array([f'synth{seed}_{first_index + i}' for i in n], dtype=object)
+    age = np.clip(rng.normal(46, 17, count), 18, 92).astype(np.int64)
+    height = np.where(female, rng.normal(64, 2.8, count), rng.normal(69.5, 3, count)).round().astype(np.int64)
+    weight = np.clip(np.where(female, rng.normal(168, 36, count), rng.normal(197, 38, count)), 95, 420).round(1)
+    diagnoses = np.array([', '.join(sorted(set(_pick(rng, DIAGNOSES, k)))) for k in rng.poisson(0.9, count)],
+                         dtype=object)
+
+    # how much each person logs (active users log everything), from when, and their usual complaint
+    engagement = rng.gamma(2.0, 0.5, count)
+    start_days = (rng.random(count) ** 2 * days).astype(np.int64)  # more long-standing accounts than new ones
+    usual_symptom = rng.integers(0, len(SYMPTOM_TYPES), count)
+    usual_severity = rng.uniform(1, 7, count)
+    systolic = rng.normal(124, 14, count)
+    diastolic = rng.normal(79, 9, count)
+
+    def rows_for(kind):
+        counts = rng.poisson(records_per_user * RATES[kind] * engagement)
+        return np.repeat(n, counts)
+
+    s = rows_for('symptoms')
+    s_on = _timestamps(rng, start_days, s, end, days)
+    s_type = np.where(rng.random(len(s)) < 0.65, usual_symptom[s], rng.integers(0, len(SYMPTOM_TYPES), len(s)))
+    s_severity = np.clip(np.rint(usual_severity[s] + rng.normal(0, 1.6, len(s))), 0, 10).astype(np.int64)
+    # weighed on about a third of entries; 0 means not recorded
+    s_weight = np.where(rng.random(len(s)) < 0.35, (weight[s] + rng.normal(0, 2.5, len(s))).round(1), 0.0)
+
+    f = rows_for('food_logs')
+    f_on = _timestamps(rng, start_days, f, end, days)
+    meals = [rng.integers(0, len(options), len(f)) for options in (BREAKFASTS, LUNCHES, DINNERS)]
+    skipped = rng.random(len(f)) < 0.12
+    calories = sum(np.array([kcal for _, kcal in options])[picked]
+                   for options, picked in zip((BREAKFASTS, LUNCHES, DINNERS), meals))
+    calories = np.clip(calories - np.where(skipped, np.array([kcal for _, kcal in BREAKFASTS])[meals[0]], 0)
+                       + rng.normal(250, 180, len(f)), 300, None).round()
+    breakfast = np.where(skipped, None, np.array([meal for meal, _ in BREAKFASTS], dtype=object)[meals[0]])
+
+    t = rows_for('treatments')
+    t_on = _timestamps(rng, start_days, t, end, days, future_days=30)
+    t_done = (t_on < end) & (rng.random(len(t)) < 0.85)
+
+    lab = rows_for('labs')
+    lab_on = _timestamps(rng, start_days, lab, end, days)
+    lab_systolic = np.rint(systolic[lab] + rng.normal(0, 7, len(lab))).astype(np.int64)
+    lab_diastolic = np.minimum(np.rint(diastolic[lab] + rng.normal(0, 5, len(lab))), lab_systolic - 20).astype(np.int64)
+    lab_rbc = np.where(female[lab], rng.normal(4.5, 0.35, len(lab)), rng.normal(5.0, 0.4, len(lab))).round(2)
+
+    # change_seq: every user's records numbered in the order they were written, as single adds would be
+    owners = np.concatenate([s, f, t, lab])
+    written = np.concatenate([s_on, f_on, np.minimum(t_on, end.astype('datetime64[m]')), lab_on])
+    order = np.lexsort((written, owners))
+    seq = np.empty(len(owners), dtype=np.int64)
+    first_row = np.searchsorted(owners[order], n)
+    seq[order] = np.arange(len(owners)) - first_row[owners[order]] + 1
+    s_seq, f_seq, t_seq, lab_seq = np.split(seq, np.cumsum([len(s), len(f), len(t)]))
+    data_version = np.bincount(owners, minlength=count)
+
+    tables = {
+        Users: {
+            'id': user_ids,
+            'first_name': first_names,
+            'last_name': _pick(rng, LAST_NAMES, count),
+            'username': usernames,
+            'email': np.array([f'{name}@example.com' for name in usernames], dtype=object),
+            'password_hash': np.full(count, password_hash, dtype=object),
+            'data_version': data_version,
+        },
+        UserInfo: {
+            'id': user_ids,
+            'age': age,
+            'gender': np.array(GENDERS, dtype=object)[gender],
+            'weight_lbs': weight,
+            'height_ft': height // 12,
+            'height_in': height % 12,
+            'current_diagnoses': diagnoses,
+            'medical_history': np.where(rng.random(count) < 0.3, _pick(rng, DIAGNOSES, count), ''),
+            'insurance': _pick(rng, INSURERS, count),
+        },
+        DailySymptoms: {
+            'id': user_ids[s],
+            'severity': s_severity,
+            'type_of_symptom': np.array(SYMPTOM_TYPES, dtype=object)[s_type],
+            'weight_lbs': s_weight,
+            'recorded_on': s_on,
+            'notes': _pick(rng, SYMPTOM_NOTES, len(s)),
+            'updated_at': s_on,
+            'change_seq': s_seq,
+        },
+        FoodLog: {
+            'id': user_ids[f],
+            'breakfast': breakfast,
+            'lunch': np.array([meal for meal, _ in LUNCHES], dtype=object)[meals[1]],
+            'dinner': np.array([meal for meal, _ in DINNERS], dtype=object)[meals[2]],
+            'notes': _pick(rng, FOOD_NOTES, len(f)),
+            'total_calories': calories,
+            'recorded_on': f_on,
+            'updated_at': f_on,
+            'change_seq': f_seq,
+        },
+        Treatments: {
+            'id': user_ids[t],
+            'treatment_name': _pick(rng, TREATMENT_NAMES, len(t)),
+            'scheduled_on': t_on,
+            'notes': _pick(rng, TREATMENT_NOTES, len(t)),
+            'is_completed': t_done,
+            'updated_at': np.minimum(t_on, end.astype('datetime64[m]')),
+            'change_seq': t_seq,
+        },
+        Labs: {
+            'id': user_ids[lab],
+            'systolic_pressure': lab_systolic,
+            'diastolic_pressure': lab_diastolic,
+            'rbc_count': lab_rbc,
+            'updated_at': lab_on,
+            'change_seq': lab_seq,
+        },
+    }
+    tables[DailyRollup] = _rollups(user_ids, s, s_on, s_severity, s_weight, f, f_on, calories)
+    return tables
+
+
+def _rollups(user_ids, s, s_on, severity, weight, f, f_on, calories):
+    # the daily_rollup rows refresh_days() would write, aggregated here instead of per (user, day)
+    s_day, f_day = s_on.astype('datetime64[D]'), f_on.astype('datetime64[D]')
+    keys, inverse = np.unique(
+        np.rec.fromarrays([np.concatenate([s, f]), np.concatenate([s_day, f_day]).astype(np.int64)]),
+        return_inverse=True,
+    )
+    inverse = inverse.ravel()
+    s_key, f_key = inverse[:len(s)], inverse[len(s):]
+    size = len(keys)
+    weighed = weight > 0
+
+    severity_max = np.full(size, -1, dtype=np.int64)
+    np.maximum.at(severity_max, s_key, severity)
+    symptom_count = np.bincount(s_key, minlength=size)
+    return {
+        'id': user_ids[keys['f0']],
+        'day': keys['f1'].astype('datetime64[D]'),
+        'symptom_count': symptom_count,
+        'severity_sum': np.bincount(s_key, weights=severity, minlength=size).astype(np.int64),
+        'severity_max': np.where(symptom_count > 0, severity_max.astype(object), None),
+        'weight_sum': np.bincount(s_key, weights=np.where(weighed, weight, 0.0), minlength=size),
+        'weight_count': np.bincount(s_key, weights=weighed, minlength=size).astype(np.int64),
+        'foodlog_count': np.bincount(f_key, minlength=size),
+        'calories_sum': np.bincount(f_key, weights=calories, minlength=size),
+    }
+
+
+def _copy_text(values):
+    # one column in COPY text format: \N for NULL, tabs / newlines / backslashes escaped
+    if np.issubdtype(values.dtype, np.datetime64):
+        return np.datetime_as_string(values).tolist()
+    if values.dtype == bool:
+        return np.where(values, 't', 'f').tolist()
+    if values.dtype != object:
+        return values.astype(str).tolist()
+    return [
+        r'\N' if value is None else
+        str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+        for value in values
+    ]
+
+
+def _copy(connection, model, columns, batch_size):
+    # PostgreSQL: the whole block in one COPY, formatted column by column
+    lines = '\n'.join('\t'.join(row) for row in zip(*(_copy_text(values) for values in columns.values())))
+    with connection.connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {model.__tablename__} ({', '.join(columns)}) FROM STDIN",
+            StringIO(lines + '\n' if lines else ''),
+        )
+
+
+def _insert(connection, model, columns, batch_size):
+    # everything else: executemany INSERTs of batch_size rows (Core, so no ORM events)
+    rows = [dict(zip(columns, row)) for row in zip(*(values.tolist() for values in columns.values()))]
+    statement = insert(model.__table__)
+    for start in range(0, len(rows), batch_size):
+        connection.execute(statement, rows[start:start + batch_size])
+
+
+def generate(users, records_per_user, days, end_date, seed, password, batch_size=5000, echo=None):
+    """Create `users` synthetic accounts with records, rollups and sync sequence numbers.
+
+    Reproducible: the same seed, counts and dates give the same rows (only the
+    ids depend on what the database already holds). Loads with COPY on
+    PostgreSQL and batched INSERTs elsewhere, committing every BLOCK_USERS
+    users, and returns rows and rows per second for each table.
+    """
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+    if db.session.scalar(select(Users.id).where(Users.username == f'synth{seed}_0')) is not None:
+        raise ValueError(f'Users for seed {seed} already exist; pick another --seed or use a fresh database')
+
+    load = _copy if dialect == 'postgresql' else _insert
+    end = np.datetime64(end_date, 'D')
+    password_hash = current_password_hasher().hash(password)
+    next_user = (db.session.scalar(select(func.max(Users.id))) or 0) + 1
+
+    totals = {model.__tablename__: {'rows': 0, 'seconds': 0.0} for model in
+              (Users, UserInfo, DailySymptoms, FoodLog, Treatments, Labs, DailyRollup)}
+    generate_seconds = 0.0
+    started = time.perf_counter()
+    for block, first in enumerate(range(0, users, BLOCK_USERS)):
+        count = min(BLOCK_USERS, users - first)
+        t0 = time.perf_counter()
+        tables = _generate_block(np.random.default_rng([seed, block]), first, next_user + first, count,
+                                 records_per_user, end, days, password_hash, seed)
+        generate_seconds += time.perf_counter() - t0
+
+        connection = db.session.connection()
+        for model, columns in tables.items():
+            t0 = time.perf_counter()
+            load(connection, model, columns, batch_size)
+            totals[model.__tablename__]['seconds'] += time.perf_counter() - t0
+            totals[model.__tablename__]['rows'] += len(columns['id'])
+        db.session.commit()
+        if echo:
+            echo(f'{first + count}/{users} users')
+
+    connection = db.session.connection()
+    if dialect == 'postgresql':
+        # users went in with explicit ids
+        connection.execute(text("SELECT setval(pg_get_serial_sequence('users', 'id'), (SELECT max(id) FROM users))"))
+    # fresh planner statistics for the new table sizes
+    for name in totals:
+        connection.execute(text(f'ANALYZE {name}'))
+    db.session.commit()
+    seconds = time.perf_counter() - started
+
+    rows = sum(table['rows'] for table in totals.values())
+    for table in totals.values():
+        table['rows_per_second'] = table['rows'] / table['seconds'] if table['seconds'] else 0.0
+    return {
+        'tables': totals,
+        'rows': rows,
+        'seconds': seconds,
+        'generate_seconds': generate_seconds,
+        'rows_per_second': rows / seconds if seconds else 0.0,
+        'method': 'copy' if load is _copy else 'insert',
+    }
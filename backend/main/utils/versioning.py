@@ -0,0 +1,84 @@
+from sqlalchemy import event, update
+
+from .. import db
+from ..models import Users, UserInfo, DailySymptoms, FoodLog, Treatments, Labs, DeletedRecord
+
+
+# every model here keeps its owner's id in the `id` column
+VERSIONED_MODELS = (Users, UserInfo, DailySymptoms, FoodLog, Treatments, Labs)
+
+# record tables served by delta sync: type name -> (model, primary key)
+SYNCED_MODELS = {
+    'symptoms': (DailySymptoms, DailySymptoms.symptoms_id),
+    'food_logs': (FoodLog, FoodLog.foodlog_id),
+    'treatments': (Treatments, Treatments.treatment_id),
+    'labs': (Labs, Labs.lab_id),
+}
+_SYNCED_TYPES = {model: (name, pk) for name, (model, pk) in SYNCED_MODELS.items()}
+
+
+def bump_data_version(user_ids, session=None):
+    """Increment users.data_version for each user id inside the current transaction.
+
+    Used directly by writes that bypass the ORM unit of work (bulk inserts);
+    ORM writes are picked up by the before_flush hook below. Returns
+    {user id: new version}; the version doubles as the user's change sequence.
+    The UPDATE holds the user's row lock until commit, so sequences commit in order.
+    """
+    session = session or db.session
+    # picked up after commit by the response cache to bump its generations
+    session.info.setdefault('changed_user_ids', set()).update(user_ids)
+    versions = {}
+    for user_id in sorted(set(user_ids)):
+        versions[user_id] = session.execute(
+            update(Users)
+            .where(Users.id == user_id)
+            .values(data_version=Users.data_version + 1)
+            .returning(Users.data_version)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+    return versions
+
+
+def _changed_user_ids(session):
+    user_ids = set()
+    for obj in session.new:
+        # a brand new user has no id yet; it starts at version 0 anyway
+        if isinstance(obj, VERSIONED_MODELS) and obj.id is not None:
+            user_ids.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, VERSIONED_MODELS):
+            user_ids.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, VERSIONED_MODELS) and session.is_modified(obj, include_collections=False):
+            user_ids.add(obj.id)
+    return user_ids
+
+
+def _stamp_changes(session, versions):
+    # rows written in this flush carry the new sequence; deletes leave a tombstone
+    written = list(session.new) + [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    for obj in written:
+        if type(obj) in _SYNCED_TYPES and versions.get(obj.id) is not None:
+            obj.change_seq = versions[obj.id]
+    for obj in session.deleted:
+        if type(obj) in _SYNCED_TYPES and versions.get(obj.id) is not None:
+            record_type, pk = _SYNCED_TYPES[type(obj)]
+            session.add(DeletedRecord(
+                id=obj.id,
+                record_type=record_type,
+                record_id=getattr(obj, pk.key),
+                change_seq=versions[obj.id],
+            ))
+
+
+def _bump_versions_on_flush(session, flush_context, instances):
+    user_ids = _changed_user_ids(session)
+    if user_ids:
+        _stamp_changes(session, bump_data_version(user_ids, session))
+
+
+def init_versioning():
+    # create_app() can run more than once per process (tests, pool workers)
+    if not event.contains(db.session, 'before_flush', _bump_versions_on_flush):
+        event.listen(db.session, 'before_flush', _bump_versions_on_flush)
@@ -0,0 +1,254 @@
+"""API latency and throughput under concurrent load.
+
+Boots the app against --database-url (default DATABASE_URL; use a scratch
+database, it creates users and records), seeds --users accounts with --rows
+records of each type, then runs every scenario for --requests calls spread
+over --concurrency threads and reports p50/p90/p99 latency and requests per
+second. Calls go through the WSGI app in process (no HTTP server), so numbers
+are for the app plus the database and compare between branches on one machine.
+
+    python -m benchmarks.api_load --database-url sqlite:////tmp/bench.db --output results/main.json
+    python -m benchmarks.api_load --database-url sqlite:////tmp/bench2.db --compare results/main.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+
+PASSWORD = 'benchmark-password'
+
+SCENARIOS = ('login', 'list_page', 'list_cursor', 'get_one', 'write', 'export')
+
+LISTS = {
+    'symptoms': '/my-symptoms',
+    'food_logs': '/food-logs',
+    'labs': '/labs',
+    'treatments': '/treatments',
+}
+
+
+def percentile(samples, pct):
+    # same nearest-rank rule as benchmarks.login_storm (not imported: it loads the app at import)
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def seed(app, users, rows, rng):
+    """Create `users` accounts with `rows` records of each type; returns their sessions."""
+    from benchmarks.bulk_ingest import ENDPOINTS
+
+    client = app.test_client()
+    # fresh names each run, so a database can be reused
+    run_id = uuid.uuid4().hex[:8]
+    sessions = []
+    for n in range(users):
+        name = f'load_{run_id}_{n}'
+        response = client.post('/api/auth/register', json={
+            'first_name': 'Load', 'username': name, 'email': f'{name}@example.com',
+            'password': PASSWORD, 'confirm_password': PASSWORD,
+        })
+        assert response.status_code == 201, response.get_json()
+        tokens = client.post('/api/auth/login-username', json={'username': name, 'password': PASSWORD}).get_json()['tokens']
+        headers = {'Authorization': f"Bearer {tokens['access']}"}
+        user_id = client.get('/api/users/me', headers=headers).get_json()['id']
+
+        ids = {}
+        for kind, (_, bulk_url, make) in ENDPOINTS.items():
+            records = [make(i) for i in range(rows)]
+            for record in records:
+                # spread the dates so list pages and cursors walk real ranges
+                for field in ('recorded_on', 'scheduled_on'):
+                    if field in record:
+                        record[field] = f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00'
+            response = client.post(f'/api/user/{user_id}{bulk_url}', json=records, headers=headers)
+            assert response.status_code == 201, response.get_json()
+            # each result carries the new id under the record's key name (symptoms_id, lab_id, ...)
+            ids[kind] = [value for result in response.get_json()['results']
+                         for key, value in result.items() if key not in ('index', 'status')]
+        sessions.append({'id': user_id, 'username': name, 'headers': headers, 'ids': ids})
+    return sessions
+
+
+def scenario_requests(name, session, rng, per_page):
+    """One call of a scenario as (method, url, kwargs)."""
+    base = f"/api/user/{session['id']}"
+    headers = session['headers']
+    kind = rng.choice(list(LISTS))
+    if name == 'login':
+        return 'POST', '/api/auth/login-username', {'json': {'username': session['username'], 'password': PASSWORD}}
+    if name == 'list_page':
+        pages = max(1, len(session['ids'][kind]) // per_page)
+        return 'GET', f'{base}{LISTS[kind]}?page={rng.randint(1, min(pages, 10))}&per_page={per_page}', {'headers': headers}
+    if name == 'list_cursor':
+        return 'GET', f'{base}{LISTS[kind]}?cursor=&per_page={per_page}', {'headers': headers}
+    if name == 'get_one':
+        detail = {'symptoms': '/symptom/{}', 'food_logs': '/food-logs/{}', 'labs': '/labs/{}', 'treatments': '/treatments/{}'}
+        return 'GET', base + detail[kind].format(rng.choice(session['ids'][kind])), {'headers': headers}
+    if name == 'write':
+        return 'POST', f'{base}/symptom/add', {'headers': headers, 'json': {
+            'severity': rng.randint(0, 10), 'type_of_symptom': 'headache', 'recorded_on': '2025-06-01T08:00:00'}}
+    if name == 'export':
+        return 'GET', f'{base}/export?format=csv&types=symptoms', {'headers': headers}
+    raise ValueError(f'Unknown scenario {name}')
+
+
+def load(app, name, sessions, requests, concurrency, per_page, seed_value):
+    local = threading.local()
+    lock = threading.Lock()
+    latencies, statuses = [], {}
+    # the same call sequence every run for a given --seed
+    rng = random.Random(f'{seed_value}:{name}')
+    calls = [scenario_requests(name, sessions[i % len(sessions)], rng, per_page) for i in range(requests)]
+
+    def call(i):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        method, url, kwargs = calls[i]
+        start = time.perf_counter()
+        response = client.open(url, method=method, **kwargs)
+        response.get_data()  # streamed bodies (exports) do their work while being read
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(call, range(requests)))
+    seconds = time.perf_counter() - start
+
+    ok = sum(count for status, count in statuses.items() if status < 400)
+    return {
+        'requests': requests,
+        'seconds': round(seconds, 3),
+        'requests_per_second': round(ok / seconds, 1),
+        'errors': requests - ok,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p90_ms': round(percentile(latencies, 90) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(max(latencies) * 1000, 2),
+    }
+
+
+def git_revision():
+    def git(*args):
+        try:
+            return subprocess.run(['git', *args], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {'commit': git('rev-parse', '--short', 'HEAD'), 'branch': git('rev-parse', '--abbrev-ref', 'HEAD'),
+            'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))}
+
+
+def run(users, rows, requests, concurrency, scenarios, per_page, seed_value):
+    from backend.main import app
+
+    rng = random.Random(seed_value)
+    started = time.perf_counter()
+    sessions = seed(app, users, rows, rng)
+    seed_seconds = time.perf_counter() - started
+
+    results = {}
+    for name in scenarios:
+        # one untimed pass so connection setup and first-hit caches don't land in p99
+        load(app, name, sessions, min(requests, concurrency * 2), concurrency, per_page, f'warmup:{seed_value}')
+        results[name] = load(app, name, sessions, requests, concurrency, per_page, seed_value)
+
+    config = app.config
+    return {
+        'run': {
+            'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            **git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'settings': {
+            'database': config['SQLALCHEMY_DATABASE_URI'].split('://')[0],
+            'users': users,
+            'rows_per_type': rows,
+            'requests': requests,
+            'concurrency': concurrency,
+            'per_page': per_page,
+            'seed': seed_value,
+            'response_cache': config.get('RESPONSE_CACHE_BACKEND'),
+            'password_hash_method': config.get('PASSWORD_HASH_METHOD'),
+            'password_hash_workers': config.get('PASSWORD_HASH_WORKERS'),
+        },
+        'seed_seconds': round(seed_seconds, 2),
+        'results': results,
+    }
+
+
+def compare(current, baseline, max_regression):
+    """Per-scenario change against a saved run; regressions past max_regression (a ratio) are flagged."""
+    report, regressed = {}, []
+    for name, result in current['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if not before:
+            continue
+        report[name] = {
+            'p50_change': round(result['p50_ms'] / before['p50_ms'] - 1, 3) if before['p50_ms'] else None,
+            'p99_change': round(result['p99_ms'] / before['p99_ms'] - 1, 3) if before['p99_ms'] else None,
+            'throughput_change': round(result['requests_per_second'] / before['requests_per_second'] - 1, 3)
+            if before['requests_per_second'] else None,
+        }
+        if (report[name]['p99_change'] or 0) > max_regression or (report[name]['throughput_change'] or 0) < -max_regression:
+            regressed.append(name)
+    return {'baseline': baseline.get('run'), 'changes': report, 'regressed': regressed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', help='defaults to DATABASE_URL')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--rows', type=int, default=1000, help='records of each type per user')
+    parser.add_argument('--requests', type=int, default=500, help='timed calls per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='comma separated: ' + ','.join(SCENARIOS))
+    parser.add_argument('--response-cache', choices=('local', 'none'), default='none',
+                        help='RESPONSE_CACHE_BACKEND for the run (default none: measure the database path)')
+    parser.add_argument('--seed', type=int, default=23)
+    parser.add_argument('--output', help='also write the results to this JSON file')
+    parser.add_argument('--compare', help='a previous --output file to diff against')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='with --compare, exit 1 if p99 grows or throughput drops by more than this ratio')
+    args = parser.parse_args()
+
+    # the app reads its config at import time
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    os.environ['RESPONSE_CACHE_BACKEND'] = args.response_cache
+
+    scenarios = args.scenarios.split(',')
+    unknown = set(scenarios).difference(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    result = run(args.users, args.rows, args.requests, args.concurrency, scenarios, args.per_page, args.seed)
+    if args.compare:
+        with open(args.compare) as baseline:
+            result['comparison'] = compare(result, json.load(baseline), args.max_regression)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as output:
+            json.dump(result, output, indent=2)
+    print(json.dumps(result, indent=2))
+    if args.compare and result['comparison']['regressed']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
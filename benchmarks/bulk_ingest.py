@@ -0,0 +1,94 @@
+"""Single-row vs bulk ingest throughput.
+
+Boots the app against DATABASE_URL (use a scratch database, it writes rows),
+registers a throwaway user and times N single-record POSTs against the same N
+records sent through the bulk endpoint, as a JSON array and as NDJSON.
+
+    python -m benchmarks.bulk_ingest --rows 2000
+"""
+import argparse
+import json
+import time
+import uuid
+
+from backend.main import app
+
+
+ENDPOINTS = {
+    'symptoms': ('/symptom/add', '/symptom/bulk-add',
+                 lambda i: {'severity': i % 11, 'type_of_symptom': 'headache', 'weight_lbs': 150.0 + i % 10,
+                            'notes': 'benchmark', 'recorded_on': '2025-01-01T08:00:00'}),
+    'food_logs': ('/food-logs', '/food-logs/bulk',
+                  lambda i: {'breakfast': 'oatmeal', 'lunch': 'salad', 'dinner': 'salmon',
+                             'total_calories': 1800.0 + i % 300, 'recorded_on': '2025-01-01T08:00:00'}),
+    'labs': ('/labs', '/labs/bulk',
+             lambda i: {'systolic_pressure': 110 + i % 30, 'diastolic_pressure': 70 + i % 20, 'rbc_count': 4.7}),
+    'treatments': ('/treatments', '/treatments/bulk',
+                   lambda i: {'treatment_name': 'Metformin 500mg', 'scheduled_on': '2025-01-01T08:00:00',
+                              'is_completed': bool(i % 2)}),
+}
+
+
+def login(client):
+    name = f"bench_{uuid.uuid4().hex[:12]}"
+    password = 'benchmark-password'
+    client.post('/api/auth/register', json={
+        'first_name': 'Bench', 'username': name, 'email': f'{name}@example.com',
+        'password': password, 'confirm_password': password,
+    })
+    tokens = client.post('/api/auth/login-username', json={'username': name, 'password': password}).get_json()['tokens']
+    headers = {'Authorization': f"Bearer {tokens['access']}"}
+    user_id = client.get('/api/users/me', headers=headers).get_json()['id']
+    return user_id, headers
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def run(rows, kinds):
+    client = app.test_client()
+    user_id, headers = login(client)
+    base = f'/api/user/{user_id}'
+    results = {}
+
+    for kind in kinds:
+        single_url, bulk_url, make = ENDPOINTS[kind]
+        records = [make(i) for i in range(rows)]
+
+        def single():
+            for record in records:
+                assert client.post(base + single_url, json=record, headers=headers).status_code == 201
+
+        def bulk_json():
+            assert client.post(base + bulk_url, json=records, headers=headers).status_code == 201
+
+        def bulk_ndjson():
+            body = '\n'.join(json.dumps(record) for record in records)
+            response = client.post(base + bulk_url, data=body,
+                                   headers={**headers, 'Content-Type': 'application/x-ndjson'})
+            assert response.status_code == 201
+
+        results[kind] = {}
+        for mode, fn in (('single', single), ('bulk_json', bulk_json), ('bulk_ndjson', bulk_ndjson)):
+            seconds = timed(fn)
+            results[kind][mode] = {'seconds': round(seconds, 4), 'rows_per_second': round(rows / seconds, 1)}
+        results[kind]['speedup'] = round(
+            results[kind]['bulk_json']['rows_per_second'] / results[kind]['single']['rows_per_second'], 1
+        )
+
+    return {'rows': rows, 'database': app.config['SQLALCHEMY_DATABASE_URI'].split('://')[0], 'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--kinds', default=','.join(ENDPOINTS), help='comma separated: ' + ','.join(ENDPOINTS))
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.kinds.split(',')), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Login throughput and API latency during a login storm.
+
+Boots the app against DATABASE_URL (use a scratch database, it creates users),
+then for each PASSWORD_HASH_WORKERS setting fires --logins concurrent logins
+while a probe thread keeps calling a cheap authenticated endpoint. Reports
+logins/second and the probe's p50/p99 latency next to an idle baseline.
+
+    python -m benchmarks.login_storm --logins 200 --concurrency 16 --workers 0,1,2
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.main import app, password_hasher
+
+
+PASSWORD = 'benchmark-password'
+
+
+def create_users(count):
+    client = app.test_client()
+    names = []
+    for _ in range(count):
+        name = f"storm_{uuid.uuid4().hex[:12]}"
+        response = client.post('/api/auth/register', json={
+            'first_name': 'Storm', 'username': name, 'email': f'{name}@example.com',
+            'password': PASSWORD, 'confirm_password': PASSWORD,
+        })
+        assert response.status_code == 201, response.get_json()
+        names.append(name)
+    return names
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def latency_summary(samples):
+    return {
+        'requests': len(samples),
+        'p50_ms': round(percentile(samples, 50) * 1000, 2),
+        'p99_ms': round(percentile(samples, 99) * 1000, 2),
+        'mean_ms': round(statistics.fmean(samples) * 1000, 2),
+    }
+
+
+def probe(headers, stop, samples):
+    client = app.test_client()
+    while not stop.is_set():
+        start = time.perf_counter()
+        assert client.get('/api/users/me', headers=headers).status_code == 200
+        samples.append(time.perf_counter() - start)
+        time.sleep(0.005)
+
+
+def storm(names, logins, concurrency, headers):
+    statuses = {}
+    lock = threading.Lock()
+
+    def login(i):
+        response = app.test_client().post('/api/auth/login-username',
+                                          json={'username': names[i % len(names)], 'password': PASSWORD})
+        with lock:
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    samples = []
+    stop = threading.Event()
+    prober = threading.Thread(target=probe, args=(headers, stop, samples))
+    prober.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(login, range(logins)))
+    seconds = time.perf_counter() - start
+    stop.set()
+    prober.join()
+
+    return {
+        'seconds': round(seconds, 3),
+        'logins_per_second': round(statuses.get(200, 0) / seconds, 1),
+        'statuses': statuses,
+        'probe': latency_summary(samples),
+    }
+
+
+def run(users, logins, concurrency, workers):
+    names = create_users(users)
+    tokens = app.test_client().post('/api/auth/login-username',
+                                    json={'username': names[0], 'password': PASSWORD}).get_json()['tokens']
+    headers = {'Authorization': f"Bearer {tokens['access']}"}
+
+    baseline = []
+    stop = threading.Event()
+    timer = threading.Timer(1.0, stop.set)
+    timer.start()
+    probe(headers, stop, baseline)
+
+    results = {}
+    for count in workers:
+        app.config['PASSWORD_HASH_WORKERS'] = count
+        password_hasher.init_app(app)
+        results[f'workers={count}' if count else 'inline'] = storm(names, logins, concurrency, headers)
+
+    return {
+        'method': password_hasher.method,
+        'logins': logins,
+        'concurrency': concurrency,
+        'database': app.config['SQLALCHEMY_DATABASE_URI'].split('://')[0],
+        'idle_probe': latency_summary(baseline),
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--workers', default='0,1,2', help='comma separated PASSWORD_HASH_WORKERS values, 0 = inline')
+    args = parser.parse_args()
+    workers = [int(value) for value in args.workers.split(',')]
+    print(json.dumps(run(args.users, args.logins, args.concurrency, workers), indent=2))
+
+
+if __name__ == '__main__':
+    main()
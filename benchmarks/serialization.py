@@ -0,0 +1,100 @@
+"""ORM + marshmallow vs column projection for list pages.
+
+Boots the app against DATABASE_URL (use a scratch database, it writes rows),
+seeds --rows records of each kind for a throwaway user through the bulk
+endpoints, then for a --per-page page of each list checks that the projection
+path renders byte-identical JSON to ORM objects dumped by the marshmallow form
+and times both.
+
+    python -m benchmarks.serialization --rows 2000 --per-page 100
+"""
+import argparse
+import json
+import time
+
+from backend.main import app
+from backend.main.forms import DailySymptomsForm, FoodLogForm, TreatmentsForm, LabsForm
+from backend.main.models import DailySymptoms, FoodLog, Treatments, Labs
+from backend.main.utils import Projection, keyset_order
+from benchmarks.bulk_ingest import ENDPOINTS, login
+
+
+KINDS = {
+    'symptoms': (DailySymptoms, DailySymptomsForm, DailySymptoms.recorded_on, DailySymptoms.symptoms_id),
+    'food_logs': (FoodLog, FoodLogForm, FoodLog.recorded_on, FoodLog.foodlog_id),
+    'treatments': (Treatments, TreatmentsForm, Treatments.scheduled_on, Treatments.treatment_id),
+    'labs': (Labs, LabsForm, None, Labs.lab_id),
+}
+
+
+def seed(client, user_id, headers, rows):
+    for kind in KINDS:
+        _, bulk_url, make = ENDPOINTS[kind]
+        records = [make(i) for i in range(rows)]
+        # leave some optional fields out, so NULL handling is compared too
+        for record in records[::7]:
+            for key in ('scheduled_on', 'rbc_count', 'notes'):
+                record.pop(key, None)
+        response = client.post(f'/api/user/{user_id}{bulk_url}', json=records, headers=headers)
+        assert response.status_code == 201, response.get_json()['message']
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def run(rows, per_page, repeat):
+    client = app.test_client()
+    user_id, headers = login(client)
+    seed(client, user_id, headers, rows)
+
+    results = {}
+    with app.app_context():
+        for kind, (model, form, sort_column, pk_column) in KINDS.items():
+            projection = Projection(model, form)
+            order = keyset_order(sort_column, pk_column)
+
+            def orm():
+                items = model.query.filter_by(id=user_id).order_by(*order).limit(per_page).all()
+                return form().dump(items, many=True)
+
+            def projected():
+                items = projection.query().filter(model.id == user_id).order_by(*order).limit(per_page).all()
+                return projection.dump_many(items)
+
+            expected, orm_seconds = best_of(orm, repeat)
+            actual, projection_seconds = best_of(projected, repeat)
+            identical = app.json.dumps(expected).encode() == app.json.dumps(actual).encode()
+            assert identical, f'{kind}: projection output differs from marshmallow'
+
+            results[kind] = {
+                'identical': identical,
+                'orm_marshmallow_ms': round(orm_seconds * 1000, 3),
+                'projection_ms': round(projection_seconds * 1000, 3),
+                'speedup': round(orm_seconds / projection_seconds, 1),
+            }
+
+    return {
+        'rows': rows,
+        'per_page': per_page,
+        'database': app.config['SQLALCHEMY_DATABASE_URI'].split('://')[0],
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--per-page', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.per_page, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -67,3 +67,11 @@ CREATE TABLE labs (
     --not finished
 
 );
+
+-- per-user lookups: every list/detail query filters on the owning user's id
+CREATE INDEX ix_daily_symptoms_user_recorded ON daily_symptoms (id, recorded_on DESC NULLS LAST, symptoms_id DESC);
+CREATE INDEX ix_food_log_user_recorded ON food_log (id, recorded_on DESC NULLS LAST, foodlog_id DESC);
+CREATE INDEX ix_treatments_user_scheduled ON treatments (id, scheduled_on DESC NULLS LAST, treatment_id DESC);
+CREATE INDEX ix_treatments_user_completed ON treatments (id, is_completed, scheduled_on);
+CREATE INDEX ix_labs_user_lab ON labs (id, lab_id DESC);
+CREATE INDEX ix_user_info_user ON user_info (id);
@@ -0,0 +1,119 @@
+"""baseline tables
+
+Revision ID: 3f1c2a9d8b01
+Revises: 
+Create Date: 2026-10-18 10:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d8b01'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_app() still runs db.create_all() for dev convenience, so on an
+    # existing database some (or all) of these tables are already there
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'users' not in existing:
+        op.create_table('users',
+            sa.Column('id', sa.BigInteger(), nullable=False),
+            sa.Column('first_name', sa.String(length=30), nullable=False),
+            sa.Column('last_name', sa.String(length=30), nullable=True),
+            sa.Column('username', sa.String(length=50), nullable=False),
+            sa.Column('email', sa.String(length=150), nullable=False),
+            sa.Column('password_hash', sa.String(length=255), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('email'),
+            sa.UniqueConstraint('username')
+        )
+
+    if 'token_block_list' not in existing:
+        op.create_table('token_block_list',
+            sa.Column('id', sa.BigInteger(), nullable=False),
+            sa.Column('jti', sa.String(length=64), nullable=False),
+            sa.Column('create_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'user_info' not in existing:
+        op.create_table('user_info',
+            sa.Column('user_info_id', sa.BigInteger(), autoincrement=True, nullable=False),
+            sa.Column('id', sa.BigInteger(), nullable=False),
+            sa.Column('age', sa.Integer(), nullable=True),
+            sa.Column('gender', sa.String(length=10), nullable=True),
+            sa.Column('weight_lbs', sa.Float(), nullable=True),
+            sa.Column('height_ft', sa.Integer(), nullable=True),
+            sa.Column('height_in', sa.Integer(), nullable=True),
+            sa.Column('current_diagnoses', sa.Text(), nullable=True),
+            sa.Column('medical_history', sa.Text(), nullable=True),
+            sa.Column('insurance', sa.Text(), nullable=True),
+            sa.ForeignKeyConstraint(['id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('user_info_id')
+        )
+
+    if 'daily_symptoms' not in existing:
+        op.create_table('daily_symptoms',
+            sa.Column('symptoms_id', sa.BigInteger(), autoincrement=True, nullable=False),
+            sa.Column('id', sa.BigInteger(), nullable=False),
+            sa.Column('severity', sa.Integer(), nullable=True),
+            sa.Column('type_of_symptom', sa.String(length=100), nullable=True),
+            sa.Column('weight_lbs', sa.Float(), nullable=True),
+            sa.Column('recorded_on', sa.DateTime(), nullable=True),
+            sa.Column('notes', sa.Text(), nullable=True),
+            sa.ForeignKeyConstraint(['id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('symptoms_id')
+        )
+
+    if 'treatments' not in existing:
+        op.create_table('treatments',
+            sa.Column('treatment_id', sa.BigInteger(), nullable=False),
+            sa.Column('id', sa.BigInteger(), nullable=False),
+            sa.Column('treatment_name', sa.String(length=100), nullable=True),
+            sa.Column('scheduled_on', sa.DateTime(), nullable=True),
+            sa.Column('notes', sa.Text(), nullable=True),
+            sa.Column('is_completed', sa.Boolean(), nullable=True),
+            sa.ForeignKeyConstraint(['id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('treatment_id')
+        )
+
+    if 'food_log' not in existing:
+        op.create_table('food_log',
+            sa.Column('foodlog_id', sa.BigInteger(), nullable=False),
+            sa.Column('id', sa.BigInteger(), nullable=False),
+            sa.Column('breakfast', sa.String(length=100), nullable=True),
+            sa.Column('lunch', sa.String(length=100), nullable=True),
+            sa.Column('dinner', sa.String(length=100), nullable=True),
+            sa.Column('notes', sa.Text(), nullable=True),
+            sa.Column('total_calories', sa.Float(), nullable=True),
+            sa.Column('recorded_on', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('foodlog_id')
+        )
+
+    if 'labs' not in existing:
+        op.create_table('labs',
+            sa.Column('lab_id', sa.BigInteger(), nullable=False),
+            sa.Column('id', sa.BigInteger(), nullable=False),
+            sa.Column('systolic_pressure', sa.Integer(), nullable=True),
+            sa.Column('diastolic_pressure', sa.Integer(), nullable=True),
+            sa.Column('rbc_count', sa.Float(), nullable=True),
+            sa.ForeignKeyConstraint(['id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('lab_id')
+        )
+
+
+def downgrade():
+    op.drop_table('labs')
+    op.drop_table('food_log')
+    op.drop_table('treatments')
+    op.drop_table('daily_symptoms')
+    op.drop_table('user_info')
+    op.drop_table('token_block_list')
+    op.drop_table('users')
@@ -0,0 +1,63 @@
+"""per-user composite indexes
+
+Revision ID: 7a4e0c5b2d13
+Revises: 3f1c2a9d8b01
+Create Date: 2026-10-18 10:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a4e0c5b2d13'
+down_revision = '3f1c2a9d8b01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    is_postgres = op.get_bind().dialect.name == 'postgresql'
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction block, and it
+    # keeps the tables writable while the index builds
+    with op.get_context().autocommit_block():
+        if is_postgres:
+            op.create_index('ix_daily_symptoms_user_recorded', 'daily_symptoms',
+                            ['id', sa.text('recorded_on DESC NULLS LAST'), sa.text('symptoms_id DESC')],
+                            postgresql_concurrently=True, if_not_exists=True)
+            op.create_index('ix_food_log_user_recorded', 'food_log',
+                            ['id', sa.text('recorded_on DESC NULLS LAST'), sa.text('foodlog_id DESC')],
+                            postgresql_concurrently=True, if_not_exists=True)
+            op.create_index('ix_treatments_user_scheduled', 'treatments',
+                            ['id', sa.text('scheduled_on DESC NULLS LAST'), sa.text('treatment_id DESC')],
+                            postgresql_concurrently=True, if_not_exists=True)
+
+        op.create_index('ix_treatments_user_completed', 'treatments',
+                        ['id', 'is_completed', 'scheduled_on'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_labs_user_lab', 'labs',
+                        ['id', sa.text('lab_id DESC')],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_user_info_user', 'user_info', ['id'],
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    is_postgres = op.get_bind().dialect.name == 'postgresql'
+
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_user_info_user', table_name='user_info',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_labs_user_lab', table_name='labs',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_treatments_user_completed', table_name='treatments',
+                      postgresql_concurrently=True, if_exists=True)
+
+        if is_postgres:
+            op.drop_index('ix_treatments_user_scheduled', table_name='treatments',
+                          postgresql_concurrently=True, if_exists=True)
+            op.drop_index('ix_food_log_user_recorded', table_name='food_log',
+                          postgresql_concurrently=True, if_exists=True)
+            op.drop_index('ix_daily_symptoms_user_recorded', table_name='daily_symptoms',
+                          postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,28 @@
+"""token blocklist create_at index
+
+Revision ID: a3d5e8f1b742
+Revises: f2c9a7d3e514
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d5e8f1b742'
+down_revision = 'f2c9a7d3e514'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # revocation cache refreshes read the recently created rows
+    with op.get_context().autocommit_block():
+        op.create_index('ix_token_block_list_create_at', 'token_block_list', ['create_at'],
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_token_block_list_create_at', table_name='token_block_list',
+                      postgresql_concurrently=True, if_exists=True)
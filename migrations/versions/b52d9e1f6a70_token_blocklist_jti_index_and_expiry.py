@@ -0,0 +1,40 @@
+"""token blocklist jti index and expiry
+
+Revision ID: b52d9e1f6a70
+Revises: 7a4e0c5b2d13
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b52d9e1f6a70'
+down_revision = '7a4e0c5b2d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('token_block_list')}
+    if 'expires_at' not in columns:
+        with op.batch_alter_table('token_block_list', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('expires_at', sa.DateTime(), nullable=True))
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_token_block_list_jti', 'token_block_list', ['jti'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_token_block_list_expires_at', 'token_block_list', ['expires_at'],
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_token_block_list_expires_at', table_name='token_block_list',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_token_block_list_jti', table_name='token_block_list',
+                      postgresql_concurrently=True, if_exists=True)
+
+    with op.batch_alter_table('token_block_list', schema=None) as batch_op:
+        batch_op.drop_column('expires_at')
@@ -0,0 +1,38 @@
+"""export job: one active job per user
+
+Revision ID: b8f2d4a6c913
+Revises: a3d5e8f1b742
+Create Date: 2026-10-18 18:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8f2d4a6c913'
+down_revision = 'a3d5e8f1b742'
+branch_labels = None
+depends_on = None
+
+ACTIVE = "('queued', 'running')"
+
+
+def upgrade():
+    # earlier races may have left several active jobs for a user: keep the newest
+    op.execute(sa.text(f"""
+        UPDATE export_job SET status = 'failed', error = 'Superseded', finished_at = CURRENT_TIMESTAMP
+        WHERE status IN {ACTIVE} AND EXISTS (
+            SELECT 1 FROM export_job newer
+            WHERE newer.id = export_job.id AND newer.status IN {ACTIVE}
+              AND (newer.created_at > export_job.created_at
+                   OR (newer.created_at = export_job.created_at AND newer.job_id > export_job.job_id))
+        )
+    """))
+    op.create_index('uq_export_job_user_active', 'export_job', ['id'], unique=True,
+                    postgresql_where=sa.text(f'status IN {ACTIVE}'),
+                    sqlite_where=sa.text(f'status IN {ACTIVE}'), if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('uq_export_job_user_active', table_name='export_job', if_exists=True)
@@ -0,0 +1,43 @@
+"""export job queue
+
+Revision ID: c8e3f7a1d924
+Revises: b52d9e1f6a70
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8e3f7a1d924'
+down_revision = 'b52d9e1f6a70'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'export_job' in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table('export_job',
+        sa.Column('job_id', sa.String(length=32), nullable=False),
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('status', sa.String(length=10), nullable=False),
+        sa.Column('format', sa.String(length=10), nullable=False),
+        sa.Column('artifact_path', sa.String(length=500), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('job_id')
+    )
+    op.create_index('ix_export_job_user_status', 'export_job', ['id', 'status'])
+    op.create_index('ix_export_job_status', 'export_job', ['status'])
+
+
+def downgrade():
+    op.drop_index('ix_export_job_status', table_name='export_job')
+    op.drop_index('ix_export_job_user_status', table_name='export_job')
+    op.drop_table('export_job')
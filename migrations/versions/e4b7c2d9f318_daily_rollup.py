@@ -0,0 +1,40 @@
+"""daily rollup
+
+Revision ID: e4b7c2d9f318
+Revises: d1a6b4c7e852
+Create Date: 2026-10-18 13:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b7c2d9f318'
+down_revision = 'd1a6b4c7e852'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # backfill afterwards with: flask rebuild-rollups
+    if 'daily_rollup' in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table('daily_rollup',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('symptom_count', sa.Integer(), nullable=False),
+        sa.Column('severity_sum', sa.Integer(), nullable=False),
+        sa.Column('severity_max', sa.Integer(), nullable=True),
+        sa.Column('weight_sum', sa.Float(), nullable=False),
+        sa.Column('weight_count', sa.Integer(), nullable=False),
+        sa.Column('foodlog_count', sa.Integer(), nullable=False),
+        sa.Column('calories_sum', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id', 'day')
+    )
+
+
+def downgrade():
+    op.drop_table('daily_rollup')
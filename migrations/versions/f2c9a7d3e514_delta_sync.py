@@ -0,0 +1,63 @@
+"""delta sync columns and tombstones
+
+Revision ID: f2c9a7d3e514
+Revises: e4b7c2d9f318
+Create Date: 2026-10-18 14:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c9a7d3e514'
+down_revision = 'e4b7c2d9f318'
+branch_labels = None
+depends_on = None
+
+
+# existing rows keep change_seq 0 and are picked up by the initial (no ?since=) sync
+SYNCED_TABLES = ('daily_symptoms', 'food_log', 'treatments', 'labs')
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    for table in SYNCED_TABLES:
+        columns = {c['name'] for c in inspector.get_columns(table)}
+        if 'change_seq' in columns:
+            continue
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+            batch_op.add_column(sa.Column('change_seq', sa.BigInteger(), nullable=False, server_default='0'))
+
+    if 'deleted_record' not in inspector.get_table_names():
+        op.create_table('deleted_record',
+            sa.Column('tombstone_id', sa.BigInteger(), nullable=False),
+            sa.Column('id', sa.BigInteger(), nullable=False),
+            sa.Column('record_type', sa.String(length=20), nullable=False),
+            sa.Column('record_id', sa.BigInteger(), nullable=False),
+            sa.Column('change_seq', sa.BigInteger(), nullable=False),
+            sa.Column('deleted_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('tombstone_id')
+        )
+
+    with op.get_context().autocommit_block():
+        for table in SYNCED_TABLES + ('deleted_record',):
+            op.create_index(f'ix_{table}_user_change', table, ['id', 'change_seq'], unique=False,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table in SYNCED_TABLES:
+            op.drop_index(f'ix_{table}_user_change', table_name=table,
+                          postgresql_concurrently=True, if_exists=True)
+
+    op.drop_table('deleted_record')
+
+    for table in SYNCED_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('change_seq')
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,252 @@
+"""Test harness: a throwaway database, the app, and a user with thousands of rows.
+
+Runs against a temporary SQLite file. Point TEST_DATABASE_URL at a scratch
+PostgreSQL database to check the real planner instead (its tables are dropped
+and recreated). TEST_SEED_ROWS sets the records seeded per type.
+"""
+import os
+import random
+import re
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+
+
+# the app reads its config when backend.main is imported, so this comes first
+_tmp_dir = tempfile.mkdtemp(prefix='med-assist-tests-')
+os.environ['DATABASE_URL'] = os.environ.get('TEST_DATABASE_URL') or f"sqlite:///{os.path.join(_tmp_dir, 'test.db')}"
+os.environ.update({
+    'JWT_SECRET_KEY': 'test-jwt-secret',
+    'SECRET_KEY': 'test-secret',
+    # budgets are for the uncached path
+    'RESPONSE_CACHE_BACKEND': 'none',
+    # no periodic blocklist / principal reloads in the middle of a measured request
+    'JWT_REVOCATION_REFRESH_SECONDS': '3600',
+    'JWT_REVOCATION_FULL_RELOAD_SECONDS': '3600',
+    'USER_CACHE_TTL_SECONDS': '3600',
+    'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+    'PASSWORD_HASH_WORKERS': '0',
+    'PROVISIONING_TOKEN': 'test-provisioning-token',
+    # the pool exhaustion test waits this long for a connection
+    'DB_POOL_TIMEOUT_SECONDS': '1',
+    'EXPORT_DIR': os.path.join(_tmp_dir, 'exports'),
+    'EXPORT_CACHE_DIR': os.path.join(_tmp_dir, 'export_cache'),
+})
+
+SEED_ROWS = int(os.getenv('TEST_SEED_ROWS', 2000))
+PASSWORD = 'password1'
+
+# per-user tables every list / detail / sync endpoint reads; a full scan of one of
+# these grows with the whole user base, not with the caller's own rows
+HOT_TABLES = {'users', 'user_info', 'daily_symptoms', 'food_log', 'treatments', 'labs',
+              'daily_rollup', 'deleted_record'}
+
+MEALS = ['eggs', 'toast', 'coffee', 'oatmeal', 'banana', 'salad', 'chicken', 'rice',
+         'pasta', 'cheese', 'milk', 'beans', 'fish', 'apple', 'bread', 'yogurt']
+
+
+@pytest.fixture(scope='session')
+def app():
+    from backend.main import app, db, export_queue
+
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            db.drop_all()
+            db.create_all()
+    yield app
+    export_queue.shutdown()
+
+
+@pytest.fixture(scope='session')
+def client(app):
+    return app.test_client()
+
+
+def register(client, username):
+    response = client.post('/api/auth/register', json={
+        'first_name': 'Test', 'last_name': 'User', 'username': username,
+        'email': f'{username}@example.com', 'password': PASSWORD, 'confirm_password': PASSWORD,
+    })
+    assert response.status_code == 201, response.json
+
+
+def login(client, username):
+    response = client.post('/api/auth/login-username', json={'username': username, 'password': PASSWORD})
+    assert response.status_code == 200, response.json
+    return response.json['tokens']
+
+
+def seed_records(client, user_id, headers, count, rng):
+    start = datetime(2024, 1, 1)
+
+    def when():
+        return (start + timedelta(minutes=rng.randrange(365 * 24 * 60))).isoformat()
+
+    batches = {
+        'symptom/bulk-add': [
+            {'severity': rng.randrange(11), 'type_of_symptom': rng.choice(['headache', 'nausea', 'fatigue']),
+             'weight_lbs': round(rng.uniform(120, 220), 1), 'notes': 'seeded ' * rng.randrange(1, 20),
+             'recorded_on': when()}
+            for _ in range(count)
+        ],
+        'food-logs/bulk': [
+            {'breakfast': ', '.join(rng.sample(MEALS, 2)), 'lunch': ', '.join(rng.sample(MEALS, 3)),
+             'dinner': ' and '.join(rng.sample(MEALS, 2)), 'total_calories': rng.randrange(1200, 3200),
+             'notes': 'seeded', 'recorded_on': when()}
+            for _ in range(count)
+        ],
+        'labs/bulk': [
+            {'systolic_pressure': rng.randrange(90, 160), 'diastolic_pressure': rng.randrange(60, 100),
+             'rbc_count': round(rng.uniform(4, 6), 2)}
+            for _ in range(count)
+        ],
+        'treatments/bulk': [
+            {'treatment_name': rng.choice(['ibuprofen', 'physio', 'rest']), 'scheduled_on': when(),
+             'notes': 'seeded', 'is_completed': rng.random() < 0.5}
+            for _ in range(count)
+        ],
+    }
+    for path, items in batches.items():
+        response = client.post(f'/api/user/{user_id}/{path}', headers=headers, json=items)
+        assert response.status_code == 201, response.json
+
+
+@pytest.fixture(scope='session')
+def seeded(app, client):
+    """The user under test (SEED_ROWS records per type) next to a smaller neighbour.
+
+    The neighbour's rows make "this user's rows" a real subset of each table,
+    so a plan that scans the table can't pass for one that seeks into it.
+    """
+    from backend.main import db
+    from backend.main.models import Users, DailySymptoms, FoodLog, Labs, Treatments
+
+    rng = random.Random(22)
+    register(client, 'neighbour')
+    register(client, 'budget_user')
+    with app.app_context():
+        neighbour_id, user_id = (
+            db.session.query(Users.id).filter(Users.username == name).scalar()
+            for name in ('neighbour', 'budget_user')
+        )
+
+    neighbour = login(client, 'neighbour')
+    seed_records(client, neighbour_id, {'Authorization': f"Bearer {neighbour['access']}"}, SEED_ROWS // 4, rng)
+
+    tokens = login(client, 'budget_user')
+    headers = {'Authorization': f"Bearer {tokens['access']}"}
+    seed_records(client, user_id, headers, SEED_ROWS, rng)
+    response = client.patch(f'/api/user-info/{user_id}', headers=headers, json={'age': 40, 'gender': 'f'})
+    assert response.status_code == 200, response.json
+
+    # a finished export job for the status / download endpoints: the synchronous
+    # export fills the export cache, so the queued one is done without a worker process
+    response = client.get('/api/user/export-data', headers=headers)
+    assert response.status_code == 200
+    response.get_data()
+    job = client.post('/api/user/export-data', headers=headers).json['job']
+    assert job['status'] == 'done', job
+
+    with app.app_context():
+        # oldest first: each test that edits or deletes a record takes its own
+        ids = {
+            name: [row[0] for row in db.session.query(pk).filter(model.id == user_id).order_by(pk).limit(10)]
+            for name, model, pk in (
+                ('symptom', DailySymptoms, DailySymptoms.symptoms_id),
+                ('foodlog', FoodLog, FoodLog.foodlog_id),
+                ('lab', Labs, Labs.lab_id),
+                ('treatment', Treatments, Treatments.treatment_id),
+            )
+        }
+
+    return SimpleNamespace(
+        id=user_id,
+        username='budget_user',
+        tokens=tokens,
+        headers=headers,
+        ids=ids,
+        job=job['job_id'],
+    )
+
+
+def statement_count(statements):
+    """Statements as the code issued them.
+
+    One executemany INSERT ... RETURNING may reach the driver as a run of
+    single-row statements (SQLite can't batch it and keep the row order that
+    the bulk endpoints ask for, PostgreSQL can). Such a run counts once.
+    """
+    count, previous = 0, None
+    for statement in statements:
+        if not (statement.executemany and previous is not None and previous.executemany and previous.sql == statement.sql):
+            count += 1
+        previous = statement
+    return count
+
+
+@pytest.fixture
+def capture_queries(app):
+    """with capture_queries() as statements: every statement run inside the block."""
+    from backend.main import db
+
+    @contextmanager
+    def capture():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(SimpleNamespace(sql=statement, parameters=parameters, executemany=executemany))
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+
+    return capture
+
+
+def _sqlite_scans(conn, statement):
+    rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement.sql}', statement.parameters).all()
+    # "SCAN t", "SCAN t USING [COVERING] INDEX ix" walk the whole table / index; "SEARCH t ..." seeks
+    scanned = (re.match(r'SCAN (\w+)', row[-1]) for row in rows)
+    return {match.group(1) for match in scanned if match}
+
+
+def _postgres_scans(conn, statement):
+    # with seq scans priced out, one still in the plan means no index can serve it
+    conn.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    plan = conn.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement.sql}', statement.parameters).scalar()
+    scans, nodes = set(), [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        if node['Node Type'] == 'Seq Scan':
+            scans.add(node['Relation Name'])
+        nodes.extend(node.get('Plans', ()))
+    return scans
+
+
+@pytest.fixture
+def sequential_scans(app):
+    """Hot tables that any of these SELECTs would read front to back, per statement."""
+    from backend.main import db
+
+    def find(statements):
+        found = []
+        with app.app_context(), db.engine.connect() as conn:
+            scans_for = _sqlite_scans if conn.dialect.name == 'sqlite' else _postgres_scans
+            for statement in statements:
+                if statement.executemany or not statement.sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+                    continue
+                tables = scans_for(conn, statement) & HOT_TABLES
+                if tables:
+                    found.append((sorted(tables), ' '.join(statement.sql.split())))
+            conn.rollback()
+        return found
+
+    return find
@@ -0,0 +1,95 @@
+"""Sign-in and sign-up edge cases: hash upgrades leave user data alone, constraint failures are reported per record."""
+from werkzeug.security import generate_password_hash
+
+from conftest import PASSWORD, login, register
+
+
+def test_login_rehash_keeps_data_version(app, client):
+    from backend.main import db
+    from backend.main.models import Users
+
+    register(client, 'rehash_user')
+    with app.app_context():
+        user = Users.query.filter_by(username='rehash_user').one()
+        # a hash from an older cost policy
+        user.password_hash = generate_password_hash(PASSWORD, method='pbkdf2:sha256:500')
+        db.session.commit()
+        user_id, version = user.id, Users.get_data_version(user.id)
+
+    login(client, 'rehash_user')
+
+    with app.app_context():
+        credentials = Users.get_credentials(id=user_id)
+        assert credentials.password_hash.startswith('pbkdf2:sha256:1000$')
+        assert Users.get_data_version(user_id) == version
+    # and the upgraded hash still signs in
+    login(client, 'rehash_user')
+
+
+def test_register_other_integrity_error_is_json_500(client, monkeypatch):
+    from sqlalchemy.exc import IntegrityError
+    from backend.main.routes import auth
+
+    def insert_user(*args):
+        raise IntegrityError('INSERT INTO user_info ...', {}, Exception('CHECK constraint failed'))
+
+    monkeypatch.setattr(auth, 'insert_user', insert_user)
+    response = client.post('/api/auth/register', json={
+        'first_name': 'Test', 'username': 'integrity_user', 'email': 'integrity_user@example.com',
+        'password': PASSWORD, 'confirm_password': PASSWORD,
+    })
+    assert response.status_code == 500
+    assert response.json == {'error': 'Failed to create user'}
+
+
+def provision(client, records):
+    return client.post('/api/auth/provision-users', json=records,
+                       headers={'X-Provisioning-Token': 'test-provisioning-token'})
+
+
+def test_provision_reports_concurrent_conflicts_per_record(client, monkeypatch):
+    from backend.main.utils import provisioning
+
+    register(client, 'prov_taken')
+    # the pre-check misses it, as when the account is created concurrently
+    real_taken_fields = provisioning.taken_fields
+    calls = []
+
+    def taken_fields(usernames, emails):
+        calls.append(usernames)
+        return (set(), set()) if len(calls) == 1 else real_taken_fields(usernames, emails)
+
+    monkeypatch.setattr(provisioning, 'taken_fields', taken_fields)
+
+    response = provision(client, [
+        {'first_name': 'A', 'username': 'prov_fresh', 'email': 'prov_taken@example.com', 'password': PASSWORD},
+        {'first_name': 'B', 'username': 'prov_new', 'email': 'prov_new@example.com', 'password': PASSWORD,
+         'user_info_id': 999, 'age': 30},
+    ])
+    assert response.status_code == 207, response.json
+    first, second = response.json['results']
+    assert first == {'index': 0, 'status': 'conflict', 'errors': {'email': ['Email already exists']}}
+    assert second['status'] == 'created'
+
+
+def test_provision_reports_other_constraint_failures(client, monkeypatch):
+    from sqlalchemy.exc import IntegrityError
+    from backend.main.utils import provisioning
+
+    def insert_chunk(rows, info_rows):
+        raise IntegrityError('INSERT INTO user_info ...', {}, Exception('CHECK constraint failed'))
+
+    monkeypatch.setattr(provisioning, '_insert_chunk', insert_chunk)
+    response = provision(client, [{'first_name': 'C', 'username': 'prov_check', 'email': 'prov_check@example.com',
+                                   'password': PASSWORD}])
+    assert response.status_code == 400
+    assert response.json['results'] == [
+        {'index': 0, 'status': 'failed', 'errors': {'_schema': ['Failed to create user']}}]
+
+
+def test_provision_form_ignores_user_info_id():
+    from backend.main.forms import ProvisionUserForm
+
+    record = ProvisionUserForm().load({'first_name': 'D', 'username': 'prov_form', 'email': 'prov_form@example.com',
+                                       'password': PASSWORD, 'user_info_id': 5})
+    assert 'user_info_id' not in record
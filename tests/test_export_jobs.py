@@ -0,0 +1,135 @@
+"""Export job lifecycle: stale jobs stop blocking, one active job per user, old files removed."""
+import os
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from conftest import login, register
+
+
+@pytest.fixture
+def queue(app, monkeypatch):
+    """The app's export queue with submitted jobs collected instead of run in a process pool."""
+    from backend.main import export_queue
+
+    submitted = []
+    monkeypatch.setattr(export_queue, '_get_executor',
+                        lambda: SimpleNamespace(submit=lambda fn, *args: submitted.append(args)))
+    export_queue.submitted = submitted
+    return export_queue
+
+
+@pytest.fixture
+def user(app, client, request):
+    from backend.main import db
+    from backend.main.models import Users
+
+    username = f'export_{request.node.name}'[:50].replace('[', '_').replace(']', '')
+    register(client, username)
+    tokens = login(client, username)
+    with app.app_context():
+        user_id = db.session.query(Users.id).filter(Users.username == username).scalar()
+    return SimpleNamespace(id=user_id, headers={'Authorization': f"Bearer {tokens['access']}"})
+
+
+def add_job(user_id, status, age_seconds=0, artifact_path=None):
+    from backend.main import db
+    from backend.main.models import ExportJob
+    from backend.main.models.token import utcnow
+
+    when = utcnow() - timedelta(seconds=age_seconds)
+    job = ExportJob(job_id=os.urandom(16).hex(), id=user_id, status=status, artifact_path=artifact_path,
+                    created_at=when, started_at=when if status != ExportJob.QUEUED else None,
+                    finished_at=when if status not in ExportJob.ACTIVE else None)
+    db.session.add(job)
+    db.session.commit()
+    return job.job_id
+
+
+def test_stale_job_no_longer_blocks_its_user(app, queue, user):
+    from backend.main import db
+    from backend.main.models import ExportJob
+
+    with app.app_context():
+        stale = add_job(user.id, ExportJob.RUNNING, age_seconds=queue.job_timeout_seconds + 60)
+        fresh = queue.submit(user.id)
+        assert fresh.job_id != stale and fresh.status == ExportJob.QUEUED
+        assert db.session.get(ExportJob, stale).status == ExportJob.FAILED
+        # asking again while the new one is in flight returns it
+        assert queue.submit(user.id).job_id == fresh.job_id
+
+
+def test_stale_jobs_do_not_fill_the_global_limit(app, queue, user, seeded, monkeypatch):
+    from backend.main.models import ExportJob, Users
+
+    with app.app_context():
+        # room for exactly one more live job, and someone else's export whose worker died long ago
+        live = [job for job in ExportJob.query.filter(ExportJob.status.in_(ExportJob.ACTIVE))
+                if not job.is_stale(queue._stale_cutoff())]
+        monkeypatch.setattr(queue, 'max_active_jobs', len(live) + 1)
+        neighbour = Users.query.filter_by(username='neighbour').one()
+        add_job(neighbour.id, ExportJob.QUEUED, age_seconds=queue.job_timeout_seconds + 60)
+        assert queue.submit(user.id).status == ExportJob.QUEUED
+
+
+def test_one_active_job_per_user(app, user):
+    from backend.main import db
+    from backend.main.models import ExportJob
+
+    with app.app_context():
+        add_job(user.id, ExportJob.QUEUED)
+        with pytest.raises(IntegrityError):
+            add_job(user.id, ExportJob.RUNNING)
+        db.session.rollback()
+        # finished ones don't count
+        add_job(user.id, ExportJob.DONE)
+        add_job(user.id, ExportJob.FAILED)
+
+
+def test_finished_export_replaces_the_previous_file(app, client, queue, user):
+    from backend.main import db
+    from backend.main.exports.jobs import run_export_job
+    from backend.main.models import ExportJob
+
+    with app.app_context():
+        os.makedirs(queue.export_dir, exist_ok=True)
+        old_path = os.path.join(queue.export_dir, f'old-{user.id}.pdf')
+        with open(old_path, 'wb') as old_file:
+            old_file.write(b'%PDF-old')
+        old = add_job(user.id, ExportJob.DONE, age_seconds=60, artifact_path=old_path)
+        # new data, so the next export can't come from the cache
+        client.post(f'/api/user/{user.id}/symptom/add', headers=user.headers, json={'severity': 3})
+
+        job = queue.submit(user.id)
+        run_export_job(job.job_id, queue.export_dir)
+        db.session.expire_all()
+        assert db.session.get(ExportJob, job.job_id).status == ExportJob.DONE
+        assert db.session.get(ExportJob, old).artifact_path is None
+    assert not os.path.exists(old_path)
+
+    response = client.get(f'/api/user/export-data/{old}/download', headers=user.headers)
+    assert response.status_code == 410
+    response = client.get(f'/api/user/export-data/{job.job_id}/download', headers=user.headers)
+    assert response.status_code == 200 and response.get_data().startswith(b'%PDF')
+
+
+def test_prune_fails_stale_jobs_and_deletes_expired_files(app, queue, user):
+    from backend.main import db
+    from backend.main.models import ExportJob
+
+    with app.app_context():
+        os.makedirs(queue.export_dir, exist_ok=True)
+        path = os.path.join(queue.export_dir, f'expired-{user.id}.pdf')
+        with open(path, 'wb') as expired_file:
+            expired_file.write(b'%PDF-expired')
+        expired = add_job(user.id, ExportJob.DONE, age_seconds=queue.artifact_ttl_seconds + 60, artifact_path=path)
+        stale = add_job(user.id, ExportJob.QUEUED, age_seconds=queue.job_timeout_seconds + 60)
+
+        failed, deleted = queue.prune()
+        assert failed >= 1 and deleted >= 1
+        db.session.expire_all()
+        assert db.session.get(ExportJob, stale).status == ExportJob.FAILED
+        assert db.session.get(ExportJob, expired).artifact_path is None
+    assert not os.path.exists(path)
@@ -0,0 +1,20 @@
+"""Streamed CSV exports: the header comes from the table, the rows from to_dict()."""
+import csv
+import io
+
+import pytest
+
+
+@pytest.mark.parametrize('type_name', ['symptoms', 'food_logs', 'treatments', 'labs'])
+def test_csv_header_matches_to_dict(app, client, seeded, type_name):
+    from backend.main.exports.tabular import EXPORT_TYPES, field_names
+
+    model = EXPORT_TYPES[type_name][0]
+    with app.app_context():
+        row = model.query.filter_by(id=seeded.id).first()
+        assert field_names(model) == list(row.to_dict())
+
+    response = client.get(f'/api/user/{seeded.id}/export?format=csv&types={type_name}', headers=seeded.headers)
+    assert response.status_code == 200
+    header = next(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert header == ['record_type'] + field_names(model)
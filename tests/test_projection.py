@@ -0,0 +1,78 @@
+"""Projection output against the serializers it replaced: byte for byte against the
+marshmallow forms the list routes dumped with, value for value against to_dict()."""
+from datetime import datetime
+
+import pytest
+
+from conftest import register
+
+
+FULL = {
+    'severity': 7, 'type_of_symptom': 'Headache', 'weight_lbs': 150.1, 'recorded_on': datetime(2024, 3, 1, 8, 5, 9, 123456),
+    'notes': 'Café, "quoted" ✓', 'breakfast': 'eggs', 'lunch': 'salad', 'dinner': 'fish', 'total_calories': 0.1,
+    'treatment_name': 'Physio', 'scheduled_on': datetime(2024, 3, 2), 'is_completed': False,
+    'systolic_pressure': 120, 'diastolic_pressure': 80, 'rbc_count': 4.7,
+    'age': 40, 'gender': 'f', 'height_ft': 5, 'height_in': 0,
+    'current_diagnoses': 'IBS', 'medical_history': '', 'insurance': 'None',
+}
+
+
+def record_models():
+    from backend.main.forms import DailySymptomsForm, FoodLogForm, TreatmentsForm, LabsForm, UserInfoForm
+    from backend.main.models import DailySymptoms, FoodLog, Treatments, Labs, UserInfo
+
+    return [
+        (DailySymptoms, DailySymptomsForm, DailySymptoms.symptoms_id),
+        (FoodLog, FoodLogForm, FoodLog.foodlog_id),
+        (Treatments, TreatmentsForm, Treatments.treatment_id),
+        (Labs, LabsForm, Labs.lab_id),
+        (UserInfo, UserInfoForm, UserInfo.user_info_id),
+    ]
+
+
+@pytest.fixture(scope='module')
+def owners(app, client):
+    """Two users: one whose rows have every field set, one whose optional fields are all None."""
+    from backend.main import db
+    from backend.main.models import Users
+
+    ids = {}
+    for kind in ('full', 'empty'):
+        username = f'projection_{kind}'
+        register(client, username)
+        with app.app_context():
+            user_id = db.session.query(Users.id).filter(Users.username == username).scalar()
+            for model, _, pk in record_models():
+                values = {
+                    column.key: FULL[column.key] if kind == 'full' else None
+                    for column in model.__table__.columns if column.key in FULL
+                }
+                db.session.add(model(id=user_id, **values))
+            db.session.commit()
+        ids[kind] = user_id
+    return ids
+
+
+@pytest.mark.parametrize('index', range(5), ids=['symptoms', 'food_logs', 'treatments', 'labs', 'user_info'])
+@pytest.mark.parametrize('kind', ['full', 'empty'])
+def test_projection_matches_marshmallow_and_to_dict(app, owners, kind, index):
+    from backend.main.utils import Projection
+
+    model, form, pk = record_models()[index]
+    projection = Projection(model, form)
+    with app.app_context():
+        objects = model.query.filter_by(id=owners[kind]).order_by(pk).all()
+        rows = projection.query().filter(model.id == owners[kind]).order_by(pk).all()
+        assert objects and len(rows) == len(objects)
+
+        actual = app.json.dumps(projection.dump_many(rows)).encode()
+        assert actual == app.json.dumps(form().dump(objects, many=True)).encode()
+        if hasattr(model, 'to_dict'):
+            # to_dict() orders some keys differently, the values must still match
+            assert app.json.loads(actual) == app.json.loads(app.json.dumps([obj.to_dict() for obj in objects]))
+
+        # a sparse fieldset is the same payload with fewer keys
+        keys = projection.keys[1::2]
+        subset = projection.only(','.join(keys))
+        sparse = subset.query().filter(model.id == owners[kind]).order_by(pk).all()
+        assert app.json.dumps(subset.dump_many(sparse)) == app.json.dumps(form(only=keys).dump(objects, many=True))
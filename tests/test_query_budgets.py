@@ -0,0 +1,156 @@
+"""Every route in the API blueprints runs within its query budget and without full table scans.
+
+A budget is the most statements one call may execute, JWT checks included
+(the principal and blocklist caches are warm, the response cache is off).
+Raise one only together with the change that needs the extra query.
+"""
+from collections import namedtuple
+
+import pytest
+
+from conftest import statement_count
+
+
+BLUEPRINTS = ('auth', 'users', 'symptoms', 'food_logs', 'treatments', 'labs')
+
+# path placeholders: {id} the seeded user, {symptom} / {foodlog} / {lab} / {treatment}
+# one of their records (edits and deletes pick their own), {job} a finished export job.
+# auth: 'access' / 'refresh' send the seeded user's tokens, 'fresh' a token from a new
+# login (logout revokes it), 'provision' the provisioning header, None nothing
+Call = namedtuple('Call', 'endpoint method path budget json auth', defaults=(None, 'access'))
+
+CALLS = [
+    # auth
+    Call('auth.register', 'POST', '/api/auth/register', 1, {
+        'first_name': 'New', 'username': 'new_user', 'email': 'new_user@example.com',
+        'password': 'password1', 'confirm_password': 'password1'}, None),
+    Call('auth.login_email', 'POST', '/api/auth/login-email', 1,
+         {'email': 'budget_user@example.com', 'password': 'password1'}, None),
+    Call('auth.login_username', 'POST', '/api/auth/login-username', 1,
+         {'username': 'budget_user', 'password': 'password1'}, None),
+    Call('auth.refresh_access', 'GET', '/api/auth/refresh', 1, auth='refresh'),
+    Call('auth.logout', 'GET', '/api/auth/logout', 1, auth='fresh'),
+    Call('auth.provision', 'POST', '/api/auth/provision-users', 5, [
+        {'first_name': 'Clinic', 'username': f'clinic_{i}', 'email': f'clinic_{i}@example.com',
+         'password': 'password1', 'age': 30 + i} for i in range(20)], 'provision'),
+
+    # users
+    Call('users.users_me', 'GET', '/api/users/me', 0),
+    Call('users.get_user_required_info', 'GET', '/api/user-required-info/{id}', 0),
+    Call('users.get_user_info', 'GET', '/api/user-info/{id}', 2),
+    Call('users.get_user_info', 'GET', '/api/user-info/{id}?fields=age,gender', 2),
+    Call('users.update_user_account', 'PATCH', '/api/user-account/{id}', 3, {'email': 'budget_user@example.com'}),
+    Call('users.update_user_info', 'PATCH', '/api/user-info/{id}', 4, {'age': 41}),
+    Call('users.export_data', 'GET', '/api/user/export-data', 6),
+    Call('users.enqueue_export', 'POST', '/api/user/export-data', 4),
+    Call('users.export_status', 'GET', '/api/user/export-data/{job}', 1),
+    Call('users.download_export', 'GET', '/api/user/export-data/{job}/download', 1),
+    Call('users.export_records', 'GET', '/api/user/{id}/export?format=csv', 4),
+    Call('users.export_records', 'GET', '/api/user/{id}/export?format=ndjson&types=symptoms', 1),
+    Call('users.get_rollups', 'GET', '/api/user/{id}/rollups?period=week', 2),
+    Call('users.get_changes', 'GET', '/api/user/{id}/changes', 12),
+    Call('users.get_changes', 'GET', '/api/user/{id}/changes?since=1000&limit=200', 12),
+
+    # symptoms
+    Call('symptoms.get_symptom', 'GET', '/api/user/{id}/symptom/{symptom}', 2),
+    Call('symptoms.get_symptoms_all', 'GET', '/api/user/{id}/my-symptoms', 3),
+    Call('symptoms.get_symptoms_all', 'GET', '/api/user/{id}/my-symptoms?page=40&per_page=20', 3),
+    Call('symptoms.get_symptoms_all', 'GET', '/api/user/{id}/my-symptoms?cursor=&fields=severity,recorded_on', 2),
+    Call('symptoms.add_symptoms', 'POST', '/api/user/{id}/symptom/add', 6,
+         {'severity': 4, 'recorded_on': '2024-06-01T08:00:00'}),
+    Call('symptoms.bulk_add_symptoms', 'POST', '/api/user/{id}/symptom/bulk-add', 6,
+         [{'severity': i % 10, 'recorded_on': '2024-06-02T08:00:00'} for i in range(50)]),
+    Call('symptoms.edit_symptom', 'PATCH', '/api/user/{id}/symptom/{symptom:1}/edit', 7, {'severity': 9}),
+    Call('symptoms.delete_symptom', 'DELETE', '/api/user/{id}/symptom/{symptom:2}/delete', 8),
+
+    # food logs
+    Call('food_logs.get_foodlog', 'GET', '/api/user/{id}/food-logs/{foodlog}', 2),
+    Call('food_logs.get_all_foodlogs', 'GET', '/api/user/{id}/food-logs', 3),
+    Call('food_logs.get_all_foodlogs', 'GET', '/api/user/{id}/food-logs?cursor=', 2),
+    Call('food_logs.get_food_correlations', 'GET', '/api/user/{id}/food-logs/correlations', 4),
+    Call('food_logs.add_foodlog', 'POST', '/api/user/{id}/food-logs', 6,
+         {'breakfast': 'eggs', 'recorded_on': '2024-06-01T08:00:00'}),
+    Call('food_logs.bulk_add_foodlogs', 'POST', '/api/user/{id}/food-logs/bulk', 6,
+         [{'lunch': 'rice, beans', 'recorded_on': '2024-06-02T12:00:00'} for _ in range(50)]),
+    Call('food_logs.edit_foodlog', 'PATCH', '/api/user/{id}/food-logs/{foodlog:1}/edit', 7, {'dinner': 'fish'}),
+    Call('food_logs.delete_foodlog', 'DELETE', '/api/user/{id}/food-logs/{foodlog:2}/delete', 8),
+
+    # treatments
+    Call('treatments.get_treatment', 'GET', '/api/user/{id}/treatments/{treatment}', 2),
+    Call('treatments.list_treatments', 'GET', '/api/user/{id}/treatments', 3),
+    Call('treatments.list_treatments', 'GET', '/api/user/{id}/treatments?cursor=', 2),
+    Call('treatments.create_treatment', 'POST', '/api/user/{id}/treatments', 2,
+         {'treatment_name': 'rest', 'scheduled_on': '2024-06-01T08:00:00'}),
+    Call('treatments.bulk_create_treatments', 'POST', '/api/user/{id}/treatments/bulk', 2,
+         [{'treatment_name': 'rest', 'scheduled_on': '2024-06-02T08:00:00'} for _ in range(50)]),
+    Call('treatments.update_treatment', 'PATCH', '/api/user/{id}/treatments/{treatment:1}', 3, {'notes': 'moved to the evening'}),
+    Call('treatments.delete_treatment', 'DELETE', '/api/user/{id}/treatments/{treatment:2}', 4),
+
+    # labs
+    Call('labs.get_lab', 'GET', '/api/user/{id}/labs/{lab}', 2),
+    Call('labs.get_labs_all', 'GET', '/api/user/{id}/labs', 3),
+    Call('labs.get_labs_all', 'GET', '/api/user/{id}/labs?cursor=', 2),
+    Call('labs.add_lab', 'POST', '/api/user/{id}/labs', 2, {'systolic_pressure': 120, 'diastolic_pressure': 80}),
+    Call('labs.bulk_add_labs', 'POST', '/api/user/{id}/labs/bulk', 2,
+         [{'systolic_pressure': 120, 'diastolic_pressure': 80} for _ in range(50)]),
+]
+
+
+def _path(call, seeded):
+    path = call.path.replace('{id}', str(seeded.id)).replace('{job}', seeded.job)
+    for name, ids in seeded.ids.items():
+        for i, record_id in enumerate(ids):
+            path = path.replace(f'{{{name}:{i}}}', str(record_id))
+        path = path.replace(f'{{{name}}}', str(ids[0]))
+    return path
+
+
+def _headers(call, client, seeded):
+    if call.auth == 'access':
+        return seeded.headers
+    if call.auth == 'refresh':
+        return {'Authorization': f"Bearer {seeded.tokens['refresh']}"}
+    if call.auth == 'fresh':
+        tokens = client.post('/api/auth/login-username', json={'username': seeded.username, 'password': 'password1'}).json['tokens']
+        return {'Authorization': f"Bearer {tokens['access']}"}
+    if call.auth == 'provision':
+        return {'X-Provisioning-Token': 'test-provisioning-token'}
+    return {}
+
+
+def test_every_route_has_a_budget(app):
+    routes = {
+        rule.endpoint
+        for rule in app.url_map.iter_rules()
+        if rule.endpoint.split('.')[0] in BLUEPRINTS
+    }
+    assert routes - {call.endpoint for call in CALLS} == set()
+
+
+@pytest.mark.parametrize('call', CALLS, ids=lambda call: f'{call.method} {call.path}')
+def test_query_budget(call, client, seeded, capture_queries, sequential_scans):
+    headers = _headers(call, client, seeded)
+    # warm the principal cache (an earlier call may have invalidated it)
+    client.get('/api/users/me', headers=seeded.headers)
+
+    with capture_queries() as statements:
+        response = client.open(_path(call, seeded), method=call.method, headers=headers, json=call.json)
+        # streamed bodies (exports) run their queries while being read
+        response.get_data()
+
+    assert response.status_code < 300, response.get_data(as_text=True)[:500]
+    executed = '\n'.join(' '.join(statement.sql.split())[:200] for statement in statements)
+    count = statement_count(statements)
+    assert count <= call.budget, f'{count} statements, budget {call.budget}:\n{executed}'
+    assert sequential_scans(statements) == []
+
+
+def test_scan_check_sees_full_scans(app, seeded, capture_queries, sequential_scans):
+    from backend.main import db
+    from backend.main.models import Labs
+
+    # nothing indexes rbc_count, so this one has to read the whole table
+    with app.app_context(), capture_queries() as statements:
+        db.session.query(Labs.lab_id).filter(Labs.rbc_count > 5).all()
+        db.session.rollback()
+    assert [tables for tables, _ in sequential_scans(statements)] == [['labs']]
@@ -0,0 +1,35 @@
+"""Delta sync paging: a bulk insert shares one change sequence but is still split at `limit`."""
+from conftest import login, register
+
+
+def test_changes_pages_never_exceed_limit(app, client):
+    from backend.main import db
+    from backend.main.models import Users
+
+    register(client, 'sync_pages')
+    headers = {'Authorization': f"Bearer {login(client, 'sync_pages')['access']}"}
+    with app.app_context():
+        user_id = db.session.query(Users.id).filter(Users.username == 'sync_pages').scalar()
+
+    response = client.post(f'/api/user/{user_id}/symptom/bulk-add', headers=headers,
+                           json=[{'severity': i % 10} for i in range(25)])
+    assert response.status_code == 201, response.json
+    client.post(f'/api/user/{user_id}/labs', headers=headers, json={'systolic_pressure': 120})
+
+    seen, pages, since = [], 0, None
+    while True:
+        query = f'?since={since}&limit=4' if since is not None else '?limit=4'
+        page = client.get(f'/api/user/{user_id}/changes{query}', headers=headers).json
+        assert all(len(rows) <= 4 for rows in page['changes'].values())
+        seen += [row['symptoms_id'] for row in page['changes']['symptoms']]
+        pages += 1
+        since = page['next_since']
+        if not page['has_more']:
+            break
+
+    assert pages == 7
+    assert sorted(seen) == seen and len(set(seen)) == 25
+    # a finished sync hands back a plain sequence, and nothing is left after it
+    assert since.isdigit()
+    assert client.get(f'/api/user/{user_id}/changes?since={since}', headers=headers).json['changes']['symptoms'] == []
+    assert client.get(f'/api/user/{user_id}/changes?since=1:labs', headers=headers).status_code == 400